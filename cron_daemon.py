@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Everything-for-AI 常驻调度进程
+
+代替 crontab.txt 里每天十几次的 python3 冷启动：
+- 按 schedule.json 中的 cron 表达式，在本进程的线程池里运行各发送任务
+- 所有任务共用一个 FeishuClient（keep-alive 连接池 + token 内存缓存），各机器人模块只导入一次
+- 同一任务上一次还没跑完时，本次触发直接跳过
+- 通过 Unix socket 接受临时命令：立即运行某个任务、查看状态、重新读取 schedule.json
+
+使用方法：
+python3 cron_daemon.py                # 启动调度进程（crontab 里只保留一条 @reboot）
+python3 cron_daemon.py --list         # 查看任务和上次运行结果
+python3 cron_daemon.py --run news     # 立即运行一个任务
+python3 cron_daemon.py --reload       # 重新读取 schedule.json
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from digest_sources import REPO_DIR, import_from
+from feishu_client import FeishuClient
+
+SCHEDULE_PATH = REPO_DIR / "schedule.json"
+CONFIG_PATH = Path.home() / ".openclaw" / "openclaw.json"
+SECRET_PATH = Path.home() / ".openclaw" / "secrets" / "feishu_app_secret"
+DEFAULT_SOCKET = "~/.openclaw/scheduler.sock"
+MAX_CATCH_UP = 5  # 进程卡顿后最多补跑最近几分钟的触发
+
+
+# ========== 任务 ==========
+
+def _daily_sender(client, type="all"):
+    import daily_sender
+    daily_sender.send(type, client)
+
+
+def _all_sender(client, mode="all"):
+    import all_sender
+    all_sender.send_pipeline(mode, client)
+
+
+def _stock(client):
+    import_from("stock-reminder", "daily_stock_sender").main(client)
+
+
+def _crypto(client):
+    import_from("crypto-tracker", "crypto_bot").main(client)
+
+
+def _exchange(client):
+    import_from("exchange-rate-monitor", "exchange_bot").main(client)
+
+
+def _server_monitor(client):
+    import_from("server-monitor", "monitor").main(
+        client, config_file=str(REPO_DIR / "server-monitor" / "config.json"))
+
+
+def _outbox(client):
+    from feishu_outbox import Outbox
+    if client is None:
+        return
+    outbox = Outbox()
+    try:
+        delivered = outbox.drain(client)
+        if delivered:
+            print(f"📮 已投递积压消息 {delivered} 条")
+    finally:
+        outbox.close()
+
+
+RUNNERS = {
+    "daily_sender": _daily_sender,
+    "all_sender": _all_sender,
+    "stock": _stock,
+    "crypto": _crypto,
+    "exchange": _exchange,
+    "server_monitor": _server_monitor,
+    "outbox": _outbox,
+}
+
+
+# ========== cron 表达式 ==========
+
+def _parse_field(field, low, high):
+    """解析一个 cron 字段（支持 *、a-b、a,b、*/n、a-b/n），返回取值集合"""
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step = part.split("/", 1)
+            step = int(step)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"cron 字段超出范围: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """标准 5 字段 cron 表达式：分 时 日 月 周（0 和 7 都表示周日）"""
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron 表达式需要 5 个字段: {expression}")
+        self.expression = expression
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        self.weekdays = {v % 7 for v in _parse_field(fields[4], 0, 7)}
+        # 日和周都有限制时，满足其一即可（与 cron 一致；"*/2" 这类以 * 开头的字段算作不限制）
+        self.any_day = fields[2].startswith("*")
+        self.any_weekday = fields[4].startswith("*")
+
+    def matches(self, dt):
+        if dt.minute not in self.minutes or dt.hour not in self.hours or dt.month not in self.months:
+            return False
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+
+class Job:
+    """一个定时任务及其最近一次运行情况"""
+
+    def __init__(self, name, cron, job, args=None):
+        if job not in RUNNERS:
+            raise ValueError(f"未知任务类型: {job}")
+        self.name = name
+        self.kind = job
+        self.schedule = CronSchedule(cron)
+        self.runner = RUNNERS[job]
+        self.args = args or {}
+
+        self.running = False
+        self.runs = 0
+        self.last_start = None
+        self.last_duration = None
+        self.last_error = None
+
+    def describe(self):
+        if self.running:
+            state = "运行中"
+        elif self.last_start is None:
+            state = "未运行"
+        else:
+            result = f"❌ {self.last_error}" if self.last_error else "✅"
+            state = f"{self.last_start.strftime('%m-%d %H:%M')} {result} ({self.last_duration:.1f}s)"
+        return f"{self.name:<16} {self.schedule.expression:<14} {self.kind:<15} {state}"
+
+
+# ========== 调度进程 ==========
+
+class Scheduler:
+    """在本进程内按 cron 表达式运行任务"""
+
+    def __init__(self, schedule_path=SCHEDULE_PATH):
+        self.schedule_path = Path(schedule_path)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self._client = None
+        self.workers = self.socket_path = None
+        self.load()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+
+    def load(self):
+        """读取 schedule.json；重新加载时保留同名任务的运行状态
+
+        workers / socket 只在启动时生效（线程池和控制 socket 已经建好），返回 (任务数, 被修改、需要重启才生效的键)。
+        """
+        with open(self.schedule_path, encoding="utf-8") as f:
+            schedule = json.load(f)
+        jobs = {}
+        for entry in schedule.get("jobs", []):
+            job = Job(entry["name"], entry["cron"], entry["job"], entry.get("args"))
+            old = self.jobs.get(job.name)
+            if old is not None:
+                job.running, job.runs = old.running, old.runs
+                job.last_start, job.last_duration, job.last_error = old.last_start, old.last_duration, old.last_error
+            jobs[job.name] = job
+        with self.lock:
+            self.jobs = jobs
+        workers = schedule.get("workers", 4)
+        socket_path = Path(os.path.expanduser(schedule.get("socket", DEFAULT_SOCKET)))
+        if self.workers is None:
+            self.workers, self.socket_path = workers, socket_path
+        restart = [key for key, running, configured in (("workers", self.workers, workers),
+                                                        ("socket", self.socket_path, socket_path))
+                   if running != configured]
+        return len(jobs), restart
+
+    def client(self):
+        """共享的飞书客户端（配置缺失时返回 None，下次再试）"""
+        with self.lock:
+            if self._client is None:
+                app_id = None
+                if CONFIG_PATH.exists():
+                    with open(CONFIG_PATH) as f:
+                        app_id = json.load(f).get("channels", {}).get("feishu", {}).get("appId")
+                app_secret = SECRET_PATH.read_text().strip() if SECRET_PATH.exists() else None
+                if app_id and app_secret:
+                    self._client = FeishuClient(app_id, app_secret)
+            return self._client
+
+    def trigger(self, name, reason="定时"):
+        with self.lock:
+            job = self.jobs.get(name)
+            if job is None:
+                return f"❌ 未知任务: {name}"
+            if job.running:
+                return f"⏭️ {name} 上一次还在运行，跳过"
+            job.running = True
+        self.executor.submit(self._run, job, reason)
+        return f"▶️ 已开始 {name}"
+
+    def _run(self, job, reason):
+        job.last_start = datetime.now()
+        started = time.monotonic()
+        print(f"[{job.last_start.strftime('%Y-%m-%d %H:%M:%S')}] ▶️ {job.name}（{reason}）")
+        try:
+            job.runner(self.client(), **job.args)
+            job.last_error = None
+        except Exception as e:
+            job.last_error = str(e) or type(e).__name__
+            print(f"❌ 任务 {job.name} 失败: {job.last_error}")
+        finally:
+            job.last_duration = time.monotonic() - started
+            job.runs += 1
+            job.running = False
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏹️ {job.name} 用时 {job.last_duration:.1f}s")
+
+    def status(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return "\n".join(job.describe() for job in jobs)
+
+    def handle_command(self, line):
+        """处理控制命令：run <任务> / list / reload"""
+        parts = line.split()
+        if not parts:
+            return "❌ 空命令"
+        if parts[0] == "run" and len(parts) == 2:
+            return self.trigger(parts[1], reason="手动")
+        if parts[0] == "list":
+            return self.status()
+        if parts[0] == "reload":
+            try:
+                count, restart = self.load()
+            except (OSError, ValueError, KeyError) as e:
+                return f"❌ 加载失败: {e}"
+            message = f"✅ 已加载 {count} 个任务"
+            if restart:
+                message += f"\n⚠️ {' / '.join(restart)} 的修改需要重启调度进程才生效（当前 socket {self.socket_path}）"
+            return message
+        return f"❌ 未知命令: {line}"
+
+    def _serve_control(self):
+        scheduler = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline().decode("utf-8").strip()
+                self.wfile.write((scheduler.handle_command(line) + "\n").encode("utf-8"))
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        threading.Thread(target=server.serve_forever, name="control", daemon=True).start()
+        return server
+
+    def run_forever(self):
+        signal.signal(signal.SIGTERM, lambda *_: self.stopping.set())
+        signal.signal(signal.SIGINT, lambda *_: self.stopping.set())
+        server = self._serve_control()
+        print(f"🕐 调度进程已启动：{len(self.jobs)} 个任务，控制 socket {self.socket_path}")
+
+        # 逐分钟检查；睡过头（卡顿、挂起）时补跑最近几分钟内的触发
+        last_minute = datetime.now().replace(second=0, microsecond=0)
+        while not self.stopping.is_set():
+            next_minute = last_minute + timedelta(minutes=1)
+            if self.stopping.wait(max(0.0, (next_minute - datetime.now()).total_seconds())):
+                break
+            now = datetime.now().replace(second=0, microsecond=0)
+            minute = max(next_minute, now - timedelta(minutes=MAX_CATCH_UP - 1))
+            while minute <= now:
+                with self.lock:
+                    due = [job.name for job in self.jobs.values() if job.schedule.matches(minute)]
+                for name in due:
+                    message = self.trigger(name)
+                    if not message.startswith("▶️"):
+                        print(message)
+                minute += timedelta(minutes=1)
+            last_minute = now
+
+        print("🛑 正在停止，等待运行中的任务结束...")
+        server.shutdown()
+        server.server_close()
+        self.socket_path.unlink(missing_ok=True)
+        self.executor.shutdown(wait=True)
+        if self._client is not None:
+            self._client.close()
+
+
+def send_command(command, schedule_path=SCHEDULE_PATH):
+    """向运行中的调度进程发送一条控制命令"""
+    with open(schedule_path, encoding="utf-8") as f:
+        socket_path = os.path.expanduser(json.load(f).get("socket", DEFAULT_SOCKET))
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(10)
+        try:
+            sock.connect(socket_path)
+        except OSError as e:
+            # schedule.json 的 socket 改过但调度进程还没重启时，进程仍在旧路径上监听
+            return f"❌ 无法连接调度进程（{socket_path}）: {e}；修改 socket 后需要重启调度进程"
+        sock.sendall((command + "\n").encode("utf-8"))
+        chunks = []
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks).decode("utf-8").rstrip()
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--run"] and len(args) == 2:
+        print(send_command(f"run {args[1]}"))
+    elif args == ["--list"]:
+        print(send_command("list"))
+    elif args == ["--reload"]:
+        print(send_command("reload"))
+    elif not args:
+        sys.stdout.reconfigure(line_buffering=True)
+        Scheduler().run_forever()
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
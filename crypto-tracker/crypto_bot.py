@@ -11,19 +11,22 @@ import time
 from datetime import datetime
 from pathlib import Path
 
+from digest_sources import collect
+from feishu_client import FeishuClient
+
 # 配置
 CONFIG_PATH = Path.home() / ".openclaw" / "openclaw.json"
 SECRET_PATH = Path.home() / ".openclaw" / "secrets" / "feishu_app_secret"
 RECEIVER_ID = "ou_a44cdd1c2064d3c9c22242b61ff8b926"
 
 
-def load_config():
+def load_config(config_file="config.json"):
     default = {
         "coins": ["bitcoin", "ethereum", "solana", "bnb", "dogecoin"],
         "currency": "cny"
     }
-    if Path("config.json").exists():
-        with open("config.json") as f:
+    if Path(config_file).exists():
+        with open(config_file) as f:
             default.update(json.load(f))
     return default
 
@@ -121,59 +124,39 @@ def format_crypto_message(prices, config):
     return "\n".join(message)
 
 
-def get_tenant_access_token(app_id, app_secret):
-    """获取 tenant_access_token"""
-    url = "https://open.larksuite.com/open-apis/auth/v3/tenant_access_token/internal"
-    resp = requests.post(url, json={"app_id": app_id, "app_secret": app_secret})
-    result = resp.json()
-    return result.get("tenant_access_token") if result.get("code") == 0 else None
-
-
-def send_to_feishu(token, receiver_id, content):
-    """发送飞书消息"""
-    url = "https://open.larksuite.com/open-apis/im/v1/messages"
-    params = {"receive_id_type": "open_id"}
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "receive_id": receiver_id,
-        "msg_type": "text",
-        "content": json.dumps({"text": content})
-    }
-    resp = requests.post(url, params=params, headers=headers, json=data)
-    return resp.json().get("code") == 0
-
-
-def main():
+def main(client=None):
+    """client: 常驻调度进程传入的共享飞书客户端"""
     print(f"\n{'='*50}")
     print(f"📊 加密货币行情 - {datetime.now().strftime('%Y-%m-%d %H:%M')}")
     print(f"{'='*50}\n")
     
-    # 加载配置
-    config = load_config()
-    
-    # 获取价格
-    prices = get_crypto_prices(config.get("coins", []), config.get("currency", "cny"))
+    # 获取并格式化（同一时间段内与其他发送任务共用一次获取结果）
+    result = collect("crypto")
+    if not result:
+        print("❌ 获取加密货币行情失败")
+        return
+    print(result.text)
     
-    # 格式化消息
-    message = format_crypto_message(prices, config)
-    print(message)
+    # 发送到飞书（自己创建的客户端用完关闭，调度进程传入的由调度进程关闭）
+    owns_client = client is None
+    if owns_client:
+        app_config = load_openclaw_config()
+        app_id = app_config.get("channels", {}).get("feishu", {}).get("appId")
+        app_secret = load_secret()
+        if app_id and app_secret:
+            client = FeishuClient(app_id, app_secret)
     
-    # 发送到飞书
-    app_config = load_openclaw_config()
-    app_id = app_config.get("channels", {}).get("feishu", {}).get("appId")
-    app_secret = load_secret()
-    
-    if app_id and app_secret:
-        token = get_tenant_access_token(app_id, app_secret)
-        if token and send_to_feishu(token, RECEIVER_ID, message):
-            print("\n✅ 已发送至飞书！")
+    try:
+        if client:
+            if client.send_card(RECEIVER_ID, result.card("📊 加密货币行情")):
+                print("\n✅ 已发送至飞书！")
+            else:
+                print("\n⚠️ 飞书发送失败")
         else:
-            print("\n⚠️ 飞书发送失败")
-    else:
-        print("\n💡 未配置飞书，仅显示本地")
+            print("\n💡 未配置飞书，仅显示本地")
+    finally:
+        if owns_client and client is not None:
+            client.close()
 
 
 if __name__ == "__main__":
@@ -77,15 +77,19 @@ class DailyReportGenerator:
 """
         return summary
     
-    def run(self) -> str:
-        """Main execution function"""
+    def build_report(self) -> str:
+        """Collect data and generate the report without printing it"""
         # Collect data
         self.report_data["git_commits"] = self.collect_git_commits()
         self.report_data["tasks_completed"] = self.collect_tasks()
         self.report_data["notes"] = self.collect_notes()
         
         # Generate report
-        report = self.generate_summary()
+        return self.generate_summary()
+    
+    def run(self) -> str:
+        """Main execution function"""
+        report = self.build_report()
         
         # Output report
         print(report)
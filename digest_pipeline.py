@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Everything-for-AI 发送流水线
+
+all_sender / daily_sender 的各种模式共用同一套流程，只是选择的来源不同：
+1. 鉴权：获取（或复用缓存的）飞书 token
+2. 获取：所选来源并发获取（digest_sources.collect_many）
+3. 生成卡片：每个来源一张飞书卡片（来源自身的 render 在获取线程里计时）
+4. 投递：写入发件箱并按顺序投递（feishu_outbox）
+
+每个阶段记录为 span 写入 ~/.openclaw/traces/digest.jsonl（digest_trace），运行结束打印本次耗时表
+和各来源获取耗时的滚动 p50 / p95。dry_run=True 时只获取和渲染，不鉴权、不发送。
+
+使用方法：
+    from digest_pipeline import run_pipeline
+    run_pipeline("all_sender", "综合发送", SECTIONS, ["crypto", "exchange"], dry_run=True)
+"""
+
+from datetime import datetime
+
+from digest_sources import SOURCES, collect_many
+from digest_trace import DRY_RUN_SUFFIX, Tracer
+from feishu_outbox import Outbox, PENDING, SENT
+
+RECEIVER_ID = "ou_a44cdd1c2064d3c9c22242b61ff8b926"
+COLLECT_BUDGET = 60  # 所有来源并发获取的总预算（秒）
+DRAIN_TIMEOUT = 30   # 本次运行内等待重试的最长时间，之后交给 feishu_outbox.py 继续投递
+
+
+def run_pipeline(script, title, sections, names, client=None, dry_run=False,
+                 dedup_format="%Y-%m-%d", width=60):
+    """获取所选来源 → 生成卡片 → 发件箱投递，返回 {汇总名: 状态}
+
+    sections: [(来源, 汇总名, 卡片标题), ...]，决定发送顺序
+    dedup_format: 去重周期（同一周期内同一栏目只发送一次），如按小时发送的监控用 "%Y-%m-%d %H"
+    """
+    now = datetime.now()
+    print(f"\n{'='*width}")
+    print(f"📤 {title} - {now.strftime('%Y-%m-%d %H:%M')}{'（dry-run）' if dry_run else ''}")
+    print(f"{'='*width}\n")
+
+    tracer = Tracer(script + (DRY_RUN_SUFFIX if dry_run else ""))
+
+    # 1. 鉴权（提前发现配置 / token 问题；失败时消息仍会入队，等恢复后投递）
+    if not dry_run:
+        if client is None:
+            print("❌ 配置缺失")
+            return {}
+        with tracer.span("token") as span:
+            span["ok"] = bool(client.token())
+        if not span["ok"]:
+            print("⚠️ 获取 token 失败，消息将留在发件箱稍后投递")
+
+    # 2. 获取：并发进行，最慢的来源决定总耗时，超时的来源用缓存
+    print(f"📥 并发获取 {len(names)} 个来源...")
+    fetch_timings = {}
+    sources = collect_many(names, budget=COLLECT_BUDGET, timings=fetch_timings)
+    for name, (elapsed, status, render) in fetch_timings.items():
+        tracer.record("fetch", elapsed, source=name, status=status)
+        if render is not None:  # 在获取线程里计时的 source.render
+            tracer.record("render", render, source=name)
+
+    # 3. 生成卡片
+    results = {}
+    messages = []
+    for name, label, card_title in sections:
+        if name not in sources:
+            continue
+        if not sources[name]:
+            results[label] = "⚠️"
+            continue
+        results[label] = "❌"
+        messages.append((label, sources[name].card(card_title)))
+
+    if dry_run:
+        for label, card in messages:
+            results[label] = "🧪"
+            text = card["elements"][0]["text"]["content"]
+            print(f"   🃏 {card['header']['title']['content']}（{len(text)} 字）")
+    else:
+        # 4. 投递：先写入发件箱（同一周期同一栏目只入队一次），再按顺序投递；未送达的留给下次 drain
+        outbox = Outbox()
+        period = now.strftime(dedup_format)
+        queued = {}
+        for label, card in messages:
+            message_id = outbox.enqueue(RECEIVER_ID, card, msg_type="interactive",
+                                        dedup_key=f"{script}:{period}:{label}")
+            if message_id is None:
+                results[label] = "⏭️"
+            else:
+                queued[label] = message_id
+
+        print(f"📨 发送 {len(queued)} 条消息...")
+        outbox.drain(client, timeout=DRAIN_TIMEOUT, tracer=tracer)
+        statuses = outbox.statuses(queued.values())
+        for label, message_id in queued.items():
+            status = statuses.get(message_id)
+            results[label] = "✅" if status == SENT else "⏳" if status == PENDING else "❌"
+        outbox.close()
+
+    # 汇总
+    print(f"\n{'='*width}")
+    print("📊 发送结果汇总:")
+    for item, status in results.items():
+        print(f"   {status} {item}")
+    tracer.finish()
+    tracer.print_summary(width, labels={name: source.label for name, source in SOURCES.items()})
+    return results
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Everything-for-AI 内容来源插件
+
+各机器人模块在本进程内只导入一次，直接调用其方法拿到原始数据和格式化好的文本（SourceResult），
+不再为每个来源单独启动一个 python3 子进程，也不再解析子进程输出。
+
+多个来源并发获取：每个来源有自己的截止时间，整体另有总预算；
+超时或失败的来源返回上次成功的缓存结果（标注为缓存），总耗时取决于最慢的来源而不是所有来源之和。
+
+获取结果按 (来源, 配置文件哈希, 时间段) 缓存在 ~/.openclaw/cache/sources/，时间段长度为来源的 ttl：
+同一时间段内的其他发送任务（如 08:00 的 crypto_bot 和 all_sender）直接复用，不再重复请求行情 / 新闻接口。
+同一来源同一时刻只有一个进程在获取，其余等待后读取其结果。
+
+使用方法：
+    from digest_sources import collect, collect_many
+    quote = collect("inspiration").text
+    prices = collect("crypto", use_cache=False).data   # 跳过缓存，强制重新获取
+    results = collect_many(["inspiration", "weather", "news"], budget=60)
+    card = results["news"].card("📰 每日新闻")
+"""
+
+import fcntl
+import hashlib
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent
+LAST_GOOD_PATH = Path.home() / ".openclaw" / "cache" / "digest_last_good.json"
+SOURCE_CACHE_DIR = Path.home() / ".openclaw" / "cache" / "sources"
+
+
+class Source:
+    """一个内容来源：所在目录、模块名和生成消息的函数
+
+    ttl 为结果可复用的时间段长度（秒），0 表示每次都重新获取。
+    """
+
+    def __init__(self, name, label, directory, module, render, timeout=30, ttl=0):
+        self.name = name
+        self.label = label
+        self.directory = REPO_DIR / directory
+        self.module = module
+        self.render = render
+        self.timeout = timeout
+        self.ttl = ttl
+
+    @property
+    def config_file(self):
+        return str(self.directory / "config.json")
+
+
+class SourceResult:
+    """一个来源的获取结果：原始数据 + 渲染好的文本
+
+    data 为机器人返回的原始数据（可 JSON 序列化），alerts 为需要醒目提示的预警，
+    note 为降级说明（如使用了缓存）。发送方直接用 card() 生成飞书卡片，不再解析文本。
+    """
+
+    def __init__(self, source, text, data=None, alerts=None, fetched_at=None, note=""):
+        self.source = source
+        self.text = text.strip()
+        self.data = data
+        self.alerts = alerts or []
+        self.fetched_at = fetched_at or datetime.now().strftime("%m-%d %H:%M")
+        self.note = note
+
+    @property
+    def full_text(self):
+        """纯文本消息（带降级说明）"""
+        return f"{self.note}\n\n{self.text}" if self.note else self.text
+
+    def card(self, title):
+        """飞书消息卡片：有预警时标题栏为红色，降级说明放在底部备注"""
+        elements = [{"tag": "div", "text": {"tag": "lark_md", "content": self.text}}]
+        if self.note:
+            elements.append({"tag": "note", "elements": [{"tag": "plain_text", "content": self.note}]})
+        return {
+            "config": {"wide_screen_mode": True},
+            "header": {
+                "title": {"tag": "plain_text", "content": title},
+                "template": "red" if self.alerts else "blue",
+            },
+            "elements": elements,
+        }
+
+    def to_dict(self):
+        return {"source": self.source, "text": self.text, "data": self.data, "alerts": self.alerts,
+                "fetched_at": self.fetched_at, "note": self.note}
+
+    @classmethod
+    def from_dict(cls, entry):
+        return cls(entry["source"], entry["text"], entry.get("data"), entry.get("alerts"),
+                   entry.get("fetched_at"), entry.get("note", ""))
+
+
+def _inspiration(module, source):
+    return SourceResult(source.name, module.InspirationBot(source.config_file).get_daily_quote())
+
+
+def _weather(module, source):
+    bot = module.WeatherBot(source.config_file)
+    weathers = bot.get_all_weather()
+    return SourceResult(source.name, bot.get_all_weather_message(weathers), data=weathers)
+
+
+def _stocks(module, source):
+    history_file = str(source.directory / "stock_history.json")
+    result = module.StockReminder(source.config_file, history_file=history_file).build_result(compact=True)
+    return SourceResult(source.name, result["message"], data=result["stocks"], alerts=result["alerts"])
+
+
+def _crypto(module, source):
+    config = module.load_config(source.config_file)
+    prices = module.get_crypto_prices(config.get("coins", []), config.get("currency", "cny"))
+    if not prices:
+        raise RuntimeError("行情接口无数据")  # 不缓存空结果
+    return SourceResult(source.name, module.format_crypto_message(prices, config), data=prices)
+
+
+def _exchange(module, source):
+    config = module.load_config(source.config_file)
+    rates = module.get_exchange_rates(config.get("pairs", []), config.get("base", "CNY"))
+    if not rates:
+        raise RuntimeError("汇率接口无数据")
+    return SourceResult(source.name, module.format_exchange_message(rates, config), data=rates)
+
+
+def _jokes(module, source):
+    bot = module.JokeBot()
+    jokes = bot.get_jokes()
+    return SourceResult(source.name, bot.format_message(jokes), data=jokes)
+
+
+def _news(module, source):
+    bot = module.NewsDigestBot(source.config_file)
+    fetched = bot.fetch_all()
+    return SourceResult(source.name, bot.build_message(fetched), data=fetched)
+
+
+def _daily_report(module, source):
+    bot = module.DailyReportGenerator(source.config_file)
+    report = bot.build_report()
+    return SourceResult(source.name, report, data=bot.report_data)
+
+
+def _weekly_summary(module, source):
+    bot = module.WeeklySummaryBot(source.config_file)
+    data = bot.collect_weekly_data()
+    return SourceResult(source.name, bot.generate_summary(data), data=data)
+
+
+def _server_status(module, source):
+    config = module.load_config(source.config_file)
+    status = module.get_all_status()
+    alerts = module.check_alerts(status, config)
+    return SourceResult(source.name, module.format_message(status, alerts, config), data=status, alerts=alerts)
+
+
+SOURCES = {
+    source.name: source
+    for source in [
+        Source("inspiration", "名言", "inspiration-bot", "quote_bot", _inspiration, ttl=3600),
+        Source("weather", "天气", "weather-bot", "weather_bot", _weather, ttl=1800),
+        Source("stocks", "股市", "stock-reminder", "stock_bot", _stocks, ttl=600),
+        Source("crypto", "加密货币", "crypto-tracker", "crypto_bot", _crypto, ttl=600),
+        Source("exchange", "汇率", "exchange-rate-monitor", "exchange_bot", _exchange, ttl=1800),
+        Source("jokes", "笑话", "joke-bot", "joke_bot", _jokes, ttl=3600),
+        Source("news", "新闻", "news-digest-bot", "news_bot", _news, timeout=60, ttl=1800),
+        Source("daily_report", "日报", "daily-report-generator", "daily", _daily_report, timeout=60, ttl=600),
+        Source("weekly_summary", "周报", "weekly-summary", "weekly_summary", _weekly_summary, timeout=60,
+               ttl=3600),
+        Source("server_status", "服务器", "server-monitor", "monitor", _server_status),  # 实时状态，不缓存
+    ]
+}
+
+
+def import_from(directory, module):
+    """从子项目目录导入模块（每个进程只导入一次）"""
+    if module in sys.modules:
+        return sys.modules[module]
+    # 模块之间用同目录导入（如 stock_bot -> stock_api），需要把目录加入搜索路径
+    directory = str(REPO_DIR / directory)
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    return importlib.import_module(module)
+
+
+def load_module(source):
+    return import_from(source.directory, source.module)
+
+
+def cache_key(source, now=None):
+    """(来源, 配置文件哈希, 时间段)：配置改动或进入下一个时间段后重新获取"""
+    try:
+        with open(source.config_file, "rb") as f:
+            config_hash = hashlib.sha1(f.read()).hexdigest()[:12]
+    except OSError:
+        config_hash = "default"
+    bucket = int((now if now is not None else time.time()) // source.ttl)
+    return f"{source.name}:{config_hash}:{bucket}"
+
+
+def _read_cached(path, key):
+    try:
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+        if entry.get("key") == key:
+            return SourceResult.from_dict(entry["result"])
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def _write_cached(path, key, result):
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "result": result.to_dict()}, f, ensure_ascii=False, separators=(",", ":"),
+                  default=str)
+    tmp_path.replace(path)
+
+
+def _render(source, timing=None):
+    try:
+        module = load_module(source)
+        started = time.monotonic()
+        try:
+            result = source.render(module, source)
+        finally:
+            if timing is not None:
+                timing["render"] = time.monotonic() - started
+    except Exception as e:
+        print(f"获取{source.label}失败: {e}")
+        return None
+    return result if result and result.text else None
+
+
+def collect(name, use_cache=True, timing=None):
+    """获取一个来源的 SourceResult（同一时间段内复用已有结果），失败返回 None
+
+    传入 timing 字典时记录 render（source.render 耗时秒数），复用缓存时记录 cached=True。
+    """
+    source = SOURCES[name]
+    if not source.ttl or not use_cache:
+        return _render(source, timing)
+
+    key = cache_key(source)
+    path = SOURCE_CACHE_DIR / f"{source.name}.json"
+    SOURCE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(path.with_suffix(".lock"), "a") as lock:
+        # 持锁获取：同时运行的任务只有一个去请求接口，其余等它写入缓存
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            result = _read_cached(path, key)
+            if result is not None:
+                print(f"♻️ {source.label}复用 {result.fetched_at} 的获取结果")
+                if timing is not None:
+                    timing["cached"] = True
+                return result
+            result = _render(source, timing)
+            if result is not None:
+                try:
+                    _write_cached(path, key, result)
+                except OSError as e:
+                    print(f"保存{source.label}缓存失败: {e}")
+            return result
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def load_last_good():
+    if LAST_GOOD_PATH.exists():
+        try:
+            with open(LAST_GOOD_PATH, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def save_last_good(entries):
+    LAST_GOOD_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = LAST_GOOD_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, separators=(",", ":"), default=str)
+    tmp_path.replace(LAST_GOOD_PATH)
+
+
+def degraded(name, last_good, reason):
+    """超时或失败时的降级结果：上次成功的内容（注明时间），没有则返回 None"""
+    entry = last_good.get(name)
+    label = SOURCES[name].label
+    if not entry:
+        print(f"⚠️ {label}{reason}，无缓存可用")
+        return None
+    print(f"⚠️ {label}{reason}，使用 {entry['time']} 的缓存")
+    if "result" in entry:
+        result = SourceResult.from_dict(entry["result"])
+    else:
+        result = SourceResult(name, entry["text"])  # 旧版缓存只有文本
+    result.note = f"⚠️ 数据获取{reason}，以下为 {entry['time']} 的缓存"
+    return result
+
+
+def collect_many(names, budget=60, timings=None):
+    """并发获取多个来源，返回 {来源: SourceResult 或 None}
+
+    每个来源最多等待 min(来源 timeout, 总预算)，从同一起点计时。
+    获取线程为守护线程，超时的来源不会拖住进程退出。
+    传入 timings 字典时记录各来源的 (获取耗时秒数, "ok" / "cached" / "failed" / "timeout", render 耗时秒数)：
+    超时的耗时为实际等待时间；复用缓存或超时时 render 耗时为 None。
+    """
+    started = time.monotonic()
+    results = {}
+    finished = {}
+    done = {}
+    details = {name: {} for name in names}
+
+    def worker(name):
+        results[name] = collect(name, timing=details[name])
+        finished[name] = time.monotonic()
+        done[name].set()
+
+    for name in names:
+        done[name] = threading.Event()
+        threading.Thread(target=worker, args=(name,), name=f"source-{name}", daemon=True).start()
+
+    last_good = load_last_good()
+    updated = False
+    collected = {}
+    for name in names:
+        deadline = started + min(SOURCES[name].timeout, budget)
+        if not done[name].wait(max(0.0, deadline - time.monotonic())):
+            collected[name] = degraded(name, last_good, "超时")
+            if timings is not None:
+                timings[name] = (time.monotonic() - started, "timeout", None)
+            continue
+        if timings is not None:
+            detail = details[name]
+            if results.get(name) is None:
+                status = "failed"
+            else:
+                status = "cached" if detail.get("cached") else "ok"
+            timings[name] = (finished[name] - started, status, detail.get("render"))
+        if results.get(name) is None:
+            collected[name] = degraded(name, last_good, "失败")
+        else:
+            collected[name] = results[name]
+            last_good[name] = {"result": results[name].to_dict(), "time": datetime.now().strftime("%m-%d %H:%M")}
+            updated = True
+
+    if updated:
+        try:
+            save_last_good(last_good)
+        except OSError as e:
+            print(f"保存缓存失败: {e}")
+    return collected
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Everything-for-AI 发送流水线耗时追踪
+
+每次运行生成一组 span（token / fetch / render / send），追加写入
+~/.openclaw/traces/digest.jsonl（每行一个 span）；运行结束时打印本次各阶段耗时，
+并按最近的记录计算每个来源获取耗时的 p50 / p95，找出拖慢早间推送的上游。
+
+使用方法：
+    from digest_trace import Tracer
+    tracer = Tracer("all_sender.all")
+    with tracer.span("token"):
+        client.token()
+    tracer.record("fetch", 1.23, source="news")
+    tracer.finish()
+
+python3 digest_trace.py            # 查看最近 7 天各来源获取耗时的 p50 / p95
+python3 digest_trace.py --days 1
+"""
+
+import json
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+TRACE_PATH = Path.home() / ".openclaw" / "traces" / "digest.jsonl"
+MAX_TRACE_BYTES = 5 * 1024 * 1024  # 超过后轮转为 digest.jsonl.1
+ROLLING_DAYS = 7
+DRY_RUN_SUFFIX = ".dry-run"  # dry-run 的 run 名称后缀，滚动统计时排除
+
+
+def percentile(values, q):
+    """线性插值百分位数，values 需已排序"""
+    if not values:
+        return None
+    position = (len(values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+class Tracer:
+    """记录一次运行的各个 span（线程安全）"""
+
+    def __init__(self, run, path=TRACE_PATH):
+        self.run = run
+        self.run_id = uuid.uuid4().hex[:12]
+        self.path = Path(path)
+        self.spans = []
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+
+    def record(self, name, duration, **attrs):
+        """记录一个已计时的 span（duration 为秒）"""
+        span = {"run": self.run, "run_id": self.run_id, "span": name,
+                "ts": round(time.time(), 3), "duration": round(duration, 4)}
+        span.update(attrs)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """计时一段代码；代码内抛出的异常记录为 error 后继续抛出"""
+        started = time.monotonic()
+        try:
+            yield attrs
+        except Exception as e:
+            attrs["error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            self.record(name, time.monotonic() - started, **attrs)
+
+    def finish(self):
+        """写入本次运行的所有 span（加一条 run 汇总），写入失败不影响发送"""
+        self.record("run", time.monotonic() - self._started)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists() and self.path.stat().st_size > MAX_TRACE_BYTES:
+                self.path.replace(self.path.with_name(self.path.name + ".1"))
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                for span in self.spans:
+                    f.write(json.dumps(span, ensure_ascii=False, separators=(",", ":")) + "\n")
+        except OSError as e:
+            print(f"写入追踪记录失败: {e}")
+
+    def summary(self):
+        """本次运行各类 span 的次数、总耗时和最大耗时：[(span, 次数, 总耗时, 最大耗时, 最慢的对象)]"""
+        groups = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            if span["span"] == "run":
+                continue
+            group = groups.setdefault(span["span"], [0, 0.0, -1.0, ""])
+            group[0] += 1
+            group[1] += span["duration"]
+            if span["duration"] > group[2]:
+                group[2], group[3] = span["duration"], _subject(span)
+        return [(name, count, total, longest, subject) for name, (count, total, longest, subject) in groups.items()]
+
+    def print_summary(self, width=60, labels=None):
+        """打印本次运行的耗时表和各来源的滚动 p50 / p95"""
+        print(f"\n{'='*width}")
+        print("⏱️ 各阶段耗时:")
+        print(f"   {'阶段':<8}{'次数':>6}{'总耗时':>10}{'最慢':>10}  最慢对象")
+        for name, count, total, longest, subject in self.summary():
+            print(f"   {name:<10}{count:>6}{total:>11.2f}s{longest:>9.2f}s  {subject}")
+
+        with self._lock:  # 超过截止时间的来源仍可能在取数线程里追加 span
+            fetches = [span for span in self.spans if span["span"] == "fetch"]
+        if fetches:
+            rolling = rolling_fetch_stats(self.path)
+            print(f"\n   {'来源':<14}{'本次':>8}{'p50':>9}{'p95':>9}  (最近 {ROLLING_DAYS} 天)")
+            for span in sorted(fetches, key=lambda s: -s["duration"]):
+                source = span["source"]
+                now = f"{span['duration']:.2f}s" + {"timeout": "⏰", "failed": "❌", "cached": "♻️"}.get(span.get("status"), "")
+                p50, p95, _ = rolling.get(source, (None, None, 0))
+                label = (labels or {}).get(source, source)
+                print(f"   {label:<14}{now:>8}{_fmt(p50):>9}{_fmt(p95):>9}")
+        print(f"{'='*width}\n")
+
+
+def _subject(span):
+    return span.get("source") or span.get("section") or span.get("message") or ""
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.2f}s"
+
+
+def load_spans(path=TRACE_PATH, days=ROLLING_DAYS):
+    """读取最近 days 天的 span（含已轮转的文件）"""
+    path = Path(path)
+    since = time.time() - days * 86400
+    spans = []
+    for candidate in (path.with_name(path.name + ".1"), path):
+        if not candidate.exists():
+            continue
+        with open(candidate, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    span = json.loads(line)
+                except ValueError:
+                    continue
+                if span.get("ts", 0) >= since:
+                    spans.append(span)
+    return spans
+
+
+def rolling_fetch_stats(path=TRACE_PATH, days=ROLLING_DAYS):
+    """各来源获取耗时的滚动统计 {来源: (p50, p95, 次数)}（超时按实际等待时间计）
+
+    复用缓存的获取（耗时约为 0）和 dry-run 的记录不计入，只统计真正请求上游的耗时。
+    """
+    durations = {}
+    for span in load_spans(path, days):
+        if span.get("span") != "fetch" or span.get("status") == "cached":
+            continue
+        if span.get("run", "").endswith(DRY_RUN_SUFFIX):
+            continue
+        durations.setdefault(span["source"], []).append(span["duration"])
+    stats = {}
+    for source, values in durations.items():
+        values.sort()
+        stats[source] = (percentile(values, 0.5), percentile(values, 0.95), len(values))
+    return stats
+
+
+def main():
+    days = ROLLING_DAYS
+    if "--days" in sys.argv:
+        days = float(sys.argv[sys.argv.index("--days") + 1])
+    stats = rolling_fetch_stats(days=days)
+    if not stats:
+        print("暂无追踪记录")
+        return
+    print(f"📊 最近 {days:g} 天各来源获取耗时（截至 {datetime.now().strftime('%Y-%m-%d %H:%M')}）")
+    print(f"   {'来源':<16}{'次数':>6}{'p50':>10}{'p95':>10}")
+    for source, (p50, p95, count) in sorted(stats.items(), key=lambda item: -(item[1][1] or 0)):
+        print(f"   {source:<18}{count:>6}{_fmt(p50):>10}{_fmt(p95):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+飞书消息发送客户端
+
+各脚本共用的发送实现：
+- 复用同一个 requests.Session（keep-alive 连接池），所有请求带超时
+- 遇到限流码 / 429 / 5xx / 网络错误按退避重试，token 失效时换新 token 重发一次
+- send_many() 并发发送多条消息，整体速率不超过应用的 QPS 限制
+
+使用方法：
+    from feishu_client import FeishuClient
+    client = FeishuClient(app_id, app_secret)
+    client.send_text(receiver_id, "hello")
+    client.send_card(receiver_id, {"header": {...}, "elements": [...]})
+    client.send_many([(receiver_id, "a"), (receiver_id, "b")])
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from feishu_token import get_tenant_access_token, invalidate
+
+MESSAGE_URL = "https://open.larksuite.com/open-apis/im/v1/messages"
+
+# 频率限制
+THROTTLE_CODES = {99991400, 230020}
+# token 无效 / 过期
+TOKEN_CODES = {99991661, 99991663, 99991668}
+
+
+class FeishuClient:
+    """飞书消息发送（线程安全）"""
+
+    def __init__(self, app_id, app_secret, qps=5, max_workers=5, timeout=10, max_retries=3):
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.qps = qps
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # 按 QPS 均匀排队：每个请求占一个时间槽
+        self._rate_lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def token(self):
+        return get_tenant_access_token(self.app_id, self.app_secret, session=self.session)
+
+    def _wait_for_slot(self):
+        with self._rate_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.qps
+        if slot > now:
+            time.sleep(slot - now)
+
+    @staticmethod
+    def _retry_after(response):
+        """服务端给出的限流重置秒数，没有则返回 None"""
+        reset = response.headers.get("x-ogw-ratelimit-reset") or response.headers.get("Retry-After")
+        try:
+            return min(float(reset), 30.0)
+        except (TypeError, ValueError):
+            return None
+
+    def try_send(self, receiver_id, msg_type, content, receive_id_type="open_id"):
+        """发送一次（token 失效时换新 token 重发），不做退避重试
+
+        返回 (是否成功, 是否值得重试, 错误信息, 服务端建议的等待秒数或 None)。
+        """
+        data = {
+            "receive_id": receiver_id,
+            "msg_type": msg_type,
+            "content": json.dumps(content, ensure_ascii=False),
+        }
+        for token_attempt in range(2):
+            token = self.token()
+            if not token:
+                return False, True, "获取 token 失败", None
+
+            self._wait_for_slot()
+            try:
+                resp = self.session.post(
+                    MESSAGE_URL,
+                    params={"receive_id_type": receive_id_type},
+                    headers={"Authorization": f"Bearer {token}",
+                             "Content-Type": "application/json; charset=utf-8"},
+                    json=data,
+                    timeout=self.timeout,
+                )
+                result = resp.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                return False, True, str(e), None
+
+            code = result.get("code")
+            if code == 0:
+                return True, False, "", None
+            if code in TOKEN_CODES and token_attempt == 0:
+                # token 被提前作废：换新 token 重发
+                invalidate(self.app_id, token)
+                continue
+            error = f"{code} {result.get('msg', '')}".strip()
+            if code in THROTTLE_CODES or resp.status_code == 429 or resp.status_code >= 500:
+                return False, True, error, self._retry_after(resp)
+            return False, False, error, None
+        return False, True, "token 无效", None
+
+    def send(self, receiver_id, msg_type, content, receive_id_type="open_id"):
+        """发送一条消息，content 为消息内容 dict，成功返回 True"""
+        for attempt in range(self.max_retries):
+            ok, retryable, error, wait = self.try_send(receiver_id, msg_type, content, receive_id_type)
+            if ok:
+                return True
+            if not retryable:
+                print(f"飞书发送失败: {error}")
+                return False
+            print(f"飞书发送失败 (attempt {attempt + 1}/{self.max_retries}): {error}")
+            if attempt + 1 < self.max_retries:
+                time.sleep(wait if wait is not None else 0.5 * 2 ** attempt)  # 指数退避
+        return False
+
+    def send_text(self, receiver_id, text, receive_id_type="open_id"):
+        return self.send(receiver_id, "text", {"text": text}, receive_id_type)
+
+    def send_card(self, receiver_id, card, receive_id_type="open_id"):
+        """发送消息卡片（interactive），card 为卡片 dict"""
+        return self.send(receiver_id, "interactive", card, receive_id_type)
+
+    def send_many(self, messages):
+        """并发发送多条文本消息 [(receiver_id, text), ...]，按顺序返回是否成功
+
+        并发发送时同一接收者收到的顺序不保证与列表顺序一致。
+        """
+        if not messages:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(messages)),
+                                thread_name_prefix="feishu-send") as executor:
+            return list(executor.map(lambda message: self.send_text(*message), messages))
+
+    def close(self):
+        self.session.close()
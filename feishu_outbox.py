@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+飞书消息发件箱（SQLite）
+
+发送方只把渲染好的消息写入发件箱，由 drain 负责投递：
+- 消息持久化在 ~/.openclaw/feishu_outbox.sqlite3，进程重启、飞书故障都不会丢
+- dedup_key 相同的消息只入队一次（如 "all_sender:2026-01-05:新闻"）
+- 同一接收者严格按入队顺序投递；失败按指数退避重试，超过 MAX_AGE 仍未送达的标记为 dead
+- 不同接收者并发投递，整体速率由 FeishuClient 的 QPS 限制
+- 同一时间只有一个 drain 在运行（文件锁），积压的消息在故障恢复后按最大允许速率发出
+
+使用方法：
+python3 feishu_outbox.py              # 投递积压消息（可放进 crontab 每几分钟跑一次）
+python3 feishu_outbox.py --status     # 查看队列状态
+"""
+
+import fcntl
+import json
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+OUTBOX_PATH = Path.home() / ".openclaw" / "feishu_outbox.sqlite3"
+CONFIG_PATH = Path.home() / ".openclaw" / "openclaw.json"
+SECRET_PATH = Path.home() / ".openclaw" / "secrets" / "feishu_app_secret"
+
+PENDING = "pending"
+SENT = "sent"
+DEAD = "dead"
+
+MAX_AGE = 24 * 3600      # 超过一天仍未送达就放弃
+MAX_BACKOFF = 30 * 60    # 重试间隔上限
+MIN_BACKOFF = 1          # 重试间隔下限（Retry-After: 0 时也不原地重试）
+KEEP_SENT = 7 * 86400    # 已发送记录保留 7 天（用于去重）
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key TEXT UNIQUE,
+    receiver_id TEXT NOT NULL,
+    receive_id_type TEXT NOT NULL,
+    msg_type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    sent_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (status, receiver_id, id);
+"""
+
+
+class Outbox:
+    """SQLite 发件箱（可在多个线程 / 进程间共用同一个文件）"""
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def enqueue(self, receiver_id, content, msg_type="text", dedup_key=None, receive_id_type="open_id"):
+        """入队一条消息，content 为文本或消息内容 dict
+
+        返回消息 ID；dedup_key 已存在时返回 None。
+        """
+        if isinstance(content, str):
+            content = {"text": content}
+        now = time.time()
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO outbox (dedup_key, receiver_id, receive_id_type, msg_type, content,"
+                " status, created_at, next_attempt_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (dedup_key, receiver_id, receive_id_type, msg_type,
+                 json.dumps(content, ensure_ascii=False), PENDING, now, now),
+            )
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def statuses(self, ids):
+        """{消息 ID: 状态}"""
+        ids = [i for i in ids if i is not None]
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT id, status FROM outbox WHERE id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()
+        return dict(rows)
+
+    def counts(self):
+        with self._lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def _due_heads(self, now):
+        """每个接收者最早的一条待发消息（未到重试时间的接收者跳过，保证顺序）"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT o.id, o.receiver_id, o.receive_id_type, o.msg_type, o.content, o.attempts, o.created_at"
+                " FROM outbox o JOIN (SELECT MIN(id) AS id FROM outbox WHERE status = ? GROUP BY receiver_id) h"
+                " ON o.id = h.id WHERE o.next_attempt_at <= ?",
+                (PENDING, now),
+            ).fetchall()
+
+    def _next_due(self):
+        """各接收者队首消息中最早的重试时间（排在后面的消息要等队首送达）"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MIN(o.next_attempt_at) FROM outbox o JOIN (SELECT MIN(id) AS id FROM outbox"
+                " WHERE status = ? GROUP BY receiver_id) h ON o.id = h.id",
+                (PENDING,),
+            ).fetchone()
+        return row[0]
+
+    def _mark_sent(self, message_id):
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE outbox SET status = ?, sent_at = ?, attempts = attempts + 1,"
+                              " last_error = NULL WHERE id = ?", (SENT, time.time(), message_id))
+
+    def _mark_failed(self, message_id, attempts, created_at, error, retryable, wait=None):
+        now = time.time()
+        if not retryable or now - created_at > MAX_AGE:
+            status, next_attempt = DEAD, now
+        else:
+            status = PENDING
+            backoff = wait if wait is not None else min(MAX_BACKOFF, 5 * 2 ** attempts)
+            next_attempt = now + max(backoff, MIN_BACKOFF)
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE outbox SET status = ?, attempts = attempts + 1, next_attempt_at = ?,"
+                              " last_error = ? WHERE id = ?", (status, next_attempt, error, message_id))
+        return status
+
+    def _deliver(self, client, row, tracer=None):
+        message_id, receiver_id, receive_id_type, msg_type, content, attempts, created_at = row
+        started = time.monotonic()
+        ok, retryable, error, wait = client.try_send(receiver_id, msg_type, json.loads(content), receive_id_type)
+        if tracer is not None:
+            tracer.record("send", time.monotonic() - started, message=message_id, ok=ok, error=error or None)
+        if ok:
+            self._mark_sent(message_id)
+            return True
+        status = self._mark_failed(message_id, attempts, created_at, error, retryable, wait)
+        print(f"{'❌ 放弃' if status == DEAD else '⏳ 稍后重试'} 消息 {message_id}: {error}")
+        return False
+
+    def drain(self, client, timeout=0.0, max_workers=5, tracer=None):
+        """投递到期的消息，返回成功条数
+
+        timeout 秒内会等待退避中的消息再次到期，到时间即返回；为 0 时投递完已到期的消息就返回，不等待退避。
+        已有其他 drain 在运行时直接返回 0。传入 tracer（digest_trace.Tracer）时每次发送记录一个 send span。
+        """
+        lock = open(self.path.with_suffix(".lock"), "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return 0
+
+        deadline = time.monotonic() + timeout
+        delivered = 0
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="outbox") as executor:
+                while True:
+                    # timeout 为 0 时不设上限：失败的消息至少退避 MIN_BACKOFF，不会原地重试
+                    if timeout and time.monotonic() >= deadline:
+                        break
+                    heads = self._due_heads(time.time())
+                    if heads:
+                        delivered += sum(executor.map(lambda row: self._deliver(client, row, tracer), heads))
+                        continue
+                    next_due = self._next_due()
+                    if next_due is None:
+                        break
+                    wait = next_due - time.time()
+                    if time.monotonic() + wait > deadline:
+                        break
+                    time.sleep(max(0.0, wait))
+            self.purge()
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+        return delivered
+
+    def purge(self):
+        """清理过期的已发送 / 已放弃记录"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM outbox WHERE status != ? AND created_at < ?",
+                              (PENDING, time.time() - KEEP_SENT))
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    outbox = Outbox()
+    if "--status" in sys.argv:
+        print(f"📮 发件箱: {outbox.counts()}")
+        return
+
+    from feishu_client import FeishuClient
+
+    app_id = None
+    if CONFIG_PATH.exists():
+        with open(CONFIG_PATH) as f:
+            app_id = json.load(f).get("channels", {}).get("feishu", {}).get("appId")
+    app_secret = SECRET_PATH.read_text().strip() if SECRET_PATH.exists() else None
+    if not app_id or not app_secret:
+        print("❌ 配置缺失")
+        return
+
+    client = FeishuClient(app_id, app_secret)
+    delivered = outbox.drain(client)
+    print(f"📮 已投递 {delivered} 条，队列: {outbox.counts()}")
+    client.close()
+    outbox.close()
+
+
+if __name__ == "__main__":
+    main()
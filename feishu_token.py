@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+飞书 tenant_access_token 共享缓存
+
+token 有效期内各脚本共用同一个 token，不再每次运行都请求一次鉴权接口：
+- 缓存在 ~/.openclaw/cache/feishu_token.json（按 app_id 区分，不保存 app_secret）
+- 按接口返回的 expire 计算过期时间，剩余不足 REFRESH_AHEAD 秒时提前刷新
+- 刷新时持有文件锁，同时运行的多个定时任务只会有一个去请求，其余等锁后直接读取新 token
+
+使用方法：
+    from feishu_token import get_tenant_access_token
+    token = get_tenant_access_token(app_id, app_secret)
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+TOKEN_URL = "https://open.larksuite.com/open-apis/auth/v3/tenant_access_token/internal"
+CACHE_PATH = Path.home() / ".openclaw" / "cache" / "feishu_token.json"
+LOCK_PATH = CACHE_PATH.with_suffix(".lock")
+REFRESH_AHEAD = 600  # 距过期不足 10 分钟时提前刷新
+
+# 同一进程内的线程共用
+_memory = {}
+_thread_lock = threading.Lock()
+
+
+def _read_cache():
+    try:
+        with open(CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache(entries):
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = CACHE_PATH.with_suffix(f".{os.getpid()}.tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(entries, f)
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def _fresh(entry):
+    return bool(entry) and entry.get("expires_at", 0) - time.time() > REFRESH_AHEAD
+
+
+def _request_token(app_id, app_secret, session=None):
+    """请求新 token，返回缓存条目，失败返回 None"""
+    try:
+        resp = (session or requests).post(TOKEN_URL, json={"app_id": app_id, "app_secret": app_secret},
+                                          timeout=10)
+        result = resp.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"获取 tenant_access_token 失败: {e}")
+        return None
+    if result.get("code") != 0:
+        print(f"获取 tenant_access_token 失败: {result.get('code')} {result.get('msg', '')}")
+        return None
+    return {
+        "token": result["tenant_access_token"],
+        "expires_at": time.time() + result.get("expire", 7200),
+    }
+
+
+def get_tenant_access_token(app_id, app_secret, session=None):
+    """获取 tenant_access_token（优先使用缓存），失败返回 None"""
+    if not app_id or not app_secret:
+        return None
+
+    with _thread_lock:
+        entry = _memory.get(app_id)
+        if _fresh(entry):
+            return entry["token"]
+
+        entry = _read_cache().get(app_id)
+        if _fresh(entry):
+            _memory[app_id] = entry
+            return entry["token"]
+
+        LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(LOCK_PATH, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # 等锁期间可能已有其他进程刷新过
+                entries = _read_cache()
+                entry = entries.get(app_id)
+                if not _fresh(entry):
+                    refreshed = _request_token(app_id, app_secret, session)
+                    if refreshed is not None:
+                        entry = entries[app_id] = refreshed
+                        _write_cache(entries)
+                    elif not entry or entry.get("expires_at", 0) <= time.time():
+                        return None
+                    # 提前刷新失败但旧 token 尚未过期：继续使用旧 token
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        _memory[app_id] = entry
+        return entry["token"]
+
+
+def invalidate(app_id, token=None):
+    """token 被服务端判定无效时调用，下次获取会重新请求
+
+    传入 token 时只在缓存中仍是该 token 时才清除，避免清掉其他进程刚刷新的新 token。
+    """
+    with _thread_lock:
+        if token is None or _memory.get(app_id, {}).get("token") == token:
+            _memory.pop(app_id, None)
+        LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(LOCK_PATH, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                entries = _read_cache()
+                if app_id in entries and (token is None or entries[app_id].get("token") == token):
+                    del entries[app_id]
+                    _write_cache(entries)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
@@ -56,9 +56,10 @@ class JokeBot:
         all_jokes = self.jokes + self.programmer_jokes
         return random.sample(all_jokes, min(5, len(all_jokes)))
     
-    def format_message(self) -> str:
+    def format_message(self, jokes: List[str] = None) -> str:
         """格式化消息"""
-        jokes = self.get_jokes()
+        if jokes is None:
+            jokes = self.get_jokes()
         lines = [f"😄 每日一笑 - {datetime.now().strftime('%m/%d')}\n"]
         
         for i, joke in enumerate(jokes, 1):
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Comment Counts - 帖子评论数预取与缓存
+优先使用动态流里自带的评论数字段，缺失的再并发请求 limit=1 获取
+"""
+
+import time
+from typing import Dict, List, Optional
+
+# 动态流中可能携带评论数的字段
+COUNT_FIELDS = ("comment_count", "comments_count", "reply_count", "replies_count", "num_comments")
+
+
+def count_from_post(post: Dict) -> Optional[int]:
+    """从帖子数据中读取评论数，没有则返回 None"""
+    for field in COUNT_FIELDS:
+        value = post.get(field)
+        if isinstance(value, int):
+            return value
+    if isinstance(post.get("comments"), list):
+        return len(post["comments"])
+    return None
+
+
+def count_from_response(data: Dict) -> int:
+    """从评论接口的响应中读取评论数（limit=1 时优先用总数字段）"""
+    for field in ("count", "total", "total_count"):
+        value = data.get(field)
+        if isinstance(value, int):
+            return value
+    return len(data.get("comments", []))
+
+
+class CommentCountCache:
+    """按帖子缓存评论数
+
+    评论数只增不减：动态流里的旧数据不会覆盖更大的缓存值（过期的也算），
+    所以回复后调用 record_reply() 即可避免按过期数据重复回复。
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 5000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._counts: Dict[str, tuple] = {}
+
+    def get(self, post_id: str) -> Optional[int]:
+        entry = self._counts.get(post_id)
+        if entry is None or time.monotonic() - entry[1] > self.ttl_seconds:
+            return None
+        return entry[0]
+
+    def set(self, post_id: str, count: int):
+        self._counts.pop(post_id, None)
+        self._counts[post_id] = (count, time.monotonic())
+        if len(self._counts) > self.max_entries:
+            # dict 保持插入顺序，最早写入的在前
+            del self._counts[next(iter(self._counts))]
+
+    def invalidate(self, post_id: str):
+        self._counts.pop(post_id, None)
+
+    def record_reply(self, post_id: str):
+        """我们刚回复过该帖子"""
+        self.set(post_id, (self.get(post_id) or 0) + 1)
+
+    def update_from_posts(self, posts: List[Dict]) -> List[str]:
+        """用帖子自带的评论数更新缓存，返回仍缺评论数的帖子 ID"""
+        missing = []
+        for post in posts:
+            post_id = post.get("id")
+            if not post_id:
+                continue
+            count = count_from_post(post)
+            if count is not None:
+                known = self._counts.get(post_id)
+                self.set(post_id, max(count, known[0]) if known else count)
+            elif self.get(post_id) is None:
+                missing.append(post_id)
+        return missing
+
+    def counts(self, post_ids: List[str]) -> Dict[str, Optional[int]]:
+        return {post_id: self.get(post_id) for post_id in post_ids}
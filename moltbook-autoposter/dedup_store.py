@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Dedup Store - 持久化去重索引
+SQLite 保存已点赞帖子 / 已关注用户，内存 Bloom 过滤器挡掉绝大多数未命中的查询
+"""
+
+import hashlib
+import sqlite3
+import time
+import logging
+from pathlib import Path
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """定长 Bloom 过滤器（double hashing）"""
+
+    def __init__(self, size_bits: int = 1 << 23, hashes: int = 7, data: Optional[bytes] = None):
+        self.size_bits = size_bits
+        self.hashes = hashes
+        nbytes = (size_bits + 7) // 8
+        if data is not None and len(data) == nbytes:
+            self.bits = bytearray(data)
+        else:
+            self.bits = bytearray(nbytes)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size_bits
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class DedupStore:
+    """持久化去重集合
+
+    用法与 set 一致（`in` / `add`），重启后记录仍在。
+    ttl_seconds 之外的记录视为过期，evict_expired() 时删除。
+    """
+
+    def __init__(self, path: str, namespace: str, ttl_seconds: Optional[float] = None,
+                 bloom_bits: int = 1 << 23):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.bloom_bits = bloom_bits
+        self.db = sqlite3.connect(str(self.path))
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS seen (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                ts REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS seen_ts ON seen (namespace, ts);
+            CREATE TABLE IF NOT EXISTS bloom (
+                namespace TEXT PRIMARY KEY,
+                bits BLOB NOT NULL,
+                saved_at REAL NOT NULL
+            );
+        """)
+        self.bloom = self._load_bloom()
+
+    def _load_bloom(self) -> BloomFilter:
+        """加载 Bloom 位图，并补上次保存之后新增的 key"""
+        row = self.db.execute(
+            "SELECT bits, saved_at FROM bloom WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        if row and len(row[0]) == (self.bloom_bits + 7) // 8:
+            bloom = BloomFilter(self.bloom_bits, data=row[0])
+            cursor = self.db.execute(
+                "SELECT key FROM seen WHERE namespace = ? AND ts >= ?", (self.namespace, row[1])
+            )
+        else:
+            bloom = BloomFilter(self.bloom_bits)
+            cursor = self.db.execute("SELECT key FROM seen WHERE namespace = ?", (self.namespace,))
+        for (key,) in cursor:
+            bloom.add(key)
+        return bloom
+
+    def save_bloom(self):
+        """保存 Bloom 位图，下次启动无需全量重建"""
+        self.db.execute(
+            "INSERT OR REPLACE INTO bloom (namespace, bits, saved_at) VALUES (?, ?, ?)",
+            (self.namespace, bytes(self.bloom.bits), time.time()),
+        )
+        self.db.commit()
+
+    def __contains__(self, key) -> bool:
+        key = str(key)
+        if key not in self.bloom:
+            return False
+        row = self.db.execute(
+            "SELECT ts FROM seen WHERE namespace = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+        if not row:
+            return False
+        return self.ttl_seconds is None or row[0] >= time.time() - self.ttl_seconds
+
+    def add(self, key):
+        key = str(key)
+        self.db.execute(
+            "INSERT OR REPLACE INTO seen (namespace, key, ts) VALUES (?, ?, ?)",
+            (self.namespace, key, time.time()),
+        )
+        self.db.commit()
+        self.bloom.add(key)
+
+    def __len__(self) -> int:
+        return self.db.execute(
+            "SELECT COUNT(*) FROM seen WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+
+    def evict_expired(self) -> int:
+        """删除过期记录，并重建 Bloom 位图"""
+        if self.ttl_seconds is None:
+            return 0
+        cursor = self.db.execute(
+            "DELETE FROM seen WHERE namespace = ? AND ts < ?",
+            (self.namespace, time.time() - self.ttl_seconds),
+        )
+        self.db.commit()
+        if cursor.rowcount:
+            self.bloom = BloomFilter(self.bloom_bits)
+            for (key,) in self.db.execute("SELECT key FROM seen WHERE namespace = ?", (self.namespace,)):
+                self.bloom.add(key)
+            self.save_bloom()
+            logger.info(f"🧹 {self.namespace}: 清理过期记录 {cursor.rowcount} 条")
+        return cursor.rowcount
+
+    def close(self):
+        self.save_bloom()
+        self.db.close()
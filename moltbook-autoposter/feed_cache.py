@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Feed Cache - 动态流缓存
+同一轮内点赞/回复/关注共用一份动态流，刷新时通过 since_id 只拉取新帖
+"""
+
+import time
+from typing import Dict, List, Optional
+
+
+class FeedCache:
+    """动态流缓存（短 TTL + 增量合并）"""
+
+    def __init__(self, ttl_seconds: float = 30, max_posts: int = 100, page_size: int = 20):
+        self.ttl_seconds = ttl_seconds
+        self.max_posts = max_posts
+        self.page_size = page_size
+        self.items: List[Dict] = []
+        self._ids = set()
+        self.fetched_at: Optional[float] = None
+
+    def is_fresh(self) -> bool:
+        return self.fetched_at is not None and time.monotonic() - self.fetched_at < self.ttl_seconds
+
+    @property
+    def newest_id(self) -> Optional[str]:
+        """最新一条帖子的 ID，作为下次增量拉取的 since_id"""
+        return self.items[0].get("id") if self.items else None
+
+    def update(self, posts: List[Dict]) -> int:
+        """合并新拉取的帖子（新帖在前，已有帖子原位更新），返回新帖数量"""
+        new_posts = [p for p in posts if p.get("id") not in self._ids]
+        changed = {p.get("id"): p for p in posts if p.get("id") in self._ids}
+        merged = new_posts + [changed.get(p.get("id"), p) for p in self.items]
+
+        self.items = merged[:self.max_posts]
+        self._ids = {p.get("id") for p in self.items}
+        self.fetched_at = time.monotonic()
+        return len(new_posts)
+
+    def posts(self, limit: int = 20) -> List[Dict]:
+        """最新的 limit 条帖子"""
+        return self.items[:limit]
+
+    def invalidate(self):
+        """下一次读取时强制刷新"""
+        self.fetched_at = None
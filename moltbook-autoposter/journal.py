@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Action Journal - 预写式操作日志
+每次点赞/关注/回复/发布前先记一条 begin，完成后记 ok / fail；
+启动时回放日志恢复当天统计和去重状态，崩溃中断的操作也能查到
+
+记录格式（制表符分隔，一行一条）：
+    <时间戳>\t<动作>\t<状态>\t<key>
+    <时间戳>\tsnapshot\t<日期>\t<统计 JSON>
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Set
+
+BEGIN = "begin"
+OK = "ok"
+FAIL = "fail"
+
+# 动作 -> 统计字段
+STAT_FIELDS = {"like": "likes", "follow": "follows", "post": "posts", "reply": "replies"}
+
+
+class JournalState:
+    """回放结果"""
+
+    def __init__(self):
+        self.stats: Dict[str, int] = {field: 0 for field in STAT_FIELDS.values()}
+        self.done: Dict[str, Set[str]] = {action: set() for action in STAT_FIELDS}
+        self.unknown: Dict[str, Set[str]] = {action: set() for action in STAT_FIELDS}
+        self.records = 0
+
+
+class ActionJournal:
+    """追加写、批量 fsync 的操作日志
+
+    每条记录写入后立即 flush 到内核，进程崩溃不丢；fsync 按批进行，只有断电才可能丢最后一批
+    """
+
+    def __init__(self, path: str, flush_every: int = 20, flush_interval: float = 1.0,
+                 compact_bytes: int = 1 << 20):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.compact_bytes = compact_bytes
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        # 当天的统计（快照只写这一份，跨过零点自动清零）
+        self.day = self._today()
+        self.stats: Dict[str, int] = {field: 0 for field in STAT_FIELDS.values()}
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now().strftime("%Y-%m-%d")
+
+    def _roll_day(self):
+        today = self._today()
+        if today != self.day:
+            self.day = today
+            self.stats = {field: 0 for field in STAT_FIELDS.values()}
+
+    def _write(self, line: str):
+        self.file.write(line)
+        self.file.flush()
+        self._pending += 1
+        if self._pending >= self.flush_every or time.monotonic() - self._last_sync >= self.flush_interval:
+            self.sync()
+
+    def sync(self):
+        """刷盘（批量 fsync）"""
+        if self._pending:
+            os.fsync(self.file.fileno())
+            self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def begin(self, action: str, key: str = ""):
+        self._write(f"{time.time():.3f}\t{action}\t{BEGIN}\t{self._clean(key)}\n")
+
+    def finish(self, action: str, key: str = "", ok: bool = True):
+        self._write(f"{time.time():.3f}\t{action}\t{OK if ok else FAIL}\t{self._clean(key)}\n")
+        if ok and action in STAT_FIELDS:
+            self._roll_day()
+            self.stats[STAT_FIELDS[action]] += 1
+
+    @staticmethod
+    def _clean(key) -> str:
+        return str(key).replace("\t", " ").replace("\n", " ")
+
+    def replay(self) -> JournalState:
+        """回放日志：统计只算今天的，去重 key 不分日期"""
+        self.sync()
+        state = JournalState()
+        today = self._today()
+        day_start = datetime.strptime(today, "%Y-%m-%d").timestamp()
+        pending: Dict[tuple, bool] = {}
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t", 3)
+                if len(parts) != 4:
+                    continue  # 崩溃时写了一半的行
+                ts, action, status, key = parts
+                state.records += 1
+                if action == "snapshot":
+                    if status == today:
+                        state.stats.update(json.loads(key))
+                    continue
+                if action not in STAT_FIELDS:
+                    continue
+                if status == BEGIN:
+                    pending[(action, key)] = True
+                    continue
+                pending.pop((action, key), None)
+                if status == OK:
+                    state.done[action].add(key)
+                    if float(ts) >= day_start:
+                        state.stats[STAT_FIELDS[action]] += 1
+
+        for action, key in pending:
+            state.unknown[action].add(key)
+        self.day = today
+        self.stats = dict(state.stats)
+        return state
+
+    def compact(self):
+        """压缩：只保留今天的统计快照（去重状态已在 DedupStore 中持久化）"""
+        self.sync()
+        self.file.close()
+        self._roll_day()
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            stats = json.dumps(self.stats, separators=(',', ':'))
+            f.write(f"{time.time():.3f}\tsnapshot\t{self.day}\t{stats}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def needs_compaction(self) -> bool:
+        return self.path.stat().st_size >= self.compact_bytes
+
+    def close(self):
+        self.sync()
+        self.file.close()
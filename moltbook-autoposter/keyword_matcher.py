@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Keyword Matcher - Aho-Corasick 多关键词匹配
+关键词只编译一次，每条帖子单次扫描即可找出全部命中的关键词（中英文混合，忽略大小写）
+"""
+
+from collections import deque
+from typing import Dict, List, Tuple, Union
+
+
+class KeywordMatcher:
+    """Aho-Corasick 自动机
+
+    keywords 可以是列表（权重均为 1），也可以是 {关键词: 权重} 的字典。
+    """
+
+    def __init__(self, keywords: Union[List[str], Dict[str, float]]):
+        if isinstance(keywords, dict):
+            weights = {str(k): float(v) for k, v in keywords.items()}
+        else:
+            weights = {str(k): 1.0 for k in keywords}
+        self.keywords = [k for k in weights if k.strip()]
+        self.weights = [weights[k] for k in self.keywords]
+
+        # goto[state][char] -> state；fail[state] -> state；output[state] -> 关键词下标
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+        for index, keyword in enumerate(self.keywords):
+            self._insert(keyword.casefold(), index)
+        self._build_fail_links()
+
+    def _insert(self, word: str, index: int):
+        state = 0
+        for char in word:
+            nxt = self.goto[state].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = nxt
+        self.output[state].append(index)
+
+    def _build_fail_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(char, 0)
+                # 合并后缀状态的输出，扫描时无需再沿 fail 链回溯
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def _scan(self, text: str):
+        state = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for char in text.casefold():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                yield from output[state]
+
+    def find(self, text: str) -> Dict[str, int]:
+        """返回 {命中的关键词: 次数}"""
+        hits: Dict[str, int] = {}
+        for index in self._scan(text):
+            keyword = self.keywords[index]
+            hits[keyword] = hits.get(keyword, 0) + 1
+        return hits
+
+    def matches(self, text: str) -> bool:
+        """是否命中任一关键词（命中即返回）"""
+        return next(self._scan(text), None) is not None
+
+    def score(self, text: str) -> float:
+        """命中关键词的权重之和（每个关键词只计一次）"""
+        return sum(self.weights[i] for i in set(self._scan(text)))
+
+    def rank(self, posts: List[Dict], field: str = "content") -> List[Tuple[float, Dict]]:
+        """按匹配权重从高到低排序，过滤掉未命中的帖子"""
+        scored = [(self.score(post.get(field) or ""), post) for post in posts]
+        scored = [(score, post) for score, post in scored if score > 0]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Metrics - Prometheus 风格的运行指标
+记录各接口的请求耗时直方图、重试次数、429 比例、流量和队列深度，
+通过本地 HTTP /metrics 暴露，并定期追加 JSON 快照
+"""
+
+import asyncio
+import bisect
+import functools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 秒
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 指标名 -> (类型, 说明)
+METRICS = {
+    "moltbook_requests_total": ("counter", "API responses by endpoint and status code"),
+    "moltbook_request_duration_seconds": ("histogram", "API request latency"),
+    "moltbook_request_errors_total": ("counter", "API requests that raised a connection error"),
+    "moltbook_retries_total": ("counter", "API request retries"),
+    "moltbook_throttled_total": ("counter", "Requests skipped or delayed by the local rate limiter"),
+    "moltbook_rate_limit_wait_seconds": ("histogram", "Time spent waiting for a rate limit token"),
+    "moltbook_bytes_sent_total": ("counter", "Request body bytes sent"),
+    "moltbook_bytes_received_total": ("counter", "Response body bytes received"),
+    "moltbook_action_duration_seconds": ("histogram", "Duration of one run of an action"),
+    "moltbook_rate_limit_delay_seconds": ("gauge", "Seconds until the next token is available"),
+    "moltbook_http_in_flight": ("gauge", "Requests currently running in the HTTP pool"),
+    "moltbook_http_queue_depth": ("gauge", "Requests waiting for a free HTTP pool slot"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """固定分桶直方图"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个为 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按分桶线性插值估算分位数"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower, seen = 0.0, 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = self.buckets[index] if index < len(self.buckets) else lower
+        return self.buckets[-1]
+
+
+class Metrics:
+    """线程安全的指标注册表，多个账号可共用一个"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = defaultdict(float)
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.gauges: Dict[Tuple[str, Labels], Callable[[], float]] = {}
+        self.started = time.time()
+
+    @staticmethod
+    def _labels(labels: Dict) -> Labels:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self.counters[(name, self._labels(labels))] += value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, self._labels(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def gauge(self, name: str, func: Callable[[], float], **labels):
+        """注册瞬时值回调，采集时才读取"""
+        with self._lock:
+            self.gauges[(name, self._labels(labels))] = func
+
+    def observe_response(self, response, seconds: float, **labels):
+        """记录一次 HTTP 响应：状态码、耗时、收发字节数"""
+        body = response.request.body if response.request is not None else None
+        self.inc("moltbook_requests_total", status=response.status_code, **labels)
+        self.observe("moltbook_request_duration_seconds", seconds, **labels)
+        self.inc("moltbook_bytes_sent_total", len(body) if body else 0, **labels)
+        self.inc("moltbook_bytes_received_total", len(response.content or b""), **labels)
+
+    def timed(self, func: Callable, **labels) -> Callable:
+        """包装动作函数，记录每次执行耗时（同步 / 异步均可）"""
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.observe("moltbook_action_duration_seconds", time.perf_counter() - started, **labels)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe("moltbook_action_duration_seconds", time.perf_counter() - started, **labels)
+        return wrapper
+
+    def _read_gauges(self) -> Dict[Tuple[str, Labels], float]:
+        with self._lock:
+            gauges = list(self.gauges.items())
+        values = {}
+        for key, func in gauges:
+            try:
+                values[key] = float(func())
+            except Exception as e:
+                logger.debug(f"gauge {key[0]} failed: {e}")
+        return values
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        gauges = self._read_gauges()
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {key: (h.buckets, h.cumulative(), h.sum, h.count)
+                          for key, h in self.histograms.items()}
+
+        series: Dict[str, List[str]] = defaultdict(list)
+        for (name, labels), value in sorted(counters.items()):
+            series[name].append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), value in sorted(gauges.items()):
+            series[name].append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (buckets, cumulative, total, count) in sorted(histograms.items()):
+            for bound, value in zip(list(buckets) + ["+Inf"], cumulative):
+                le = bound if isinstance(bound, str) else _format_value(bound)
+                series[name].append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {value}")
+            series[name].append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            series[name].append(f"{name}_count{_format_labels(labels)} {count}")
+
+        lines = []
+        for name in sorted(series):
+            kind, help_text = METRICS.get(name, ("untyped", ""))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(series[name])
+        return "\n".join(lines) + "\n"
+
+    def endpoint_summary(self) -> Dict[str, Dict]:
+        """按 (账号, 接口) 汇总：请求数、429 比例、重试、流量、延迟分位数"""
+        with self._lock:
+            counters = dict(self.counters)
+            latencies = {labels: (h.count, h.quantile(0.5), h.quantile(0.95))
+                         for (name, labels), h in self.histograms.items()
+                         if name == "moltbook_request_duration_seconds"}
+
+        summary: Dict[str, Dict] = defaultdict(lambda: {
+            "requests": 0, "rate_limited": 0, "errors": 0, "retries": 0, "throttled": 0,
+            "bytes_sent": 0, "bytes_received": 0,
+        })
+        fields = {
+            "moltbook_request_errors_total": "errors",
+            "moltbook_retries_total": "retries",
+            "moltbook_throttled_total": "throttled",
+            "moltbook_bytes_sent_total": "bytes_sent",
+            "moltbook_bytes_received_total": "bytes_received",
+        }
+        for (name, labels), value in counters.items():
+            label_map = dict(labels)
+            status = label_map.pop("status", None)
+            key = "/".join(label_map[k] for k in sorted(label_map))
+            if name == "moltbook_requests_total":
+                summary[key]["requests"] += int(value)
+                if status == "429":
+                    summary[key]["rate_limited"] += int(value)
+            elif name in fields:
+                summary[key][fields[name]] += int(value)
+
+        for labels, (count, p50, p95) in latencies.items():
+            entry = summary["/".join(v for _, v in labels)]
+            entry["p50_ms"] = round(p50 * 1000, 1) if p50 is not None else None
+            entry["p95_ms"] = round(p95 * 1000, 1) if p95 is not None else None
+
+        for entry in summary.values():
+            entry["rate_limited_ratio"] = round(entry["rate_limited"] / entry["requests"], 4) \
+                if entry["requests"] else 0.0
+        return dict(summary)
+
+    def snapshot(self) -> Dict:
+        """JSON 快照"""
+        gauges = self._read_gauges()
+        with self._lock:
+            actions = {
+                "/".join(v for _, v in labels): {
+                    "runs": h.count,
+                    "avg_ms": round(h.sum / h.count * 1000, 1) if h.count else None,
+                    "p95_ms": round(h.quantile(0.95) * 1000, 1) if h.count else None,
+                }
+                for (name, labels), h in self.histograms.items()
+                if name == "moltbook_action_duration_seconds"
+            }
+        return {
+            "time": time.time(),
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "endpoints": self.endpoint_summary(),
+            "actions": actions,
+            "gauges": {f"{name}{_format_labels(labels)}": value for (name, labels), value in gauges.items()},
+        }
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsServer:
+    """本地 HTTP 指标端点：/metrics（Prometheus 文本）和 /metrics.json（JSON 快照）"""
+
+    def __init__(self, metrics: Metrics, host: str = "127.0.0.1", port: int = 9464):
+        registry = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = registry.render().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(registry.snapshot(), ensure_ascii=False).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="moltbook-metrics", daemon=True)
+        self.thread.start()
+        logger.info(f"📈 指标端点: http://{host}:{self.server.server_address[1]}/metrics")
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SnapshotWriter:
+    """每隔 interval 秒把 JSON 快照追加到文件（一行一个）"""
+
+    def __init__(self, metrics: Metrics, path: str, interval: float = 60):
+        self.metrics = metrics
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._loop, name="moltbook-metrics-snapshot", daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.metrics.snapshot(), ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.error(f"写入指标快照失败: {e}")
+
+    def close(self):
+        self._stop.set()
+        self.thread.join(timeout=5)
+        self.write()
+
+
+def start_exporters(metrics: Metrics, config: Dict, name: str, port_offset: int = 0) -> List:
+    """按配置启动 /metrics 端点和快照写入，返回需要 close() 的对象"""
+    exporters = []
+    if config.get("port"):
+        try:
+            exporters.append(MetricsServer(metrics, config.get("host", "127.0.0.1"),
+                                           config["port"] + port_offset))
+        except OSError as e:
+            logger.error(f"指标端点启动失败: {e}")
+    if config.get("snapshot_interval"):
+        path = config.get("snapshot_path") or Path.home() / ".config" / "moltbook" / f"metrics_{name}.jsonl"
+        exporters.append(SnapshotWriter(metrics, path, config["snapshot_interval"]))
+    return exporters
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Moltbook 异步执行引擎
+共享 keep-alive 连接池，独立请求（如多条帖子的评论）并发执行
+"""
+
+import asyncio
+import functools
+import random
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from comment_counts import count_from_response
+from metrics import Metrics
+from moltbook_bot import MoltbookAutoposter
+from ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class HttpPool:
+    """共享 HTTP 连接池
+
+    requests.Session 的连接池由 HTTPAdapter 限定大小，阻塞调用放到线程池执行，
+    并发数由信号量限制（max_in_flight），不会超过连接池容量。
+    多个账号的客户端可以共用同一个 HttpPool。
+    """
+
+    def __init__(self, pool_size: int = 10, max_in_flight: int = 8,
+                 session: Optional[requests.Session] = None):
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self.max_in_flight = max_in_flight
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight,
+                                           thread_name_prefix="moltbook-http")
+        self._semaphore = None
+        self.in_flight = 0
+        self.waiting = 0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # 信号量需在事件循环内创建
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    async def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """在线程池中执行一次请求（受并发上限约束）"""
+        call = functools.partial(self.session.request, method, url, **kwargs)
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    def register_metrics(self, metrics: Metrics):
+        """登记连接池队列深度指标"""
+        metrics.gauge("moltbook_http_in_flight", lambda: self.in_flight)
+        metrics.gauge("moltbook_http_queue_depth", lambda: self.waiting)
+
+    def close(self):
+        """释放线程池和连接"""
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+class AsyncMoltbookClient:
+    """Moltbook 异步客户端（每个账号一个，底层共享 HttpPool）"""
+
+    def __init__(self, base_url: str, headers: Dict, pool: HttpPool,
+                 timeout: int = 10, max_retries: int = 3,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 metrics: Optional[Metrics] = None, metric_labels: Optional[Dict] = None):
+        self.base_url = base_url
+        self.headers = headers
+        self.pool = pool
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.metrics = metrics or Metrics()
+        self.metric_labels = metric_labels or {}
+
+    async def request(self, method: str, path: str, **kwargs) -> Optional[requests.Response]:
+        """API 请求（带重试，限流等待只挂起当前协程）"""
+        url = f"{self.base_url}{path}"
+        endpoint = self.rate_limiter.endpoint_for(method, url)
+        labels = dict(self.metric_labels, endpoint=endpoint)
+        kwargs.setdefault("headers", self.headers)
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(self.max_retries):
+            if attempt:
+                self.metrics.inc("moltbook_retries_total", **labels)
+            started = time.perf_counter()
+            await self.rate_limiter.acquire(endpoint)
+            waited = time.perf_counter() - started
+            self.metrics.observe("moltbook_rate_limit_wait_seconds", waited, **labels)
+            if waited > 0.001:
+                self.metrics.inc("moltbook_throttled_total", **labels)
+            started = time.perf_counter()
+            try:
+                response = await self.pool.request(method, url, **kwargs)
+                self.metrics.observe_response(response, time.perf_counter() - started, **labels)
+                self.rate_limiter.observe(endpoint, response)
+                if response.status_code == 429:  # Rate limit，下次 acquire 会等到解除
+                    continue
+                return response
+            except requests.exceptions.RequestException as e:
+                self.metrics.inc("moltbook_request_errors_total", **labels)
+                logger.error(f"Request failed (attempt {attempt+1}/{self.max_retries}): {e}")
+                await asyncio.sleep(2 ** attempt)  # 指数退避
+        return None
+
+    async def get_feed(self, limit: int = 20, since_id: Optional[str] = None) -> Optional[List[Dict]]:
+        """获取动态流（失败返回 None）"""
+        try:
+            params = {"limit": limit}
+            if since_id:
+                params["since_id"] = since_id
+            response = await self.request("GET", "/posts", params=params)
+            if response and response.status_code == 200:
+                data = response.json()
+                if data.get("success"):
+                    return data.get("posts", [])
+        except Exception as e:
+            logger.error(f"获取动态失败: {e}")
+        return None
+
+    async def like_post(self, post_id: str) -> bool:
+        """点赞/顶帖"""
+        try:
+            response = await self.request("POST", f"/posts/{post_id}/upvote")
+            return bool(response and response.status_code == 200)
+        except Exception as e:
+            logger.error(f"点赞失败: {e}")
+        return False
+
+    async def create_post(self, content: str, parent_id: Optional[str] = None) -> Optional[Dict]:
+        """发布内容"""
+        try:
+            data = {"content": content}
+            if parent_id:
+                data["parent_id"] = parent_id
+            response = await self.request("POST", "/posts", json=data)
+            if response and response.status_code in [200, 201]:
+                return response.json()
+        except Exception as e:
+            logger.error(f"发布失败: {e}")
+        return None
+
+    async def get_comments(self, post_id: str) -> List[Dict]:
+        """获取评论"""
+        try:
+            response = await self.request("GET", f"/posts/{post_id}/comments")
+            if response and response.status_code == 200:
+                data = response.json()
+                return data.get("comments", []) if data.get("success") else []
+        except Exception as e:
+            logger.error(f"获取评论失败: {e}")
+        return []
+
+    async def get_comments_many(self, post_ids: List[str]) -> Dict[str, List[Dict]]:
+        """并发获取多条帖子的评论"""
+        results = await asyncio.gather(*(self.get_comments(pid) for pid in post_ids))
+        return dict(zip(post_ids, results))
+
+    async def get_comment_count(self, post_id: str) -> Optional[int]:
+        """获取评论数（只拉取 1 条评论）"""
+        try:
+            response = await self.request("GET", f"/posts/{post_id}/comments", params={"limit": 1})
+            if response and response.status_code == 200:
+                data = response.json()
+                return count_from_response(data) if data.get("success") else None
+        except Exception as e:
+            logger.error(f"获取评论数失败: {e}")
+        return None
+
+    async def follow_user(self, username: str) -> bool:
+        """关注用户"""
+        try:
+            response = await self.request("POST", f"/users/{username}/follow")
+            return bool(response and response.status_code in [200, 201])
+        except Exception as e:
+            logger.error(f"关注失败: {e}")
+        return False
+
+
+class AsyncMoltbookAutoposter(MoltbookAutoposter):
+    """Moltbook 自动运营机器人（异步模式）"""
+
+    def __init__(self, config_file: str = "config.json", credentials: Optional[Dict] = None,
+                 config_overrides: Optional[Dict] = None, pool: Optional[HttpPool] = None,
+                 metrics: Optional[Metrics] = None):
+        super().__init__(config_file, credentials=credentials, config_overrides=config_overrides,
+                         session=pool.session if pool else None, metrics=metrics)
+        self._owns_pool = pool is None
+        if pool is None:
+            # 单账号：用自己的会话建连接池
+            pool = HttpPool(max_in_flight=self.config.get("http", {}).get("max_in_flight", 8),
+                            session=self.session)
+            pool.register_metrics(self.metrics)
+        self.pool = pool
+        self.client = AsyncMoltbookClient(
+            self.base_url,
+            self.headers,
+            pool=pool,
+            timeout=self.config.get("http", {}).get("timeout", 10),
+            rate_limiter=self.rate_limiter,
+            metrics=self.metrics,
+            metric_labels=self.metric_labels,
+        )
+        self._feed_lock = None
+
+    async def get_cached_feed(self, limit: int = 20) -> List[Dict]:
+        """从缓存读取动态流；并发调用只触发一次刷新"""
+        if self._feed_lock is None:
+            self._feed_lock = asyncio.Lock()
+        async with self._feed_lock:
+            if not self.feed_cache.is_fresh():
+                posts = await self.client.get_feed(self.feed_cache.page_size,
+                                                   since_id=self.feed_cache.newest_id)
+                if posts is not None:  # 拉取失败时不刷新时间戳，下次读取再试
+                    self.feed_cache.update(posts)
+        return self.feed_cache.posts(limit)
+
+    async def journaled(self, action: str, key: str, coro):
+        """先写日志再发请求，完成后记录结果（成功时先写入该动作的去重索引再记 ok）"""
+        self.journal_begin(action, key)
+        ok = False
+        try:
+            result = await coro
+            ok = bool(result)
+            store = self.dedup_stores().get(action)
+            if ok and store is not None:
+                store.add(key)
+            return result
+        finally:
+            self.journal_finish(action, key, ok)
+
+    async def auto_like(self):
+        """自动点赞（并发）"""
+        if not self.config.get("auto_like", {}).get("enabled", False):
+            return
+
+        max_likes = self.config.get("auto_like", {}).get("max_per_run", 5)
+        logger.info(f"👍 自动点赞 (最多 {max_likes} 条)...")
+
+        feed = await self.get_cached_feed(10)
+        candidates = [p for p in feed if p.get("id") and p.get("id") not in self.liked_posts]
+        candidates = candidates[:max_likes]
+
+        results = await asyncio.gather(
+            *(self.journaled("like", p["id"], self.client.like_post(p["id"])) for p in candidates)
+        )
+        for post, ok in zip(candidates, results):
+            if ok:
+                self.stats["likes"] += 1
+                content = post.get('content', post.get('title', ''))[:35]
+                logger.info(f"   ✅ {content}...")
+
+    async def auto_reply(self):
+        """自动回复（评论数一轮并发预取）"""
+        if not self.config.get("auto_reply", {}).get("enabled", False):
+            return
+
+        logger.info("💬 自动回复...")
+        feed = await self.get_cached_feed(10)
+
+        reply_templates = [
+            "感谢分享！🙏 这个话题很有趣，你怎么看？",
+            "👍 不错的观点！想听听更多想法",
+            "很有意思！🤔 你是怎么得出这个结论的？",
+            "同意！💡 欢迎继续交流",
+            "分享不易，支持一下！😊"
+        ]
+
+        # 按关键词权重排序，优先回复最相关的帖子
+        matched = [post for _, post in self.keyword_matcher.rank(feed)
+                   if post.get("id") and post["id"] not in self.replied_posts]
+        counts = await self.prefetch_comment_counts(matched)
+
+        for post in matched:
+            if counts.get(post["id"]) == 0:  # 只回复无评论的帖子
+                reply = random.choice(reply_templates)
+                if await self.journaled("reply", post["id"],
+                                        self.client.create_post(reply, parent_id=post["id"])):
+                    self.comment_counts.record_reply(post["id"])
+                    self.stats["replies"] += 1
+                    hits = ", ".join(self.keyword_matcher.find(post.get("content", "")))
+                    logger.info(f"   ✅ 回复 [{hits}]: {post.get('content', '')[:30]}...")
+                    break  # 每次只回复一条
+
+    async def prefetch_comment_counts(self, posts: List[Dict]) -> Dict[str, Optional[int]]:
+        """批量获取评论数：先用动态流自带字段，缺失的并发请求"""
+        missing = self.comment_counts.update_from_posts(posts)
+        results = await asyncio.gather(*(self.client.get_comment_count(pid) for pid in missing))
+        for post_id, count in zip(missing, results):
+            if count is not None:
+                self.comment_counts.set(post_id, count)
+        return self.comment_counts.counts([p.get("id") for p in posts if p.get("id")])
+
+    async def auto_follow_feed(self):
+        """自动关注（并发）"""
+        if not self.config.get("auto_follow", {}).get("enabled", False):
+            return
+
+        max_follows = self.config.get("auto_follow", {}).get("max_per_run", 2)
+        logger.info(f"👥 自动关注 (最多 {max_follows} 位)...")
+
+        feed = await self.get_cached_feed(20)
+        usernames = []
+        for post in feed:
+            author = post.get("author", {})
+            if isinstance(author, dict):
+                username = author.get("username")
+                if username and username not in self.followed_users and username not in usernames:
+                    usernames.append(username)
+        usernames = usernames[:max_follows]
+
+        results = await asyncio.gather(
+            *(self.journaled("follow", u, self.client.follow_user(u)) for u in usernames)
+        )
+        for username, ok in zip(usernames, results):
+            if ok:
+                self.stats["follows"] += 1
+                logger.info(f"   ✅ 关注 @{username}")
+
+    async def auto_post(self):
+        """自动发布"""
+        if not self.config.get("auto_post", {}).get("enabled", False):
+            return
+
+        logger.info("📝 自动发布...")
+        result = await self.journaled("post", "", self.client.create_post(self.get_random_content()))
+
+        if result:
+            self.stats["posts"] += 1
+            logger.info("   ✅ 发布成功！")
+        else:
+            logger.error("   ❌ 发布失败")
+
+    async def run(self, run_once: bool = False):
+        """主程序（异步）"""
+        agent = self.credentials.get("agent_name", "Unknown")
+        logger.info(f"🚀 Moltbook Autoposter 启动！(async)")
+        logger.info(f"Agent: {agent}")
+
+        actions = {
+            "auto_like": self.auto_like,
+            "auto_follow": self.auto_follow_feed,
+            "auto_reply": self.auto_reply,
+            "auto_post": self.auto_post,
+        }
+
+        try:
+            if run_once:
+                # 单次运行模式：各动作互不依赖，并发执行
+                logger.info("\n🧪 测试模式运行...")
+                await asyncio.gather(*(self.metrics.timed(action, action=name, **self.metric_labels)()
+                                       for name, action in actions.items()
+                                       if self.config.get(name, {}).get("enabled")))
+                self.print_stats()
+                return
+
+            logger.info("\n🔄 开始循环运行... (按 Ctrl+C 停止)")
+            await self.build_scheduler(actions).run_async()
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            logger.info("\n👋 收到停止信号")
+            self.print_stats()
+            logger.info("再见！")
+        finally:
+            self.close()
+
+    def close(self):
+        """保存状态；独占的连接池一并释放"""
+        super().close()
+        if self._owns_pool:
+            self.pool.close()
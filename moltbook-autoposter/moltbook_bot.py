@@ -6,14 +6,26 @@ Moltbook Autoposter - 自动运营 Moltbook
 
 import os
 import sys
+import functools
 import json
 import time
 import random
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from datetime import datetime
 from typing import Dict, List, Optional
 from pathlib import Path
 import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from comment_counts import CommentCountCache, count_from_response
+from dedup_store import DedupStore
+from feed_cache import FeedCache
+from journal import ActionJournal
+from keyword_matcher import KeywordMatcher
+from metrics import Metrics, start_exporters
+from scheduler import Job, Scheduler
+from ratelimit import RateLimiter
 
 # 配置日志
 logging.basicConfig(
@@ -22,23 +34,53 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def merge_config(base: Dict, overrides: Dict) -> Dict:
+    """递归合并配置：嵌套的 dict 逐项覆盖，其他值整体替换"""
+    merged = dict(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+# 单次动作内等令牌的上限（秒）；超过说明被服务端暂停，留到下一轮
+MAX_THROTTLE_WAIT = 10.0
+
 
 class MoltbookAutoposter:
     """Moltbook 自动运营机器人"""
 
-    def __init__(self, config_file: str = "config.json"):
+    def __init__(self, config_file: str = "config.json", credentials: Optional[Dict] = None,
+                 config_overrides: Optional[Dict] = None, session: Optional[requests.Session] = None,
+                 metrics: Optional[Metrics] = None):
         self.config = self.load_config(config_file)
-        self.credentials = self.load_credentials()
+        if config_overrides:
+            # 账号只覆盖自己写出的字段，如 {"auto_like": {"max_per_run": 3}} 不会关掉 enabled
+            self.config = merge_config(self.config, config_overrides)
+        # 多账号运行时由调用方传入凭证，否则读取本机凭证文件
+        self.credentials = dict(credentials) if credentials is not None else self.load_credentials()
         self.base_url = "https://www.moltbook.com/api/v1"
         self.headers = {
             "Authorization": f"Bearer {self.credentials.get('api_key', '')}",
             "Content-Type": "application/json"
         }
-        
-        # 时间追踪
-        self.last_like_time = datetime.now()
-        self.last_follow_time = datetime.now()
-        self.last_post_time = datetime.now()
+        self._owns_session = session is None
+        self.session = session or self.create_session()
+        self.rate_limiter = RateLimiter(self.config.get("rate_limits"))
+
+        # 运行指标（多账号时由调用方传入共用的注册表并负责导出）
+        agent = self.credentials.get("agent_name", "default")
+        self.metric_labels = {"agent": agent}
+        self._owns_metrics = metrics is None
+        self.metrics = metrics or Metrics()
+        for endpoint in self.rate_limiter.buckets:
+            self.metrics.gauge("moltbook_rate_limit_delay_seconds",
+                               functools.partial(self.rate_limiter.delay, endpoint),
+                               endpoint=endpoint, **self.metric_labels)
+        self.exporters = start_exporters(self.metrics, self.config.get("metrics", {}), agent) \
+            if self._owns_metrics else []
         
         # 统计
         self.stats = {
@@ -48,17 +90,44 @@ class MoltbookAutoposter:
             "replies": 0
         }
         
-        # 已操作记录（避免重复）
-        self.liked_posts = set()
-        self.followed_users = set()
-
-    def load_config(self, config_file: str) -> Dict:
+        # 已操作记录（避免重复，持久化保存，重启不丢）
+        self.liked_posts = self.open_dedup_store("liked_posts")
+        self.followed_users = self.open_dedup_store("followed_users")
+        self.replied_posts = self.open_dedup_store("replied_posts")
+
+        # 动态流缓存（各动作共用，一轮只拉取一次）
+        feed_config = self.config.get("feed", {})
+        self.feed_cache = FeedCache(
+            ttl_seconds=feed_config.get("ttl_seconds", 30),
+            max_posts=feed_config.get("max_posts", 100),
+            page_size=feed_config.get("page_size", 20),
+        )
+        # 回复关键词只编译一次
+        self.keyword_matcher = KeywordMatcher(self.config.get("auto_reply", {}).get("keywords", []))
+        self.comment_counts = CommentCountCache(
+            ttl_seconds=self.config.get("auto_reply", {}).get("count_ttl_seconds", 300)
+        )
+
+        # 操作日志：回放恢复当天统计和去重状态
+        self.journal = self.open_journal()
+        self._journal_in_flight = 0
+        self.restore_from_journal()
+
+    @staticmethod
+    def load_config(config_file: str) -> Dict:
         """加载配置"""
         default_config = {
             "auto_post": {"enabled": False, "interval_seconds": 3600},
             "auto_like": {"enabled": True, "interval_seconds": 60, "max_per_run": 5},
             "auto_reply": {"enabled": True, "keywords": ["AI", "技术", "分享"], "interval_seconds": 300},
-            "auto_follow": {"enabled": True, "interval_seconds": 120, "max_per_run": 2}
+            "auto_follow": {"enabled": True, "interval_seconds": 120, "max_per_run": 2},
+            "http": {"pool_size": 10, "max_in_flight": 8, "timeout": 10},
+            "rate_limits": {},
+            "dedup": {"path": "", "ttl_days": 30},
+            "feed": {"ttl_seconds": 30, "max_posts": 100, "page_size": 20},
+            "scheduler": {"jitter_seconds": 0, "catch_up": "run_once", "grace_seconds": 60},
+            "journal": {"path": "", "flush_every": 20, "flush_interval": 1.0, "compact_kb": 1024},
+            "metrics": {"host": "127.0.0.1", "port": 0, "snapshot_path": "", "snapshot_interval": 0}
         }
 
         if os.path.exists(config_file):
@@ -83,36 +152,137 @@ class MoltbookAutoposter:
 
         return default_creds
 
+    def open_dedup_store(self, namespace: str) -> DedupStore:
+        """打开去重索引，并清理过期记录"""
+        dedup = self.config.get("dedup", {})
+        agent = self.credentials.get("agent_name", "default")
+        path = dedup.get("path") or Path.home() / ".config" / "moltbook" / f"dedup_{agent}.sqlite3"
+        ttl_days = dedup.get("ttl_days", 30)
+        store = DedupStore(path, namespace, ttl_seconds=ttl_days * 86400 if ttl_days else None)
+        store.evict_expired()
+        return store
+
+    def open_journal(self) -> ActionJournal:
+        """打开操作日志"""
+        journal_config = self.config.get("journal", {})
+        agent = self.credentials.get("agent_name", "default")
+        path = journal_config.get("path") or Path.home() / ".config" / "moltbook" / f"journal_{agent}.log"
+        return ActionJournal(
+            path,
+            flush_every=journal_config.get("flush_every", 20),
+            flush_interval=journal_config.get("flush_interval", 1.0),
+            compact_bytes=journal_config.get("compact_kb", 1024) * 1024,
+        )
+
+    def restore_from_journal(self):
+        """回放操作日志，恢复统计与去重记录，然后压缩日志"""
+        started = time.perf_counter()
+        state = self.journal.replay()
+        self.stats.update(state.stats)
+
+        # 结果未知的操作（崩溃时正在进行）按已完成处理，避免重复点赞/关注/回复
+        for action, store in self.dedup_stores().items():
+            for key in state.done[action] | state.unknown[action]:
+                if key not in store:
+                    store.add(key)
+
+        unknown = [f"{action}:{key}" for action, keys in state.unknown.items() for key in sorted(keys)]
+        if unknown:
+            logger.warning(f"⚠️ 上次中断时结果未知的操作: {', '.join(unknown)}")
+        if state.records:
+            elapsed = (time.perf_counter() - started) * 1000
+            logger.info(f"📒 回放操作日志 {state.records} 条 ({elapsed:.1f}ms)")
+        self.journal.compact()
+
+    def dedup_stores(self) -> Dict[str, DedupStore]:
+        """动作 -> 去重索引（成功的操作先写入索引再记 ok，日志压缩后也不会重复执行）"""
+        return {"like": self.liked_posts, "follow": self.followed_users, "reply": self.replied_posts}
+
+    def journal_begin(self, action: str, key: str = ""):
+        """操作发出前记录"""
+        self.journal.begin(action, key)
+        self._journal_in_flight += 1
+
+    def journal_finish(self, action: str, key: str = "", ok: bool = True):
+        """记录操作结果；没有进行中的操作时按需压缩"""
+        self.journal.finish(action, key, ok)
+        self._journal_in_flight -= 1
+        if self._journal_in_flight == 0 and self.journal.needs_compaction():
+            self.journal.compact()
+
+    def create_session(self) -> requests.Session:
+        """创建共享会话（keep-alive 连接池）"""
+        pool_size = self.config.get("http", {}).get("pool_size", 10)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
     def api_request(self, method: str, url: str, **kwargs) -> Optional[requests.Response]:
-        """API 请求（带重试）"""
+        """API 请求（带重试）
+
+        限流由 RateLimiter 按接口处理：令牌不足或被 429 暂停时直接返回 None，
+        留到下一轮再做，不阻塞主循环。
+        """
         max_retries = 3
+        timeout = self.config.get("http", {}).get("timeout", 10)
+        endpoint = self.rate_limiter.endpoint_for(method, url)
+        labels = dict(self.metric_labels, endpoint=endpoint)
         for attempt in range(max_retries):
+            if attempt:
+                self.metrics.inc("moltbook_retries_total", **labels)
+            if not self.rate_limiter.try_acquire(endpoint):
+                self.metrics.inc("moltbook_throttled_total", **labels)
+                logger.debug(f"{endpoint} 限流中，{self.rate_limiter.delay(endpoint):.1f}s 后可用")
+                return None
+            started = time.perf_counter()
             try:
-                response = requests.request(method, url, timeout=10, **kwargs)
-                if response.status_code == 429:  # Rate limit
-                    wait_time = int(response.headers.get('Retry-After', 60))
-                    logger.warning(f"Rate limited, waiting {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+                self.metrics.observe_response(response, time.perf_counter() - started, **labels)
+                self.rate_limiter.observe(endpoint, response)
                 return response
             except requests.exceptions.RequestException as e:
+                self.metrics.inc("moltbook_request_errors_total", **labels)
                 logger.error(f"Request failed (attempt {attempt+1}/{max_retries}): {e}")
                 time.sleep(2 ** attempt)  # 指数退避
         return None
 
-    def get_feed(self, limit: int = 20) -> List[Dict]:
-        """获取动态流"""
+    def wait_for_rate_limit(self, endpoint: str) -> bool:
+        """等到该接口有可用令牌；需要等太久时返回 False"""
+        wait = self.rate_limiter.delay(endpoint)
+        if wait > MAX_THROTTLE_WAIT:
+            logger.info(f"   ⏸️ {endpoint} 限流中，{wait:.0f}s 后可用，留到下一轮")
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def get_feed(self, limit: int = 20, since_id: Optional[str] = None) -> Optional[List[Dict]]:
+        """获取动态流（失败返回 None）"""
         try:
             url = f"{self.base_url}/posts"
             params = {"limit": limit}
+            if since_id:
+                params["since_id"] = since_id
             response = self.api_request("GET", url, headers=self.headers, params=params)
 
             if response and response.status_code == 200:
                 data = response.json()
-                return data.get("posts", []) if data.get("success") else []
+                if data.get("success"):
+                    return data.get("posts", [])
         except Exception as e:
             logger.error(f"获取动态失败: {e}")
-        return []
+        return None
+
+    def get_cached_feed(self, limit: int = 20) -> List[Dict]:
+        """从缓存读取动态流，过期时增量刷新"""
+        if not self.feed_cache.is_fresh():
+            posts = self.get_feed(self.feed_cache.page_size, since_id=self.feed_cache.newest_id)
+            if posts is not None:  # 拉取失败时不刷新时间戳，下次读取再试
+                new_count = self.feed_cache.update(posts)
+                logger.debug(f"动态流刷新: {new_count} 条新帖")
+        return self.feed_cache.posts(limit)
 
     def like_post(self, post_id: str) -> bool:
         """点赞/顶帖"""
@@ -152,6 +322,30 @@ class MoltbookAutoposter:
             logger.error(f"获取评论失败: {e}")
         return []
 
+    def get_comment_count(self, post_id: str) -> Optional[int]:
+        """获取评论数（只拉取 1 条评论）"""
+        try:
+            url = f"{self.base_url}/posts/{post_id}/comments"
+            response = self.api_request("GET", url, headers=self.headers, params={"limit": 1})
+
+            if response and response.status_code == 200:
+                data = response.json()
+                return count_from_response(data) if data.get("success") else None
+        except Exception as e:
+            logger.error(f"获取评论数失败: {e}")
+        return None
+
+    def prefetch_comment_counts(self, posts: List[Dict]) -> Dict[str, Optional[int]]:
+        """批量获取评论数：先用动态流自带字段，缺失的并发请求"""
+        missing = self.comment_counts.update_from_posts(posts)
+        if missing:
+            workers = self.config.get("http", {}).get("max_in_flight", 8)
+            with ThreadPoolExecutor(max_workers=min(workers, len(missing))) as executor:
+                for post_id, count in zip(missing, executor.map(self.get_comment_count, missing)):
+                    if count is not None:
+                        self.comment_counts.set(post_id, count)
+        return self.comment_counts.counts([p.get("id") for p in posts if p.get("id")])
+
     def reply_comment(self, parent_id: str, content: str) -> Optional[Dict]:
         """回复评论"""
         return self.create_post(content, parent_id=parent_id)
@@ -207,7 +401,7 @@ class MoltbookAutoposter:
         max_likes = self.config.get("auto_like", {}).get("max_per_run", 5)
         logger.info(f"👍 自动点赞 (最多 {max_likes} 条)...")
         
-        feed = self.get_feed(10)
+        feed = self.get_cached_feed(10)
         count = 0
         
         for post in feed:
@@ -216,13 +410,18 @@ class MoltbookAutoposter:
                 
             post_id = post.get("id")
             if post_id and post_id not in self.liked_posts:
-                if self.like_post(post_id):
+                if not self.wait_for_rate_limit("upvote"):
+                    break
+                self.journal_begin("like", post_id)
+                ok = self.like_post(post_id)
+                if ok:
                     self.liked_posts.add(post_id)
+                self.journal_finish("like", post_id, ok)
+                if ok:
                     self.stats["likes"] += 1
                     content = post.get('content', post.get('title', ''))[:35]
                     logger.info(f"   ✅ {content}...")
                     count += 1
-                    time.sleep(random.uniform(1, 3))  # 随机延迟
 
     def auto_reply(self):
         """自动回复"""
@@ -230,8 +429,7 @@ class MoltbookAutoposter:
             return
 
         logger.info("💬 自动回复...")
-        keywords = self.config.get("auto_reply", {}).get("keywords", [])
-        feed = self.get_feed(10)
+        feed = self.get_cached_feed(10)
         
         reply_templates = [
             "感谢分享！🙏 这个话题很有趣，你怎么看？",
@@ -241,18 +439,26 @@ class MoltbookAutoposter:
             "分享不易，支持一下！😊"
         ]
         
-        for post in feed:
-            content = post.get("content", "").lower()
-            if any(kw.lower() in content for kw in keywords):
-                post_id = post.get("id")
-                if post_id:
-                    comments = self.get_comments(post_id)
-                    if not comments:  # 只回复无评论的帖子
-                        reply = random.choice(reply_templates)
-                        if self.reply_comment(post_id, reply):
-                            self.stats["replies"] += 1
-                            logger.info(f"   ✅ 回复: {content[:30]}...")
-                            break  # 每次只回复一条
+        # 按关键词权重排序，优先回复最相关的帖子
+        matched = [post for _, post in self.keyword_matcher.rank(feed)
+                   if post.get("id") and post["id"] not in self.replied_posts]
+        counts = self.prefetch_comment_counts(matched)
+
+        for post in matched:
+            post_id = post["id"]
+            if counts.get(post_id) == 0:  # 只回复无评论的帖子
+                reply = random.choice(reply_templates)
+                self.journal_begin("reply", post_id)
+                ok = bool(self.reply_comment(post_id, reply))
+                if ok:
+                    self.replied_posts.add(post_id)
+                self.journal_finish("reply", post_id, ok)
+                if ok:
+                    self.comment_counts.record_reply(post_id)
+                    self.stats["replies"] += 1
+                    hits = ", ".join(self.keyword_matcher.find(post.get("content", "")))
+                    logger.info(f"   ✅ 回复 [{hits}]: {post.get('content', '')[:30]}...")
+                    break  # 每次只回复一条
 
     def auto_follow_feed(self):
         """自动关注"""
@@ -262,7 +468,7 @@ class MoltbookAutoposter:
         max_follows = self.config.get("auto_follow", {}).get("max_per_run", 2)
         logger.info(f"👥 自动关注 (最多 {max_follows} 位)...")
         
-        feed = self.get_feed(20)
+        feed = self.get_cached_feed(20)
         count = 0
         
         for post in feed:
@@ -273,13 +479,17 @@ class MoltbookAutoposter:
             if isinstance(author, dict):
                 username = author.get("username")
                 if username and username not in self.followed_users:
-                    if self.follow_user(username):
+                    if not self.wait_for_rate_limit("follow"):
+                        break
+                    self.journal_begin("follow", username)
+                    ok = self.follow_user(username)
+                    if ok:
                         self.followed_users.add(username)
-                        self.followed_users.add(username)  # 去重
+                    self.journal_finish("follow", username, ok)
+                    if ok:
                         self.stats["follows"] += 1
                         logger.info(f"   ✅ 关注 @{username}")
                         count += 1
-                        time.sleep(random.uniform(2, 5))  # 较长延迟
 
     def auto_post(self):
         """自动发布"""
@@ -288,7 +498,9 @@ class MoltbookAutoposter:
 
         logger.info("📝 自动发布...")
         content = self.get_random_content()
+        self.journal_begin("post")
         result = self.create_post(content)
+        self.journal_finish("post", ok=bool(result))
         
         if result:
             self.stats["posts"] += 1
@@ -304,8 +516,57 @@ class MoltbookAutoposter:
         logger.info(f"   👥 关注: {self.stats['follows']}")
         logger.info(f"   📝 发布: {self.stats['posts']}")
         logger.info(f"   💬 回复: {self.stats['replies']}")
+
+        prefix = self.metric_labels["agent"] + "/"
+        endpoints = {key[len(prefix):]: entry for key, entry in self.metrics.endpoint_summary().items()
+                     if key.startswith(prefix)}
+        if endpoints:
+            logger.info("📈 接口统计:")
+            for endpoint, entry in sorted(endpoints.items()):
+                logger.info(f"   {endpoint:<9} 请求 {entry['requests']:>4}  429 {entry['rate_limited']:>3}  "
+                            f"重试 {entry['retries']:>3}  限流跳过 {entry['throttled']:>3}  "
+                            f"p50 {entry.get('p50_ms')}ms  p95 {entry.get('p95_ms')}ms")
         logger.info("=" * 40)
 
+    def close(self):
+        """保存状态并释放连接"""
+        self.journal.compact()
+        self.journal.close()
+        for exporter in self.exporters:
+            exporter.close()
+        for store in self.dedup_stores().values():
+            store.close()
+        if self._owns_session:
+            self.session.close()
+
+    def build_scheduler(self, actions: Dict) -> Scheduler:
+        """按配置为已启用的动作建立定时任务
+
+        每个动作可配置 interval_seconds（固定间隔）或 schedule（每日定点，如 "09:00,14:00"），
+        jitter_seconds / catch_up / grace_seconds 可在动作内覆盖全局 scheduler 配置。
+        """
+        defaults = {"auto_like": 60, "auto_follow": 120, "auto_reply": 300, "auto_post": 3600}
+        global_config = self.config.get("scheduler", {})
+        scheduler = Scheduler()
+
+        for name, func in actions.items():
+            action_config = self.config.get(name, {})
+            if not action_config.get("enabled"):
+                continue
+            options = dict(global_config)
+            options.update(action_config)
+            schedule = action_config.get("schedule")
+            scheduler.add(Job(
+                name,
+                self.metrics.timed(func, action=name, **self.metric_labels),
+                interval=None if schedule else action_config.get("interval_seconds", defaults[name]),
+                times=schedule,
+                jitter=options.get("jitter_seconds", 0),
+                catch_up=options.get("catch_up", "run_once"),
+                grace_seconds=options.get("grace_seconds", 60),
+            ))
+        return scheduler
+
     def run(self, run_once: bool = False):
         """主程序"""
         agent = self.credentials.get("agent_name", "Unknown")
@@ -316,62 +577,45 @@ class MoltbookAutoposter:
                    f"回复={self.config.get('auto_reply', {}).get('enabled')}, "
                    f"发布={self.config.get('auto_post', {}).get('enabled')}")
 
-        # 获取间隔配置
-        like_interval = self.config.get("auto_like", {}).get("interval_seconds", 60)
-        follow_interval = self.config.get("auto_follow", {}).get("interval_seconds", 120)
-        post_interval = self.config.get("auto_post", {}).get("interval_seconds", 3600)
-        reply_interval = self.config.get("auto_reply", {}).get("interval_seconds", 300)
+        actions = {
+            "auto_like": self.auto_like,
+            "auto_follow": self.auto_follow_feed,
+            "auto_reply": self.auto_reply,
+            "auto_post": self.auto_post,
+        }
 
         if run_once:
             # 单次运行模式
             logger.info("\n🧪 测试模式运行...")
-            if self.config.get("auto_like", {}).get("enabled"):
-                self.auto_like()
-            if self.config.get("auto_follow", {}).get("enabled"):
-                self.auto_follow_feed()
-            if self.config.get("auto_reply", {}).get("enabled"):
-                self.auto_reply()
-            if self.config.get("auto_post", {}).get("enabled"):
-                self.auto_post()
+            for name, action in actions.items():
+                if self.config.get(name, {}).get("enabled"):
+                    self.metrics.timed(action, action=name, **self.metric_labels)()
             self.print_stats()
+            self.close()
             return
 
-        # 持续运行模式
+        # 持续运行模式：睡到下一个任务到期
         logger.info("\n🔄 开始循环运行... (按 Ctrl+C 停止)")
+        scheduler = self.build_scheduler(actions)
         try:
-            while True:
-                now = datetime.now()
-
-                # 自动点赞
-                if self.config.get("auto_like", {}).get("enabled"):
-                    if now - self.last_like_time >= timedelta(seconds=like_interval):
-                        self.auto_like()
-                        self.last_like_time = now
-
-                # 自动关注
-                if self.config.get("auto_follow", {}).get("enabled"):
-                    if now - self.last_follow_time >= timedelta(seconds=follow_interval):
-                        self.auto_follow_feed()
-                        self.last_follow_time = now
-
-                # 自动发布
-                if self.config.get("auto_post", {}).get("enabled"):
-                    if now - self.last_post_time >= timedelta(seconds=post_interval):
-                        self.auto_post()
-                        self.last_post_time = now
-
-                time.sleep(10)  # 每 10 秒检查一次
-
+            scheduler.run()
         except KeyboardInterrupt:
             logger.info("\n👋 收到停止信号")
             self.print_stats()
+            self.close()
             logger.info("再见！")
 
 
 if __name__ == "__main__":
-    bot = MoltbookAutoposter()
-    
     # 检查是否测试模式
     run_once = "--once" in sys.argv or "-o" in sys.argv
-    
-    bot.run(run_once=run_once)
+
+    if "--async" in sys.argv:
+        # 异步模式：共享连接池 + 并发请求
+        import asyncio
+        from moltbook_async import AsyncMoltbookAutoposter
+        bot = AsyncMoltbookAutoposter()
+        asyncio.run(bot.run(run_once=run_once))
+    else:
+        bot = MoltbookAutoposter()
+        bot.run(run_once=run_once)
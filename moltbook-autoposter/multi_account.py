@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Multi-Account Runner - 单进程托管多个 Moltbook 账号
+所有账号共用一个 HTTP 连接池，限流与去重按账号独立；
+账号按一致性哈希分片到多个工作进程 / 多台机器
+
+使用方法：
+python3 multi_account.py                       # 运行 accounts.json 中的所有账号
+python3 multi_account.py --workers 4           # 本机 4 个进程分摊
+python3 multi_account.py --shard 0/3           # 多机部署：本机只跑第 0 片（共 3 片，从 0 开始编号）
+python3 multi_account.py --once                # 单次运行
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import multiprocessing
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from metrics import Metrics, start_exporters
+from moltbook_async import AsyncMoltbookAutoposter, HttpPool
+from moltbook_bot import MoltbookAutoposter
+
+logger = logging.getLogger(__name__)
+
+ACCOUNTS_PATH = Path.home() / ".config" / "moltbook" / "accounts.json"
+
+
+def load_accounts(path: Path = ACCOUNTS_PATH) -> List[Dict]:
+    """加载账号列表
+
+    格式：[{"api_key": "...", "agent_name": "...", "config": {...可选，覆盖 config.json}}]
+    """
+    if not Path(path).exists():
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get("accounts", []) if isinstance(data, dict) else data
+
+
+class HashRing:
+    """一致性哈希环：增减分片时只有约 1/N 的账号需要迁移"""
+
+    def __init__(self, nodes: List[str], replicas: int = 100):
+        self.ring = []
+        for node in nodes:
+            for i in range(replicas):
+                self.ring.append((self._hash(f"{node}#{i}"), node))
+        self.ring.sort()
+        self._keys = [h for h, _ in self.ring]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def node_for(self, key: str) -> str:
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self.ring)
+        return self.ring[index][1]
+
+
+def shard_accounts(accounts: List[Dict], shard: int, total: int, namespace: str = "shard") -> List[Dict]:
+    """按 agent_name 取出属于第 shard 片（共 total 片）的账号
+
+    namespace 区分不同层级的分片（机器 / 进程），避免两层哈希结果相关。
+    """
+    if total <= 1:
+        return list(accounts)
+    ring = HashRing([f"{namespace}-{i}" for i in range(total)])
+    target = f"{namespace}-{shard}"
+    return [a for a in accounts if ring.node_for(a.get("agent_name", a.get("api_key", ""))) == target]
+
+
+class MultiAccountRunner:
+    """在一个事件循环里运行多个账号（共用连接池和指标注册表）"""
+
+    def __init__(self, accounts: List[Dict], config_file: str = "config.json", worker: int = 0):
+        config = MoltbookAutoposter.load_config(config_file)
+        http = config.get("http", {})
+        self.pool = HttpPool(http.get("pool_size", 10), http.get("max_in_flight", 8))
+        self.metrics = Metrics()
+        self.pool.register_metrics(self.metrics)
+        # 每个工作进程一个指标端点：端口依次 +worker
+        self.exporters = start_exporters(self.metrics, config.get("metrics", {}),
+                                         f"worker{worker}", port_offset=worker)
+        self.bots = [
+            AsyncMoltbookAutoposter(
+                config_file,
+                credentials=account,
+                config_overrides=account.get("config"),
+                pool=self.pool,
+                metrics=self.metrics,
+            )
+            for account in accounts
+        ]
+
+    async def run(self, run_once: bool = False):
+        logger.info(f"🚀 多账号运行：{len(self.bots)} 个账号，共享连接池")
+        try:
+            await asyncio.gather(*(bot.run(run_once=run_once) for bot in self.bots))
+        finally:
+            self.pool.close()
+            for exporter in self.exporters:
+                exporter.close()
+
+
+def run_shard(accounts: List[Dict], config_file: str, run_once: bool, worker: int = 0):
+    """运行一个分片（工作进程入口）"""
+    if not accounts:
+        logger.info("本分片没有账号")
+        return
+    try:
+        asyncio.run(MultiAccountRunner(accounts, config_file, worker).run(run_once=run_once))
+    except KeyboardInterrupt:
+        pass
+
+
+def parse_shard(value: Optional[str]):
+    """解析 "i/N"（i 从 0 开始，0 <= i < N）"""
+    if not value:
+        return 0, 1
+    try:
+        index, total = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"分片格式应为 i/N，如 0/3: {value}")
+    if not 0 <= index < total:
+        raise ValueError(f"分片序号需满足 0 <= i < N（从 0 开始编号）: {value}")
+    return index, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Moltbook 多账号运行")
+    parser.add_argument("--accounts", default=str(ACCOUNTS_PATH), help="账号文件")
+    parser.add_argument("--config", default="config.json", help="公共配置文件")
+    parser.add_argument("--shard", help="本机负责的分片，如 0/3")
+    parser.add_argument("--workers", type=int, default=1, help="本机工作进程数")
+    parser.add_argument("--once", action="store_true", help="单次运行")
+    args = parser.parse_args()
+
+    try:
+        shard, total = parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+    accounts = shard_accounts(load_accounts(Path(args.accounts)), shard, total)
+    logger.info(f"分片 {shard}/{total}: {len(accounts)} 个账号，{args.workers} 个进程")
+
+    if args.workers <= 1:
+        run_shard(accounts, args.config, args.once)
+        return
+
+    processes = []
+    for worker in range(args.workers):
+        part = shard_accounts(accounts, worker, args.workers, namespace="worker")
+        p = multiprocessing.Process(target=run_shard, args=(part, args.config, args.once, worker),
+                                    name=f"moltbook-worker-{worker}")
+        p.start()
+        processes.append(p)
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        for p in processes:
+            p.join()
+
+
+if __name__ == "__main__":
+    main()
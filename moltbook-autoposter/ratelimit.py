@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter - 按接口划分的令牌桶限流
+根据 429 / Retry-After / X-RateLimit-* 响应头自动调整，限流时不阻塞主循环
+"""
+
+import asyncio
+import threading
+import time
+import logging
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """令牌桶：rate 为每秒补充的令牌数，burst 为桶容量"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.default_rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def delay(self, now: Optional[float] = None) -> float:
+        """距下一个可用令牌的秒数（0 表示可立即执行）"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate if self.rate > 0 else 60.0)
+        return wait
+
+    def try_acquire(self, now: Optional[float] = None) -> bool:
+        """尝试取一个令牌，失败立即返回 False"""
+        now = time.monotonic() if now is None else now
+        if self.delay(now) > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+    def block_for(self, seconds: float, now: Optional[float] = None):
+        """服务端要求暂停（Retry-After / 配额耗尽）"""
+        now = time.monotonic() if now is None else now
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = now
+
+
+class RateLimiter:
+    """Moltbook 各接口的限流器"""
+
+    DEFAULT_LIMITS = {
+        "upvote": {"rate": 0.5, "burst": 3},
+        "follow": {"rate": 0.3, "burst": 1},
+        "posts": {"rate": 1.0, "burst": 5},
+        "comments": {"rate": 5.0, "burst": 10},
+        "default": {"rate": 1.0, "burst": 5},
+    }
+
+    def __init__(self, limits: Optional[Dict] = None):
+        merged = {name: dict(cfg) for name, cfg in self.DEFAULT_LIMITS.items()}
+        for name, cfg in (limits or {}).items():
+            merged.setdefault(name, {}).update(cfg)
+        self.buckets = {
+            name: TokenBucket(cfg.get("rate", 1.0), cfg.get("burst", 1))
+            for name, cfg in merged.items()
+        }
+        # 评论数预取会在多个线程里取令牌，指标导出线程也会读取 delay()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint_for(method: str, url: str) -> str:
+        """根据请求路径归类接口"""
+        path = urlparse(url).path.rstrip("/")
+        if path.endswith("/upvote"):
+            return "upvote"
+        if path.endswith("/follow"):
+            return "follow"
+        if path.endswith("/comments"):
+            return "comments"
+        if path.endswith("/posts"):
+            return "posts"
+        return "default"
+
+    def bucket(self, endpoint: str) -> TokenBucket:
+        return self.buckets.get(endpoint) or self.buckets["default"]
+
+    def delay(self, endpoint: str) -> float:
+        """该接口还需等待的秒数"""
+        with self._lock:
+            return self.bucket(endpoint).delay()
+
+    def ready(self, endpoint: str) -> bool:
+        return self.delay(endpoint) <= 0
+
+    def next_available(self, endpoint: str) -> float:
+        """该接口下次可用的时间点（time.monotonic 基准），用于提前排期"""
+        return time.monotonic() + self.delay(endpoint)
+
+    def try_acquire(self, endpoint: str) -> bool:
+        with self._lock:
+            return self.bucket(endpoint).try_acquire()
+
+    async def acquire(self, endpoint: str):
+        """异步等待令牌，只挂起当前协程，其他接口照常执行"""
+        while not self.try_acquire(endpoint):
+            await asyncio.sleep(self.delay(endpoint))
+
+    def observe(self, endpoint: str, response) -> None:
+        """根据响应状态码和限流头调整令牌桶"""
+        with self._lock:
+            self._observe(self.bucket(endpoint), endpoint, response)
+
+    def _observe(self, bucket: TokenBucket, endpoint: str, response) -> None:
+        headers = response.headers
+
+        if response.status_code == 429:
+            wait_time = self._parse_seconds(headers.get("Retry-After"), default=60)
+            logger.warning(f"Rate limited on {endpoint}, pausing {wait_time:.0f}s")
+            bucket.block_for(wait_time)
+            return
+
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = self._parse_seconds(headers.get("X-RateLimit-Reset"), default=None)
+        if remaining is None:
+            return
+        try:
+            remaining = int(remaining)
+        except ValueError:
+            return
+
+        if remaining <= 0:
+            bucket.block_for(reset if reset is not None else 60)
+        elif reset:
+            # 按剩余配额均匀分配到重置前，尽量用满服务端允许的次数
+            bucket.rate = max(remaining / reset, bucket.default_rate / 10)
+            bucket.tokens = min(bucket.tokens, remaining)
+        else:
+            bucket.tokens = min(bucket.tokens, remaining)
+
+    @staticmethod
+    def _parse_seconds(value, default):
+        """解析秒数；超大值视为 Unix 时间戳"""
+        if value is None:
+            return default
+        try:
+            seconds = float(value)
+        except ValueError:
+            return default
+        if seconds > 1e9:
+            seconds -= time.time()
+        return max(0.0, seconds)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Scheduler - 基于堆的定时器调度
+只在下一个任务到期时醒来；支持固定间隔、随机抖动、每日定点（如 "09:00,14:00,20:00"）
+以及卡顿后的补跑策略
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 补跑策略
+CATCH_UP_ONCE = "run_once"   # 错过多次只补跑一次
+CATCH_UP_SKIP = "skip"       # 超过宽限期则跳过，等下一次
+CATCH_UP_ALL = "run_all"     # 错过几次补跑几次（有上限）
+
+
+def parse_times(schedule: str) -> List[Tuple[int, int]]:
+    """解析 "09:00,14:00,20:00" 格式的每日定点"""
+    times = []
+    for item in schedule.split(","):
+        item = item.strip()
+        if item:
+            hour, minute = item.split(":")
+            times.append((int(hour), int(minute)))
+    return sorted(times)
+
+
+class Job:
+    """定时任务：interval 与 times 二选一"""
+
+    def __init__(self, name: str, func: Callable, interval: Optional[float] = None,
+                 times: Optional[str] = None, jitter: float = 0,
+                 catch_up: str = CATCH_UP_ONCE, grace_seconds: float = 60,
+                 max_catch_up: int = 3):
+        if interval is None and not times:
+            raise ValueError(f"{name}: 需要 interval 或 times")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.times = parse_times(times) if times else []
+        self.jitter = jitter
+        self.catch_up = catch_up
+        self.grace_seconds = grace_seconds
+        self.max_catch_up = max_catch_up
+
+    def next_after(self, ts: float) -> float:
+        """ts 之后的下一次执行时间（不含抖动）"""
+        if self.interval is not None:
+            return ts + self.interval
+        now = datetime.fromtimestamp(ts)
+        for day in (0, 1):
+            base = now + timedelta(days=day)
+            for hour, minute in self.times:
+                candidate = base.replace(hour=hour, minute=minute, second=0, microsecond=0)
+                if candidate > now:
+                    return candidate.timestamp()
+        raise ValueError(f"{self.name}: 无效的定点配置")
+
+    def with_jitter(self, ts: float) -> float:
+        return ts + random.uniform(0, self.jitter) if self.jitter else ts
+
+
+class Scheduler:
+    """最小堆调度器"""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+
+    def add(self, job: Job, first_run: Optional[float] = None):
+        """加入任务，默认在一个周期后首次执行"""
+        due = first_run if first_run is not None else job.with_jitter(job.next_after(time.time()))
+        heapq.heappush(self._heap, (due, next(self._seq), job))
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def next_delay(self, now: Optional[float] = None) -> Optional[float]:
+        """距下一个任务到期的秒数；没有任务返回 None"""
+        if not self._heap:
+            return None
+        now = time.time() if now is None else now
+        return max(0.0, self._heap[0][0] - now)
+
+    def pop_due(self, now: Optional[float] = None) -> List[Job]:
+        """取出所有到期任务并重新排期；按补跑策略决定每个任务执行几次"""
+        now = time.time() if now is None else now
+        runs = []
+        while self._heap and self._heap[0][0] <= now:
+            due, _, job = heapq.heappop(self._heap)
+            runs.extend([job] * self._runs_for(job, due, now))
+            heapq.heappush(self._heap, (job.with_jitter(job.next_after(now)), next(self._seq), job))
+        return runs
+
+    @staticmethod
+    def _runs_for(job: Job, due: float, now: float) -> int:
+        late = now - due
+        if late <= job.grace_seconds:
+            return 1
+        if job.catch_up == CATCH_UP_SKIP:
+            logger.warning(f"⏭️ {job.name} 延迟 {late:.0f}s，跳过本次")
+            return 0
+        if job.catch_up == CATCH_UP_ALL:
+            missed, ts = 0, due
+            while ts <= now and missed < job.max_catch_up:
+                missed += 1
+                ts = job.next_after(ts)
+            logger.warning(f"⏩ {job.name} 延迟 {late:.0f}s，补跑 {missed} 次")
+            return missed
+        logger.warning(f"⏩ {job.name} 延迟 {late:.0f}s，补跑一次")
+        return 1
+
+    def run(self):
+        """同步运行：睡到下一个任务到期"""
+        while self._heap:
+            time.sleep(self.next_delay())
+            for job in self.pop_due():
+                try:
+                    job.func()
+                except Exception as e:
+                    logger.error(f"{job.name} 执行失败: {e}")
+
+    async def run_async(self):
+        """异步运行：同一时刻到期的任务并发执行"""
+        while self._heap:
+            await asyncio.sleep(self.next_delay())
+            jobs = self.pop_due()
+            # 同一任务的补跑按顺序执行，不同任务之间并发
+            counts = {}
+            for job in jobs:
+                counts[job] = counts.get(job, 0) + 1
+            await asyncio.gather(*(self._run_times(job, n) for job, n in counts.items()))
+
+    @staticmethod
+    async def _run_times(job: Job, times: int):
+        for _ in range(times):
+            try:
+                await job.func()
+            except Exception as e:
+                logger.error(f"{job.name} 执行失败: {e}")
@@ -118,22 +118,34 @@ class NewsDigestBot:
         
         return '\n'.join(lines)
     
-    def run(self) -> str:
-        """主程序"""
-        lines = [f"📰 每日热点 - {datetime.now().strftime('%Y-%m-%d')}\n"]
-        lines.append("=" * 40)
-        
+    def fetch_all(self) -> Dict[str, List[Dict]]:
+        """抓取所有配置的来源，返回 {来源: 新闻列表}"""
+        fetched = {}
         for source in self.config.get("sources", []):
             if source == "ruanyifeng":
-                news = self.get_ruanyifeng()
+                fetched[source] = self.get_ruanyifeng()
             elif source == "bilibili":
-                news = self.get_bilibili()
+                fetched[source] = self.get_bilibili()
             else:
-                news = []
+                fetched[source] = []
+        return fetched
+    
+    def build_message(self, fetched: Dict[str, List[Dict]] = None) -> str:
+        """抓取各来源（或使用已抓取的结果）并生成消息（不打印）"""
+        if fetched is None:
+            fetched = self.fetch_all()
+        lines = [f"📰 每日热点 - {datetime.now().strftime('%Y-%m-%d')}\n"]
+        lines.append("=" * 40)
+        
+        for source, news in fetched.items():
             lines.append(self.format_message(news, source))
         
         lines.append("\n#热点 #每日汇总")
-        message = '\n'.join(lines)
+        return '\n'.join(lines)
+    
+    def run(self) -> str:
+        """主程序"""
+        message = self.build_message()
         print(message)
         return message
 
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+服务器告警状态机
+
+每个指标（多主机时为 主机/指标）维护一个状态：
+    ok ──超过阈值──▶ pending ──持续 sustain 秒──▶ firing ──低于 阈值-hysteresis──▶ clearing ──持续 clear_after 秒──▶ ok
+pending 期间回落直接回到 ok，clearing 期间再次超过阈值直接回到 firing，这两种情况都不发消息。
+只在状态转换时产生事件：firing（新告警）、renotify（持续告警，每 renotify 秒提醒一次）、resolved（已恢复）。
+
+有采样器汇总时用 1 分钟均值判断，单秒尖峰不会触发；若整个 5 分钟 / 1 小时窗口的最小值都超过阈值，
+说明已经持续超限，不必等到下一次检查。
+
+状态保存在 ~/.openclaw/monitor/alert_state.json，每个告警（incident）的开始 / 恢复记录追加到
+~/.openclaw/monitor/incidents.jsonl。
+
+配置（config.json）：
+    "thresholds": {"cpu": 80, "memory": 90, "disk": 90},
+    "alerting": {"sustain": 300, "hysteresis": 5, "clear_after": 300, "renotify": 3600,
+                 "cpu": {"sustain": 120}}          # 可按指标覆盖
+
+使用方法：
+python3 alerts.py            # 查看当前告警状态
+python3 alerts.py --history  # 查看最近的告警记录
+"""
+
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+STATE_DIR = Path.home() / ".openclaw" / "monitor"
+STATE_PATH = STATE_DIR / "alert_state.json"
+INCIDENTS_PATH = STATE_DIR / "incidents.jsonl"
+
+DEFAULT_ALERTING = {"sustain": 300, "hysteresis": 5, "clear_after": 300, "renotify": 3600}
+DEFAULT_THRESHOLDS = {"cpu": 80, "memory": 90, "disk": 90}
+LABELS = {"cpu": ("CPU", "CPU 过载"), "memory": ("内存", "内存告警"), "disk": ("磁盘", "磁盘不足")}
+WINDOW_SECONDS = {"1m": 60, "5m": 300, "1h": 3600}
+
+OK = "ok"
+PENDING = "pending"
+FIRING = "firing"
+CLEARING = "clearing"
+
+
+class AlertRule:
+    """一个指标的阈值和时间参数"""
+
+    def __init__(self, metric, threshold, sustain, hysteresis, clear_after, renotify):
+        self.metric = metric
+        self.threshold = threshold
+        self.sustain = sustain
+        self.hysteresis = hysteresis
+        self.clear_after = clear_after
+        self.renotify = renotify
+
+    @property
+    def label(self):
+        return LABELS.get(self.metric, (self.metric, ""))[0]
+
+    @property
+    def title(self):
+        return LABELS.get(self.metric, (self.metric, f"{self.metric} 告警"))[1]
+
+    def limit_text(self):
+        return f"(>{self.threshold:g}%)"
+
+
+def load_rules(config):
+    """根据 config 的 thresholds / alerting 生成告警规则"""
+    thresholds = {**DEFAULT_THRESHOLDS, **config.get("thresholds", {})}
+    alerting = config.get("alerting", {})
+    rules = []
+    for metric, threshold in thresholds.items():
+        options = {key: alerting.get(key, value) for key, value in DEFAULT_ALERTING.items()}
+        options.update(alerting.get(metric, {}))
+        rules.append(AlertRule(metric, float(threshold), **options))
+    return rules
+
+
+def observe(item, rule):
+    """(判断用的值, 已确认持续超限的秒数, 是否已确认持续回落)"""
+    stats = item.get("stats", {})
+    value = stats["1m"]["avg"] if "1m" in stats else item.get("value", 0)
+    sustained, cleared = 0, False
+    for window, seconds in WINDOW_SECONDS.items():
+        if window not in stats:
+            continue
+        covered = min(seconds, stats[window].get("span", seconds))  # 采样器刚启动时窗口未满
+        if covered >= rule.sustain and stats[window]["min"] > rule.threshold:
+            sustained = max(sustained, covered)
+        if covered >= rule.clear_after and stats[window]["max"] < rule.threshold - rule.hysteresis:
+            cleared = True
+    return value, sustained, cleared
+
+
+class AlertEngine:
+    """按规则评估状态并持久化，evaluate() 只返回状态转换产生的事件"""
+
+    def __init__(self, rules, path=STATE_PATH, incidents_path=INCIDENTS_PATH):
+        self.rules = rules
+        self.path = Path(path)
+        self.incidents_path = Path(incidents_path)
+        try:
+            with open(self.path) as f:
+                self.states = json.load(f)
+        except (OSError, ValueError):
+            self.states = {}
+
+    def evaluate(self, status, host="", now=None):
+        """status 为 get_all_status() 的结果，返回事件列表"""
+        now = time.time() if now is None else now
+        events = []
+        prefix = f"{host}/" if host else ""
+        for rule in self.rules:
+            for name, item, label, title in self._items(status, rule):
+                if not item or "error" in item:
+                    continue
+                event = self._step(prefix + name, rule, item, now)
+                if event:
+                    event.update(host=host, metric=rule.metric, label=label,
+                                 title=title, limit=rule.limit_text())
+                    events.append(event)
+        return events
+
+    @staticmethod
+    def _items(status, rule):
+        """(状态键, 指标, 名称, 标题)：磁盘规则同时作用于 / 以外的每个挂载点，名称和标题带上挂载点"""
+        yield rule.metric, status.get(rule.metric), rule.label, rule.title
+        if rule.metric == "disk":
+            for mount in status.get("mounts", []):
+                if mount["mount"] != "/":
+                    yield (f"disk:{mount['mount']}", {"value": mount["percent"]},
+                           f"{rule.label} {mount['mount']}", f"{rule.title} {mount['mount']}")
+
+    def _step(self, key, rule, item, now):
+        value, sustained, cleared = observe(item, rule)
+        state = self.states.setdefault(key, {"state": OK, "since": now})
+        current = state["state"]
+        above = value > rule.threshold
+        below = value < rule.threshold - rule.hysteresis
+        state["value"] = value
+        state["checked_at"] = now
+
+        if current == OK:
+            if above:
+                state.update(state=PENDING, since=now)
+                current = PENDING
+            else:
+                return None
+
+        if current == PENDING:
+            if not above:
+                state.update(state=OK, since=now)
+                return None
+            if sustained:
+                state["since"] = min(state["since"], now - sustained)
+            if now - state["since"] >= rule.sustain:
+                state.update(state=FIRING, notified_at=now, peak=value, incident=f"{key}@{int(state['since'])}")
+                self._log("opened", key, state, value)
+                return {"kind": "firing", "value": value, "since": state["since"], "incident": state["incident"]}
+            return None
+
+        state["peak"] = max(state.get("peak", value), value)
+        if current == CLEARING and not below:  # 回到滞回带以上，重新计算回落时间
+            state.update(state=FIRING, cleared_at=None)
+            return None
+        if current == FIRING:
+            if below:
+                state.update(state=CLEARING, cleared_at=now)
+            elif now - state.get("notified_at", 0) >= rule.renotify:
+                state["notified_at"] = now
+                return {"kind": "renotify", "value": value, "since": state["since"],
+                        "incident": state.get("incident"), "at": int(now)}
+            else:
+                return None
+
+        # clearing：回落持续 clear_after 秒（或整个窗口都已回落）后恢复
+        if cleared or now - state["cleared_at"] >= rule.clear_after:
+            event = {"kind": "resolved", "value": value, "since": state["since"], "peak": state["peak"],
+                     "incident": state.get("incident")}
+            self._log("resolved", key, state, value)
+            self.states[key] = {"state": OK, "since": now}
+            return event
+        return None
+
+    def _log(self, kind, key, state, value):
+        record = {"time": round(state["checked_at"], 3), "event": kind, "key": key,
+                  "incident": state.get("incident"), "since": state["since"],
+                  "value": round(value, 2), "peak": round(state.get("peak", value), 2)}
+        try:
+            self.incidents_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.incidents_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"写入告警记录失败: {e}")
+
+    def forget(self, before):
+        """丢弃 before 之后没有再评估过的状态（如已下线的主机），返回其中仍在告警的键"""
+        dropped = []
+        for key in [key for key, state in self.states.items() if state.get("checked_at", state["since"]) < before]:
+            state = self.states.pop(key)
+            if state["state"] in (FIRING, CLEARING):
+                self._log("dropped", key, state, state.get("value", 0))
+                dropped.append(key)
+        return dropped
+
+    def open_incidents(self):
+        """正在告警（firing / clearing）的 {键: 状态}"""
+        return {key: state for key, state in self.states.items() if state["state"] in (FIRING, CLEARING)}
+
+    def save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(self.states, f, ensure_ascii=False, indent=1)
+            tmp.replace(self.path)
+        except OSError as e:
+            print(f"保存告警状态失败: {e}")
+
+
+def _duration(seconds):
+    minutes = int(seconds) // 60
+    if minutes < 60:
+        return f"{minutes} 分钟"
+    return f"{minutes // 60} 小时 {minutes % 60} 分钟"
+
+
+def format_event(event, now=None):
+    """一条事件的文本"""
+    now = time.time() if now is None else now
+    who = f"[{event['host']}] " if event.get("host") else ""
+    lasted = _duration(now - event["since"])
+    if event["kind"] == "firing":
+        return f"🚨 {who}{event['title']}: {event['value']:.1f}% {event['limit']}，已持续 {lasted}"
+    if event["kind"] == "renotify":
+        return f"🔁 {who}{event['title']}（仍未恢复）: {event['value']:.1f}% {event['limit']}，已持续 {lasted}"
+    return f"✅ {who}{event['label']} 已恢复: {event['value']:.1f}%（持续 {lasted}，峰值 {event['peak']:.1f}%）"
+
+
+def event_key(event):
+    """事件的去重键（incident:kind），同一告警的同一次开始 / 提醒 / 恢复只发送一次"""
+    kind = event["kind"] if event["kind"] != "renotify" else f"renotify@{event['at']}"
+    return f"{event['incident']}:{kind}"
+
+
+def format_events(events, now=None):
+    lines = [f"🖥️ **服务器告警** - {datetime.now().strftime('%m/%d %H:%M')}", ""]
+    lines.extend(format_event(event, now) for event in events)
+    return "\n".join(lines)
+
+
+def main():
+    if "--history" in sys.argv:
+        if not INCIDENTS_PATH.exists():
+            print("暂无告警记录")
+            return
+        with open(INCIDENTS_PATH, encoding="utf-8") as f:
+            lines = f.readlines()[-20:]
+        for line in lines:
+            record = json.loads(line)
+            when = datetime.fromtimestamp(record["time"]).strftime("%m-%d %H:%M")
+            print(f"   {when} {record['event']:<9} {record['key']:<20} 当前 {record['value']:.1f} 峰值 {record['peak']:.1f}")
+        return
+
+    engine = AlertEngine([])
+    if not engine.states:
+        print("暂无告警状态")
+        return
+    for key, state in sorted(engine.states.items()):
+        since = datetime.fromtimestamp(state["since"]).strftime("%m-%d %H:%M")
+        print(f"   {key:<20} {state['state']:<9} 自 {since}  最近值 {state.get('value', 0):.1f}")
+
+
+if __name__ == "__main__":
+    main()
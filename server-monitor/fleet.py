@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+服务器集群监控：agent 上报 + aggregator 汇总
+
+每台机器运行一个轻量的 agent，每秒采样一次（procfs），把一条紧凑的二进制记录推送给 aggregator
+（UDP，或 HTTP POST）。aggregator 为每台主机保留约 1 分钟的原始采样和一小时的每分钟汇总
+（收到采样时增量更新，每台约 10 KB），评估线程每 EVAL_INTERVAL 秒用 1m / 5m 汇总评估告警
+（alerts.AlertEngine，键为 主机/指标），把所有主机的告警状态变化、失联 / 恢复上报合并成一条消息，
+每小时整点发送一份集群报告。接收线程只负责写入，不做汇总计算。
+只有 aggregator 需要飞书配置，各主机不再各自鉴权和发送；消息经发件箱（feishu_outbox）投递。
+
+记录格式（小端）：魔数 "OCFS" | 版本 u8 | 采样时间 f64 | cpu memory disk load1 load5 load15 f32 | 主机名长度 u8 | 主机名
+HTTP 请求体可以是多条记录首尾相接。
+
+使用方法：
+python3 fleet.py aggregator --listen 0.0.0.0:9477 [--http 9478] [--config config.json]
+python3 fleet.py agent --to 10.0.0.1:9477 [--name web-1]       # UDP 上报
+python3 fleet.py agent --http http://10.0.0.1:9478/samples       # HTTP 上报
+
+# 本机测试：一个 aggregator + 多个 agent
+python3 fleet.py aggregator --listen 127.0.0.1:9477 --report-every 60 &
+for i in 1 2 3; do python3 fleet.py agent --to 127.0.0.1:9477 --name test-$i & done
+"""
+
+import copy
+import selectors
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+import urllib.request
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from alerts import STATE_DIR, AlertEngine, event_key, format_event, load_rules
+from feishu_outbox import Outbox
+from procfs import ProcCollector
+from sampler import METRICS, WINDOWS, rollup
+
+MAGIC = b"OCFS"
+VERSION = 1
+RECORD = struct.Struct(f"<4sBd{len(METRICS)}fB")  # 不含主机名，主机名紧随其后
+DEFAULT_PORT = 9477
+RECEIVER_ID = "ou_a44cdd1c2064d3c9c22242b61ff8b926"
+
+FLEET_STATE_PATH = STATE_DIR / "fleet_alert_state.json"
+EVAL_INTERVAL = 15     # 告警评估间隔（秒）
+OFFLINE_AFTER = 30     # 超过多少秒没有上报视为失联
+FORGET_AFTER = 3600    # 失联超过一小时后丢弃该主机的数据和告警状态
+REPORT_TOP = 20        # 报告中最多列出的主机数（按严重程度排序）
+MAX_HOSTS = 1000       # 最多跟踪的主机数（UDP 无鉴权，超出后新主机名的记录直接丢弃）
+RAW_SECONDS = 64       # 每台主机保留的原始采样条数（1m 窗口）
+MINUTES = 61           # 每分钟汇总的槽位数（1 小时 + 当前分钟）
+
+
+# ========== 记录编解码 ==========
+
+def pack_sample(name, ts, sample):
+    host = name.encode("utf-8")[:255]
+    return RECORD.pack(MAGIC, VERSION, ts, *(sample[metric] for metric in METRICS), len(host)) + host
+
+
+def unpack_samples(data):
+    """解析一段数据中的所有记录：[(主机名, 采样时间, (各指标值))]，格式不对的部分直接丢弃"""
+    records = []
+    offset = 0
+    while offset + RECORD.size <= len(data):
+        magic, version, ts, *values, length = RECORD.unpack_from(data, offset)
+        if magic != MAGIC or version != VERSION:
+            break
+        start = offset + RECORD.size
+        host = bytes(data[start:start + length]).decode("utf-8", "replace")
+        records.append((host, ts, values))
+        offset = start + length
+    return records
+
+
+# ========== aggregator ==========
+
+class HostSeries:
+    """一台主机的最近数据，占用内存固定：
+
+    - 原始采样环形缓冲区（约 1 分钟）：时间戳 array('d') + 各指标 array('f')，用于 1m 汇总
+    - 每分钟汇总（1 小时）：收到采样时增量更新各指标的 sum / min / max，5m / 1h 汇总只需合并几十个槽位
+    """
+
+    def __init__(self, capacity=RAW_SECONDS, minutes=MINUTES):
+        self.capacity = capacity
+        self.width = len(METRICS)
+        self.times = array("d", bytes(8 * capacity))
+        self.values = array("f", bytes(4 * capacity * self.width))
+        self.count = 0
+        self.last_sample_ts = 0.0
+        self.minutes = minutes
+        self.minute_ids = array("q", [-1]) * minutes
+        self.minute_first = array("d", bytes(8 * minutes))
+        self.minute_count = array("L", bytes(array("L").itemsize * minutes))
+        self.sums = array("d", bytes(8 * minutes * self.width))
+        self.mins = array("f", bytes(4 * minutes * self.width))
+        self.maxs = array("f", bytes(4 * minutes * self.width))
+
+    def append(self, ts, values):
+        index = self.count % self.capacity
+        self.times[index] = ts
+        base = index * self.width
+        self.values[base:base + self.width] = array("f", values)
+        self.count += 1
+
+        minute = int(ts // 60)
+        slot = minute % self.minutes
+        base = slot * self.width
+        if self.minute_ids[slot] != minute:  # 进入新的一分钟，覆盖一小时前的槽位
+            self.minute_ids[slot] = minute
+            self.minute_first[slot] = ts
+            self.minute_count[slot] = 0
+            self.sums[base:base + self.width] = array("d", bytes(8 * self.width))
+            self.mins[base:base + self.width] = array("f", values)
+            self.maxs[base:base + self.width] = array("f", values)
+        self.minute_count[slot] += 1
+        for i, value in enumerate(values):
+            self.sums[base + i] += value
+            if value < self.mins[base + i]:
+                self.mins[base + i] = value
+            if value > self.maxs[base + i]:
+                self.maxs[base + i] = value
+
+    @property
+    def last_seen(self):
+        return self.times[(self.count - 1) % self.capacity] if self.count else 0.0
+
+    def snapshot(self):
+        """复制一份（在锁内调用，汇总计算放到锁外）"""
+        snapshot = copy.copy(self)
+        for name, value in vars(self).items():
+            if isinstance(value, array):
+                setattr(snapshot, name, value[:])
+        return snapshot
+
+    def read(self, since):
+        """时间戳 >= since 的原始采样 [(ts, 各指标值...)]，按时间先后排列"""
+        rows = []
+        for position in range(self.count - 1, max(-1, self.count - 1 - self.capacity), -1):
+            index = position % self.capacity
+            ts = self.times[index]
+            if ts < since:
+                break
+            base = index * self.width
+            rows.append((ts, *self.values[base:base + self.width]))
+        rows.reverse()
+        return rows
+
+    def window(self, seconds):
+        """最近 seconds 秒的 {指标: {"min", "avg", "max", "span"}}（不含 p95）
+
+        按整分钟合并：包含当前分钟和之前 seconds // 60 个完整分钟，覆盖时间不少于 seconds。
+        """
+        latest = self.last_seen
+        current = int(latest // 60)
+        slots = [slot for slot in range(self.minutes)
+                 if current - seconds // 60 <= self.minute_ids[slot] <= current]
+        if not slots:
+            return {}
+        total = sum(self.minute_count[slot] for slot in slots)
+        span = latest - min(self.minute_first[slot] for slot in slots)
+        stats = {}
+        for i, metric in enumerate(METRICS):
+            offsets = [slot * self.width + i for slot in slots]
+            stats[metric] = {"min": min(self.mins[offset] for offset in offsets),
+                             "avg": sum(self.sums[offset] for offset in offsets) / total,
+                             "max": max(self.maxs[offset] for offset in offsets), "span": span}
+        return stats
+
+
+class Aggregator:
+    """接收各主机的采样，评估告警并发送合并后的消息"""
+
+    def __init__(self, config, client=None, report_every=None):
+        self.config = config
+        self.client = client
+        self.report_every = report_every  # 测试用：每隔多少秒发一次报告（默认每小时整点）
+        self.hosts = {}
+        self.offline = set()
+        self.engine = AlertEngine(load_rules(config), path=FLEET_STATE_PATH)
+        self.thresholds = {rule.metric: rule.threshold for rule in self.engine.rules}
+        self._lock = threading.Lock()
+        self._sender = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fleet-send")
+        self.outbox = Outbox() if client is not None else None
+        self.received = 0
+        self.rejected = 0
+        self.stopping = threading.Event()
+
+    def ingest(self, data):
+        """写入一段数据中的所有记录，返回写入条数（用到达时间记录，避免各主机时钟偏差）"""
+        now = time.time()
+        written = 0
+        with self._lock:
+            for host, ts, values in unpack_samples(data):
+                series = self.hosts.get(host)
+                if series is None:
+                    if len(self.hosts) >= MAX_HOSTS:
+                        self.rejected += 1
+                        continue
+                    series = self.hosts[host] = HostSeries()
+                if ts <= series.last_sample_ts:  # 重复或乱序到达的旧记录
+                    continue
+                series.last_sample_ts = ts
+                series.append(now, values)
+                written += 1
+            self.received += written  # UDP 和 HTTP 接收线程都会调用
+        return written
+
+    def snapshots(self):
+        """各主机数据的副本 [(主机名, HostSeries)]，持锁时间只有内存拷贝"""
+        with self._lock:
+            return sorted((host, series.snapshot()) for host, series in self.hosts.items())
+
+    @staticmethod
+    def host_status(series, windows=("1m", "5m")):
+        """一台主机的状态（get_all_status 格式，stats 只含所需窗口）：1m 用原始采样，其余用每分钟汇总"""
+        from monitor import status_from_summary
+
+        rows = series.read(series.last_seen - WINDOWS["1m"][0])
+        latest = rows[-1]
+        summaries = {}
+        for name in windows:
+            if name == "1m":
+                summaries[name] = rollup([row for row in rows if row[0] > latest[0] - WINDOWS[name][0]])
+            else:
+                summaries[name] = series.window(WINDOWS[name][0])
+        return status_from_summary(dict(zip(METRICS, latest[1:])), summaries)
+
+    def evaluate(self, now=None):
+        """评估所有主机，返回 (需要发送的文本行, 告警事件)（告警状态变化 + 失联 / 恢复上报）
+
+        只更新内存中的告警状态；调用方把消息写入发件箱后再 engine.save()。
+        """
+        now = time.time() if now is None else now
+        lines = []
+        events = []
+        for host, series in self.snapshots():
+            silent = now - series.last_seen
+            if silent > FORGET_AFTER:
+                with self._lock:
+                    if self.hosts.get(host) is not None and now - self.hosts[host].last_seen > FORGET_AFTER:
+                        del self.hosts[host]
+                self.offline.discard(host)
+                continue
+            if silent > OFFLINE_AFTER:
+                if host not in self.offline:
+                    self.offline.add(host)
+                    lines.append(f"📴 [{host}] 失联（最后上报 {datetime.fromtimestamp(series.last_seen).strftime('%H:%M:%S')}）")
+                continue
+            if host in self.offline:
+                self.offline.discard(host)
+                lines.append(f"📶 [{host}] 恢复上报")
+            for event in self.engine.evaluate(self.host_status(series), host=host, now=now):
+                events.append(event)
+                lines.append(format_event(event, now))
+        # 失联超过 FORGET_AFTER 的主机（包括重启前留下的）不会再被评估，清除其告警状态
+        dropped = self.engine.forget(now - FORGET_AFTER)
+        if dropped:
+            lines.append("🗑️ 已清除失联主机的告警: " + "、".join(dropped))
+        return lines, events
+
+    def _severity(self, status):
+        """0 正常 / 1 接近阈值 / 2 超过阈值"""
+        level = 0
+        for metric, threshold in self.thresholds.items():
+            value = status.get(metric, {}).get("value", 0)
+            if value > threshold:
+                return 2
+            if value > threshold - 10:
+                level = 1
+        return level
+
+    def report(self):
+        """集群报告：按严重程度列出各主机的当前值和 1 小时峰值"""
+        snapshots = self.snapshots()
+        hosts = [(host, self.host_status(series, windows=("1h",)))
+                 for host, series in snapshots if host not in self.offline]
+        offline = sorted(self.offline & {host for host, _ in snapshots})
+        ranked = sorted(hosts, key=lambda item: (-self._severity(item[1]), -item[1]["cpu"]["value"]))
+
+        message = [f"🖥️ **服务器集群** - {datetime.now().strftime('%m/%d %H:%M')}（{len(hosts)} 台在线"
+                   + (f"，{len(offline)} 台失联）" if offline else "）"), ""]
+        for host, status in ranked[:REPORT_TOP]:
+            emoji = ("✅", "🟡", "🔴")[self._severity(status)]
+            parts = []
+            for metric, label in (("cpu", "CPU"), ("memory", "内存"), ("disk", "磁盘")):
+                item = status[metric]
+                peak = item["stats"].get("1h", {}).get("max")
+                parts.append(f"{label} {item['value']:.1f}%" + (f"（峰 {peak:.1f}%）" if metric == "cpu" and peak is not None else ""))
+            parts.append(f"负载 {status['load']['1min']}")
+            message.append(f"{emoji} **{host}** " + " · ".join(parts))
+        if len(ranked) > REPORT_TOP:
+            message.append(f"… 其余 {len(ranked) - REPORT_TOP} 台略")
+        if offline:
+            message.append("")
+            message.append("📴 **失联:** " + "、".join(offline))
+        firing = sorted(key for key in self.engine.open_incidents())
+        if firing:
+            message.append("")
+            message.append("🚨 **告警中:** " + "、".join(firing))
+        message.append("")
+        message.append("#服务器 #集群")
+        return "\n".join(message)
+
+    def send(self, text, dedup_key=None):
+        """写入发件箱，在后台线程投递；未送达的留给 feishu_outbox.py 继续投递"""
+        print(text)
+        if self.client is not None:
+            self.outbox.enqueue(RECEIVER_ID, text, dedup_key=dedup_key)
+            self._sender.submit(self.outbox.drain, self.client, EVAL_INTERVAL)
+
+    def _evaluate_forever(self):
+        """评估线程：定期评估告警、发送报告，不占用接收线程"""
+        next_eval = time.time() + EVAL_INTERVAL
+        last_report = time.time()
+        rejected = 0
+        while not self.stopping.wait(max(0.0, next_eval - time.time())):
+            now = time.time()
+            lines, events = self.evaluate(now)
+            if lines:
+                # 告警消息先写入发件箱再保存状态，发送失败时状态转换不会丢
+                dedup_key = "fleet:" + ",".join(event_key(event) for event in events) if events else None
+                self.send(f"🖥️ **服务器集群告警** - {datetime.now().strftime('%m/%d %H:%M')}\n\n" + "\n".join(lines),
+                          dedup_key)
+            self.engine.save()
+            if self.rejected > rejected:
+                print(f"⚠️ 已跟踪 {MAX_HOSTS} 台主机，丢弃新主机的记录 {self.rejected - rejected} 条")
+                rejected = self.rejected
+            next_eval = now + EVAL_INTERVAL
+            if self._due_report(last_report, now) and self.hosts:
+                self.send(self.report())
+                last_report = now
+
+    def _due_report(self, last, now):
+        if self.report_every:
+            return now - last >= self.report_every
+        return int(now // 3600) != int(last // 3600)
+
+    def _serve_http(self, port, host):
+        aggregator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                written = aggregator.ingest(body)
+                self.send_response(204 if written else 400)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True, name="fleet-http").start()
+        return server
+
+    def run_forever(self, listen=("0.0.0.0", DEFAULT_PORT), http_port=None):
+        signal.signal(signal.SIGTERM, lambda *_: self.stopping.set())
+        signal.signal(signal.SIGINT, lambda *_: self.stopping.set())
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        sock.bind(listen)
+        sock.setblocking(False)
+        selector = selectors.DefaultSelector()
+        selector.register(sock, selectors.EVENT_READ)
+        server = self._serve_http(http_port, listen[0]) if http_port else None
+        print(f"🛰️ aggregator 已启动：UDP {listen[0]}:{listen[1]}" + (f"，HTTP {http_port}" if http_port else ""))
+
+        evaluator = threading.Thread(target=self._evaluate_forever, daemon=True, name="fleet-eval")
+        evaluator.start()
+        while not self.stopping.is_set():
+            if selector.select(timeout=1.0):
+                while True:  # 一次取完缓冲区里的所有数据报
+                    try:
+                        data = sock.recv(2048)
+                    except BlockingIOError:
+                        break
+                    self.ingest(data)
+
+        evaluator.join()
+        if server:
+            server.shutdown()
+        sock.close()
+        self._sender.shutdown(wait=True)
+        if self.outbox is not None:
+            self.outbox.close()
+        print(f"🛰️ aggregator 已停止，共接收 {self.received} 条记录")
+
+
+# ========== agent ==========
+
+def run_agent(name, to=None, http=None, interval=1.0):
+    """每 interval 秒采样一次并推送；aggregator 不可达时丢弃本次采样，不积压"""
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    collector = ProcCollector()
+    collector.cpu_percent()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) if to else None
+    print(f"📡 agent {name} → {to[0] + ':' + str(to[1]) if to else http}")
+
+    next_tick = time.time() + interval
+    while not stopping.wait(max(0.0, next_tick - time.time())):
+        now = time.time()
+        try:
+            packet = pack_sample(name, now, collector.sample())
+            if sock:
+                sock.sendto(packet, to)
+            else:
+                request = urllib.request.Request(http, data=packet, method="POST",
+                                                 headers={"Content-Type": "application/octet-stream"})
+                urllib.request.urlopen(request, timeout=2).close()
+        except (OSError, ValueError) as e:
+            print(f"上报失败: {e}")
+        next_tick += interval
+        if next_tick < time.time():
+            next_tick = time.time() + interval
+
+
+def _option(name, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+def _address(text):
+    host, _, port = text.rpartition(":")
+    return host or "0.0.0.0", int(port or DEFAULT_PORT)
+
+
+def main():
+    mode = sys.argv[1] if len(sys.argv) > 1 else ""
+    if mode == "agent":
+        to = _option("--to")
+        http = _option("--http")
+        if not to and not http:
+            print("❌ 需要 --to 主机:端口 或 --http URL")
+            return
+        run_agent(_option("--name", socket.gethostname()), to=_address(to) if to else None,
+                  http=http, interval=float(_option("--interval", 1)))
+    elif mode == "aggregator":
+        from monitor import create_client, load_config
+
+        config = load_config(_option("--config", "config.json"))
+        client = None if "--dry-run" in sys.argv else create_client()
+        if client is None:
+            print("💡 未配置飞书（或 --dry-run），仅显示本地")
+        report_every = _option("--report-every")
+        http_port = _option("--http")
+        Aggregator(config, client, report_every=float(report_every) if report_every else None).run_forever(
+            listen=_address(_option("--listen", f"0.0.0.0:{DEFAULT_PORT}")),
+            http_port=int(http_port) if http_port else None)
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,29 +2,41 @@
 """
 Server Monitor - 服务器监控
 支持：CPU/内存/磁盘监控、异常告警、飞书发送
+指标直接读取 /proc 和 os.statvfs（procfs.py），不启动任何子进程
+常驻采样器（sampler.py）运行时，报告和告警使用其每秒采样的 1m / 5m / 1h 汇总
+告警经过状态机（alerts.py）去抖，只在告警开始 / 持续提醒 / 恢复时发送；完整报告每小时发送一次
+报告和告警附带占用最高的进程和各挂载点的使用率，不用再登录服务器排查
 """
 
 import os
 import json
-import subprocess
-import requests
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List
 
+from feishu_client import FeishuClient
+from feishu_outbox import Outbox, PENDING, SENT
+from procfs import (ProcCollector, ProcessScanner, disk_percent, format_uptime, memory_percent,
+                    mount_usage, read_loadavg, read_meminfo, read_uptime)
+from alerts import AlertEngine, event_key, format_events, load_rules
+from sampler import read_processes, read_summary
+
 # 配置
 CONFIG_PATH = Path.home() / ".openclaw" / "openclaw.json"
 SECRET_PATH = Path.home() / ".openclaw" / "secrets" / "feishu_app_secret"
 RECEIVER_ID = "ou_a44cdd1c2064d3c9c22242b61ff8b926"
+DRAIN_TIMEOUT = 10  # 本次运行内等待重试的最长时间，之后交给 feishu_outbox.py 继续投递
 
 
-def load_config():
+def load_config(config_file="config.json"):
     default = {
         "thresholds": {"cpu": 80, "memory": 90, "disk": 90},
-        "check_items": ["cpu", "memory", "disk", "uptime", "load"]
+        "alerting": {"sustain": 300, "hysteresis": 5, "clear_after": 300, "renotify": 3600},
+        "check_items": ["cpu", "memory", "disk", "uptime", "load"],
+        "top_n": 3
     }
-    if Path("config.json").exists():
-        with open("config.json") as f:
+    if Path(config_file).exists():
+        with open(config_file) as f:
             default.update(json.load(f))
     return default
 
@@ -43,70 +55,132 @@ def load_secret():
     return None
 
 
-def run_command(cmd: str) -> str:
-    """执行系统命令"""
-    try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, timeout=5)
-        return result.stdout.decode('utf-8').strip()
-    except Exception as e:
-        return f"Error: {e}"
+def create_client():
+    """飞书客户端，未配置时返回 None"""
+    app_config = load_openclaw_config()
+    app_id = app_config.get("channels", {}).get("feishu", {}).get("appId")
+    app_secret = load_secret()
+    if app_id and app_secret:
+        return FeishuClient(app_id, app_secret)
+    return None
+
+
+_collector = ProcCollector()
+_scanner = ProcessScanner()
 
 
 def get_cpu() -> Dict:
-    """获取 CPU 使用率"""
-    output = run_command("vmstat 1 1 | awk 'NR==3 {print 100-$15}'")
-    if output.replace('.', '').replace('-', '').isdigit():
-        return {"value": float(output), "unit": "%"}
-    
-    output = run_command("top -bn1 | grep 'Cpu(s)' | awk '{print $2}'")
-    if output and output.replace('.', '').replace('-', '').isdigit():
-        return {"value": float(output), "unit": "%"}
-    
-    return {"value": 0, "unit": "%", "error": "无法获取"}
+    """获取 CPU 使用率（两次读取 /proc/stat 的差值）"""
+    try:
+        return {"value": _collector.cpu_percent(), "unit": "%"}
+    except (OSError, ValueError, IndexError):
+        return {"value": 0, "unit": "%", "error": "无法获取"}
 
 
 def get_memory() -> Dict:
     """获取内存使用率"""
-    output = run_command("free | grep Mem | awk '{print $3/$2 * 100}'")
-    if output.replace('.', '').isdigit():
-        return {"value": float(output), "unit": "%"}
-    return {"value": 0, "unit": "%", "error": "无法获取"}
+    try:
+        return {"value": memory_percent(read_meminfo()), "unit": "%"}
+    except (OSError, ValueError):
+        return {"value": 0, "unit": "%", "error": "无法获取"}
 
 
 def get_disk() -> Dict:
     """获取磁盘使用率"""
-    output = run_command("df / | tail -1 | awk '{print $5}'")
-    if output.endswith('%'):
-        return {"value": float(output[:-1]), "unit": "%"}
-    return {"value": 0, "unit": "%", "error": "无法获取"}
+    try:
+        return {"value": disk_percent("/"), "unit": "%"}
+    except OSError:
+        return {"value": 0, "unit": "%", "error": "无法获取"}
 
 
 def get_load() -> Dict:
     """获取系统负载"""
-    output = run_command("cat /proc/loadavg | awk '{print $1, $2, $3}'")
-    if output:
-        parts = output.split()
-        return {"1min": parts[0], "5min": parts[1], "15min": parts[2]}
-    return {"1min": "0", "5min": "0", "15min": "0"}
+    try:
+        load1, load5, load15 = read_loadavg()
+        return {"1min": f"{load1:.2f}", "5min": f"{load5:.2f}", "15min": f"{load15:.2f}"}
+    except (OSError, ValueError, IndexError):
+        return {"1min": "0", "5min": "0", "15min": "0"}
 
 
 def get_uptime() -> Dict:
     """获取运行时间"""
-    output = run_command("uptime -p 2>/dev/null")
-    if not output or "Error" in output:
-        output = run_command("uptime | awk '{print $3, $4}'")
-    return {"uptime": output}
-
-
-def get_all_status() -> Dict:
-    """获取所有状态"""
-    return {
-        "cpu": get_cpu(),
-        "memory": get_memory(),
-        "disk": get_disk(),
-        "load": get_load(),
-        "uptime": get_uptime()
-    }
+    try:
+        return {"uptime": format_uptime(read_uptime())}
+    except (OSError, ValueError, IndexError):
+        return {"uptime": "N/A"}
+
+
+def get_processes(top_n: int = 3) -> Dict:
+    """CPU / 内存占用最高的进程 {"cpu": [...], "memory": [...]}
+
+    优先使用常驻采样器发布的结果（统计的是最近一个扫描间隔），采样器没有运行时才自己扫描 /proc/[pid]。
+    """
+    published = read_processes(top_n)
+    if published is not None:
+        return published
+    try:
+        return _scanner.top(top_n)
+    except OSError:
+        return {"cpu": [], "memory": []}
+
+
+def get_mounts() -> List[Dict]:
+    """各挂载点的使用率"""
+    try:
+        return mount_usage()
+    except OSError:
+        return []
+
+
+def get_all_status(top_n: int = 3) -> Dict:
+    """获取所有状态
+
+    采样器在运行时取其最新采样，并在各指标的 stats 中附带 1m / 5m / 1h 的 min / avg / max / p95；
+    否则现场采样一次（没有 stats）。
+    """
+    summary = read_summary()
+    if summary is None:
+        status = {
+            "cpu": get_cpu(),
+            "memory": get_memory(),
+            "disk": get_disk(),
+            "load": get_load(),
+        }
+    else:
+        status = status_from_summary(summary["latest"], summary["windows"])
+    status["uptime"] = get_uptime()
+    status["processes"] = get_processes(top_n)
+    status["mounts"] = get_mounts()
+    return status
+
+
+def status_from_summary(latest: Dict, windows: Dict) -> Dict:
+    """由最新采样和各窗口汇总组成 get_all_status() 格式的状态（不含运行时间，fleet 汇总各主机时也用）"""
+
+    def stats(metric):
+        return {window: values[metric] for window, values in windows.items() if values}
+
+    status = {name: {"value": latest[name], "unit": "%", "stats": stats(name)}
+              for name in ("cpu", "memory", "disk")}
+    status["load"] = {"1min": f"{latest['load1']:.2f}", "5min": f"{latest['load5']:.2f}",
+                      "15min": f"{latest['load15']:.2f}", "stats": stats("load1")}
+    return status
+
+
+def _alert_value(item: Dict):
+    """告警用的值：有汇总时取 5 分钟均值（持续高负载才告警），否则取当前值"""
+    window = item.get("stats", {}).get("5m")
+    if window:
+        return window["avg"], "5 分钟均值 "
+    return item.get("value", 0), ""
+
+
+def _window_text(item: Dict) -> str:
+    """最近一小时的均值 / 峰值 / p95，整点快照之间的尖峰也能看到"""
+    window = item.get("stats", {}).get("1h")
+    if not window:
+        return ""
+    return f"（1h 均 {window['avg']:.1f}% · 峰 {window['max']:.1f}% · p95 {window['p95']:.1f}%）"
 
 
 def check_alerts(status: Dict, config: Dict) -> List[str]:
@@ -114,20 +188,40 @@ def check_alerts(status: Dict, config: Dict) -> List[str]:
     alerts = []
     thresholds = config.get("thresholds", {})
     
-    cpu = status.get("cpu", {}).get("value", 0)
-    mem = status.get("memory", {}).get("value", 0)
-    disk = status.get("disk", {}).get("value", 0)
+    cpu, cpu_desc = _alert_value(status.get("cpu", {}))
+    mem, mem_desc = _alert_value(status.get("memory", {}))
+    disk, disk_desc = _alert_value(status.get("disk", {}))
+    cpu_limit = thresholds.get("cpu", 80)
+    mem_limit = thresholds.get("memory", 90)
+    disk_limit = thresholds.get("disk", 90)
     
-    if cpu > thresholds.get("cpu", 80):
-        alerts.append(f"⚠️ CPU 过载: {cpu:.1f}% (>80%)")
-    if mem > thresholds.get("memory", 90):
-        alerts.append(f"⚠️ 内存告警: {mem:.1f}% (>90%)")
-    if disk > thresholds.get("disk", 90):
-        alerts.append(f"⚠️ 磁盘不足: {disk:.1f}% (>90%)")
+    if cpu > cpu_limit:
+        alerts.append(f"⚠️ CPU 过载: {cpu_desc}{cpu:.1f}% (>{cpu_limit:g}%)")
+    if mem > mem_limit:
+        alerts.append(f"⚠️ 内存告警: {mem_desc}{mem:.1f}% (>{mem_limit:g}%)")
+    if disk > disk_limit:
+        alerts.append(f"⚠️ 磁盘不足: {disk_desc}{disk:.1f}% (>{disk_limit:g}%)")
+    for mount in status.get("mounts", []):
+        if mount["mount"] != "/" and mount["percent"] > disk_limit:
+            alerts.append(f"⚠️ 磁盘不足: {mount['mount']} {mount['percent']:.1f}% (>{disk_limit:g}%)")
     
     return alerts
 
 
+def _size(size_bytes: float) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size_bytes < 1024 or unit == "TB":
+            return f"{size_bytes:.0f}{unit}" if unit in ("B", "KB") else f"{size_bytes:.1f}{unit}"
+        size_bytes /= 1024
+
+
+def format_processes(processes: List[Dict], by: str) -> str:
+    """进程列表的一行摘要：名称(pid) CPU% 或 RSS"""
+    if by == "cpu":
+        return " · ".join(f"{p['name']}({p['pid']}) {p['cpu']:.1f}%" for p in processes)
+    return " · ".join(f"{p['name']}({p['pid']}) {_size(p['rss'] * 1024)}" for p in processes)
+
+
 def format_message(status: Dict, alerts: List[str], config: Dict) -> str:
     """格式化消息"""
     message = [f"🖥️ **服务器监控** - {datetime.now().strftime('%m/%d %H:%M')}\n"]
@@ -136,24 +230,38 @@ def format_message(status: Dict, alerts: List[str], config: Dict) -> str:
     cpu = status.get("cpu", {})
     cpu_val = cpu.get("value", 0)
     emoji = "✅" if cpu_val < 50 else "🟡" if cpu_val < 80 else "🔴"
-    message.append(f"{emoji} **CPU** {cpu_val:.1f}%")
+    message.append(f"{emoji} **CPU** {cpu_val:.1f}%{_window_text(cpu)}")
     
     # Memory
     mem = status.get("memory", {})
     mem_val = mem.get("value", 0)
     emoji = "✅" if mem_val < 70 else "🟡" if mem_val < 90 else "🔴"
-    message.append(f"{emoji} **内存** {mem_val:.1f}%")
+    message.append(f"{emoji} **内存** {mem_val:.1f}%{_window_text(mem)}")
     
     # Disk
     disk = status.get("disk", {})
     disk_val = disk.get("value", 0)
     emoji = "✅" if disk_val < 70 else "🟡" if disk_val < 90 else "🔴"
-    message.append(f"{emoji} **磁盘** {disk_val:.1f}%")
+    message.append(f"{emoji} **磁盘** {disk_val:.1f}%{_window_text(disk)}")
+    for mount in status.get("mounts", []):
+        if mount["mount"] != "/":
+            emoji = "✅" if mount["percent"] < 70 else "🟡" if mount["percent"] < 90 else "🔴"
+            message.append(f"   {emoji} {mount['mount']} {mount['percent']:.1f}%（{_size(mount['total'])}）")
     
     # Load
     load = status.get("load", {})
     message.append("")
     message.append(f"📊 **负载:** {load.get('1min', 0)} | {load.get('5min', 0)} | {load.get('15min', 0)}")
+    load_window = load.get("stats", {}).get("1h")
+    if load_window:
+        message.append(f"📈 **1h 峰值负载:** {load_window['max']:.2f}（p95 {load_window['p95']:.2f}）")
+    
+    # Processes
+    processes = status.get("processes", {})
+    if processes.get("cpu"):
+        message.append(f"🔥 **CPU 占用:** {format_processes(processes['cpu'], 'cpu')}")
+    if processes.get("memory"):
+        message.append(f"🧠 **内存占用:** {format_processes(processes['memory'], 'memory')}")
     
     # Uptime
     uptime = status.get("uptime", {}).get("uptime", "N/A")
@@ -176,65 +284,77 @@ def format_message(status: Dict, alerts: List[str], config: Dict) -> str:
     return "\n".join(message)
 
 
-def get_tenant_access_token(app_id, app_secret):
-    """获取 tenant_access_token"""
-    url = "https://open.larksuite.com/open-apis/auth/v3/tenant_access_token/internal"
-    resp = requests.post(url, json={"app_id": app_id, "app_secret": app_secret})
-    result = resp.json()
-    return result.get("tenant_access_token") if result.get("code") == 0 else None
-
-
-def send_to_feishu(token, receiver_id, content):
-    """发送飞书消息"""
-    url = "https://open.larksuite.com/open-apis/im/v1/messages"
-    params = {"receive_id_type": "open_id"}
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "receive_id": receiver_id,
-        "msg_type": "text",
-        "content": json.dumps({"text": content})
-    }
-    resp = requests.post(url, params=params, headers=headers, json=data)
-    return resp.json().get("code") == 0
+def format_culprits(events: List[Dict], status: Dict) -> str:
+    """CPU / 内存告警时附上占用最高的进程"""
+    processes = status.get("processes", {})
+    lines = []
+    for metric, label in (("cpu", "🔥 **CPU 占用:**"), ("memory", "🧠 **内存占用:**")):
+        if processes.get(metric) and any(e["metric"] == metric and e["kind"] != "resolved" for e in events):
+            lines.append(f"{label} {format_processes(processes[metric], metric)}")
+    return "\n\n" + "\n".join(lines) if lines else ""
 
 
-def main():
+def main(client=None, config_file="config.json"):
+    """client: 常驻调度进程传入的共享飞书客户端"""
     print(f"\n{'='*50}")
     print(f"🖥️ 服务器监控 - {datetime.now().strftime('%Y-%m-%d %H:%M')}")
     print(f"{'='*50}\n")
     
     # 加载配置
-    config = load_config()
+    config = load_config(config_file)
     
     # 获取状态
-    status = get_all_status()
+    status = get_all_status(config.get("top_n", 3))
     alerts = check_alerts(status, config)
     
+    # 告警状态机：只有状态转换才产生需要发送的事件
+    engine = AlertEngine(load_rules(config))
+    events = engine.evaluate(status)
+    
     # 格式化消息
     message = format_message(status, alerts, config)
     print(message)
     
-    # 发送到飞书（仅告警或每小时）
-    app_config = load_openclaw_config()
-    app_id = app_config.get("channels", {}).get("feishu", {}).get("appId")
-    app_secret = load_secret()
+    # 告警先写入发件箱再保存状态：发送失败或飞书未配置时，状态转换和消息都不会丢
+    outbox = Outbox()
+    queued = {}
+    if events:
+        alert_message = format_events(events) + format_culprits(events, status)
+        print("\n" + alert_message)
+        dedup_key = "server_monitor:" + ",".join(event_key(event) for event in events)
+        queued["告警"] = outbox.enqueue(RECEIVER_ID, alert_message, dedup_key=dedup_key)
+    engine.save()
     
-    # 检查是否需要发送
-    should_send = len(alerts) > 0  # 有告警时发送
-    should_send = should_send or datetime.now().minute < 5  # 每小时前5分钟发送
-    
-    if app_id and app_secret and should_send:
-        token = get_tenant_access_token(app_id, app_secret)
-        if token and send_to_feishu(token, RECEIVER_ID, message):
-            print("\n✅ 已发送至飞书！")
-        else:
-            print("\n⚠️ 飞书发送失败")
-    elif not app_id or not app_secret:
-        print("\n💡 未配置飞书，仅显示本地")
-
+    # 发送到飞书（告警状态变化时发送告警，每小时发送完整报告）
+    owns_client = client is None
+    if owns_client:
+        client = create_client()
+    try:
+        if not client:
+            print("\n💡 未配置飞书，仅显示本地" + ("（告警已留在发件箱）" if events else ""))
+            return
+        
+        if datetime.now().minute < 5:  # 每小时前5分钟发送
+            period = datetime.now().strftime("%Y-%m-%d %H")
+            queued["报告"] = outbox.enqueue(RECEIVER_ID, message, dedup_key=f"server_monitor:{period}:report")
+        
+        # 顺带投递之前积压的消息（如飞书故障期间的告警）；本次有新消息时等待重试
+        fresh = any(message_id is not None for message_id in queued.values())
+        outbox.drain(client, timeout=DRAIN_TIMEOUT if fresh else 0)
+        if fresh:
+            statuses = outbox.statuses(queued.values())
+            for name, message_id in queued.items():
+                state = statuses.get(message_id)
+                if state == SENT:
+                    print(f"\n✅ {name}已发送至飞书！")
+                elif state == PENDING:
+                    print(f"\n⏳ {name}发送失败，已留在发件箱稍后投递")
+                elif message_id is not None:
+                    print(f"\n⚠️ {name}发送失败")
+    finally:
+        outbox.close()
+        if owns_client and client is not None:
+            client.close()
 
 if __name__ == "__main__":
     main()
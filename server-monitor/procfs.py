@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+/proc 指标采集（不启动子进程）
+
+直接读取 /proc/stat、/proc/meminfo、/proc/loadavg、/proc/uptime 和 os.statvfs，
+一次采样只需几十微秒；CPU 使用率由两次读取 /proc/stat 的差值计算。
+
+ProcessScanner 扫描 /proc/[pid]/stat 得到各进程的 CPU 时间和 RSS，按 pid 缓存上次的 CPU 时间，
+只计算差值；/proc/[pid]/status 只为排名靠前的进程读取。mount_usage() 列出 /proc/mounts 中
+每个真实文件系统的使用率。
+
+使用方法：
+    from procfs import ProcCollector, ProcessScanner, mount_usage
+    collector = ProcCollector()
+    sample = collector.sample()   # {"cpu": 12.5, "memory": 43.2, "disk": 61.0, "load1": 0.3, ...}
+    top = ProcessScanner().top(5) # {"cpu": [{"pid", "name", "cpu", "rss"}, ...], "memory": [...]}
+    mounts = mount_usage()        # [{"mount": "/", "device": "/dev/vda", "fstype": "ext4", "percent": 61.0, ...}]
+
+python3 procfs.py                 # 查看一次采样、占用最高的进程和各挂载点，以及各自的耗时
+"""
+
+import os
+import time
+
+PROC = "/proc"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024
+
+# 没有块设备但需要统计的文件系统（网络 / 存储池）；其余没有 /dev 设备的挂载（proc、cgroup、tmpfs 等）跳过
+NETWORK_FS = {"nfs", "nfs4", "cifs", "smbfs", "ceph", "glusterfs", "fuse.sshfs", "zfs", "btrfs"}
+
+
+def read_cpu_times(proc=PROC):
+    """/proc/stat 第一行：(非空闲 jiffies, 总 jiffies)，iowait 计入空闲"""
+    with open(f"{proc}/stat", "rb") as f:
+        fields = f.readline().split()[1:]
+    # user nice system idle iowait irq softirq steal（guest 已包含在 user / nice 中）
+    values = [int(v) for v in fields[:8]]
+    total = sum(values)
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    return total - idle, total
+
+
+def read_meminfo(proc=PROC):
+    """/proc/meminfo → {字段: kB}"""
+    info = {}
+    with open(f"{proc}/meminfo", "rb") as f:
+        for line in f:
+            key, _, rest = line.partition(b":")
+            parts = rest.split()
+            if parts:
+                info[key.decode()] = int(parts[0])
+    return info
+
+
+def memory_percent(info):
+    """已用内存百分比（MemAvailable 之外的部分，与 free 的 used 口径一致）"""
+    total = info.get("MemTotal", 0)
+    if not total:
+        return 0.0
+    available = info.get("MemAvailable")
+    if available is None:  # 3.14 之前的内核没有 MemAvailable
+        available = info.get("MemFree", 0) + info.get("Buffers", 0) + info.get("Cached", 0)
+    return (total - available) * 100.0 / total
+
+
+def disk_percent(path="/"):
+    """磁盘使用率，与 df 的 Use% 口径一致（不计 root 保留块）"""
+    st = os.statvfs(path)
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    usable = used + st.f_bavail * st.f_frsize
+    return used * 100.0 / usable if usable else 0.0
+
+
+def read_loadavg(proc=PROC):
+    """(1 分钟, 5 分钟, 15 分钟) 平均负载"""
+    with open(f"{proc}/loadavg", "rb") as f:
+        parts = f.read().split()
+    return float(parts[0]), float(parts[1]), float(parts[2])
+
+
+def read_uptime(proc=PROC):
+    """开机至今的秒数"""
+    with open(f"{proc}/uptime", "rb") as f:
+        return float(f.read().split()[0])
+
+
+def format_uptime(seconds):
+    """与 uptime -p 相同的格式：up 3 days, 4 hours, 5 minutes"""
+    minutes = int(seconds) // 60
+    weeks, minutes = divmod(minutes, 7 * 24 * 60)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    parts = []
+    for value, unit in ((weeks, "week"), (days, "day"), (hours, "hour"), (minutes, "minute")):
+        if value:
+            parts.append(f"{value} {unit}{'s' if value > 1 else ''}")
+    return "up " + (", ".join(parts) if parts else "0 minutes")
+
+
+def _read(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, 4096)
+    finally:
+        os.close(fd)
+
+
+def _unescape(field):
+    """/proc/mounts 中空格等字符写作 \\040 这样的八进制转义"""
+    if "\\" not in field:
+        return field
+    return field.encode().decode("unicode_escape").encode("latin-1").decode("utf-8", "replace")
+
+
+def mount_usage(proc=PROC):
+    """/proc/mounts 中每个真实文件系统的使用率（同一设备只算一次，按挂载点排序）"""
+    mounts = []
+    seen = set()
+    with open(f"{proc}/mounts") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 3:
+                continue
+            device, mount, fstype = parts[0], _unescape(parts[1]), parts[2]
+            if not device.startswith("/") and fstype not in NETWORK_FS:
+                continue
+            try:
+                st = os.statvfs(mount)
+            except OSError:
+                continue
+            if not st.f_blocks or (device, st.f_fsid) in seen:
+                continue
+            seen.add((device, st.f_fsid))
+            used = (st.f_blocks - st.f_bfree) * st.f_frsize
+            usable = used + st.f_bavail * st.f_frsize
+            mounts.append({"mount": mount, "device": device, "fstype": fstype,
+                           "percent": used * 100.0 / usable if usable else 0.0,
+                           "used": used, "total": st.f_blocks * st.f_frsize})
+    mounts.sort(key=lambda item: item["mount"])
+    return mounts
+
+
+class ProcessScanner:
+    """扫描所有进程的 CPU 时间和 RSS，按 pid 缓存上次的 CPU 时间，两次扫描之间只算差值
+
+    第一次扫描没有基准，先扫描一次再等待 warmup 秒；pid 被复用时用进程启动时间区分。
+    """
+
+    def __init__(self, warmup=0.5, proc=PROC):
+        self.warmup = warmup
+        self.proc = proc
+        self._ticks = {}  # pid -> (启动时间, 累计 CPU ticks)
+        self._scanned_at = None
+
+    def _read_stat(self, pid):
+        """(名称, 启动时间, 累计 CPU ticks, RSS kB)，进程已退出时返回 None"""
+        try:
+            data = _read(f"{self.proc}/{pid}/stat")
+        except OSError:
+            return None
+        # 进程名可能包含空格和括号，以最后一个 ")" 为界
+        end = data.rfind(b")")
+        name = data[data.find(b"(") + 1:end].decode("utf-8", "replace")
+        fields = data[end + 2:].split()
+        # fields[0] 为状态（第 3 列）：utime / stime / starttime / rss 分别是第 14 / 15 / 22 / 24 列
+        return name, int(fields[19]), int(fields[11]) + int(fields[12]), int(fields[21]) * PAGE_KB
+
+    def scan(self):
+        """扫描一次：[{"pid", "name", "cpu", "rss"}]，cpu 为与上次扫描之间的占用（单核 100%）"""
+        if self._scanned_at is None:
+            self._scan()
+            time.sleep(self.warmup)
+        return self._scan()
+
+    def _scan(self):
+        now = time.monotonic()
+        elapsed = now - self._scanned_at if self._scanned_at is not None else 0.0
+        previous, current = self._ticks, {}
+        processes = []
+        for entry in os.listdir(self.proc):
+            if not entry.isdigit():
+                continue
+            stat = self._read_stat(entry)
+            if stat is None:
+                continue
+            name, started, ticks, rss = stat
+            pid = int(entry)
+            current[pid] = (started, ticks)
+            last = previous.get(pid)
+            delta = ticks - last[1] if last and last[0] == started else 0
+            cpu = delta * 100.0 / (CLOCK_TICKS * elapsed) if elapsed > 0 else 0.0
+            processes.append({"pid": pid, "name": name, "cpu": cpu, "rss": rss})
+        self._ticks = current  # 退出的进程自然从缓存中去掉
+        self._scanned_at = now
+        return processes
+
+    def _status(self, pid):
+        """/proc/[pid]/status 中的完整信息（VmRSS、线程数、用户）"""
+        info = {}
+        try:
+            data = _read(f"{self.proc}/{pid}/status")
+        except OSError:
+            return info
+        for line in data.decode("utf-8", "replace").splitlines():
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "Threads", "Uid"):
+                info[key] = value.split()[0]
+        return info
+
+    def top(self, n=5):
+        """CPU 和内存（RSS）占用最高的各 n 个进程：{"cpu": [...], "memory": [...]}"""
+        processes = self.scan()
+        result = {
+            "cpu": sorted(processes, key=lambda p: -p["cpu"])[:n],
+            "memory": sorted(processes, key=lambda p: -p["rss"])[:n],
+        }
+        for process in {p["pid"]: p for ranked in result.values() for p in ranked}.values():
+            info = self._status(process["pid"])
+            if "VmRSS" in info:
+                process["rss"] = int(info["VmRSS"])
+            process["threads"] = int(info.get("Threads", 0))
+            process["uid"] = int(info.get("Uid", -1))
+        return result
+
+
+class ProcCollector:
+    """保存上一次的 CPU 计数，每次 sample() 返回与上次之间的 CPU 使用率
+
+    第一次采样没有基准，先读一次再等待 warmup 秒（单次运行的脚本用）；
+    常驻采样时两次 sample() 之间的间隔就是 CPU 统计的窗口。
+    """
+
+    def __init__(self, disk_path="/", warmup=0.1, proc=PROC):
+        self.disk_path = disk_path
+        self.warmup = warmup
+        self.proc = proc
+        self._last_cpu = None
+
+    def cpu_percent(self):
+        current = read_cpu_times(self.proc)
+        if self._last_cpu is None:
+            self._last_cpu = current
+            time.sleep(self.warmup)
+            current = read_cpu_times(self.proc)
+        busy = current[0] - self._last_cpu[0]
+        total = current[1] - self._last_cpu[1]
+        self._last_cpu = current
+        return busy * 100.0 / total if total > 0 else 0.0
+
+    def sample(self):
+        """一次采样：{"cpu", "memory", "disk", "load1", "load5", "load15", "uptime"}"""
+        load1, load5, load15 = read_loadavg(self.proc)
+        return {
+            "cpu": self.cpu_percent(),
+            "memory": memory_percent(read_meminfo(self.proc)),
+            "disk": disk_percent(self.disk_path),
+            "load1": load1,
+            "load5": load5,
+            "load15": load15,
+            "uptime": read_uptime(self.proc),
+        }
+
+
+if __name__ == "__main__":
+    collector = ProcCollector()
+    collector.sample()
+    started = time.perf_counter()
+    sample = collector.sample()
+    elapsed = time.perf_counter() - started
+    for key, value in sample.items():
+        print(f"{key:<8} {value:.2f}")
+    print(f"采样耗时 {elapsed * 1e6:.0f} µs")
+
+    scanner = ProcessScanner()
+    top = scanner.top(5)
+    started = time.perf_counter()
+    count = len(scanner.scan())
+    elapsed = time.perf_counter() - started
+    print(f"\n{'PID':>7} {'CPU%':>6} {'RSS(MB)':>8}  进程")
+    for process in top["cpu"]:
+        print(f"{process['pid']:>7} {process['cpu']:>6.1f} {process['rss'] / 1024:>8.1f}  {process['name']}")
+    print(f"扫描 {count} 个进程耗时 {elapsed * 1e3:.1f} ms")
+
+    started = time.perf_counter()
+    mounts = mount_usage()
+    elapsed = time.perf_counter() - started
+    print()
+    for mount in mounts:
+        print(f"{mount['percent']:>5.1f}%  {mount['mount']} ({mount['device']}, {mount['fstype']})")
+    print(f"统计 {len(mounts)} 个挂载点耗时 {elapsed * 1e3:.2f} ms")
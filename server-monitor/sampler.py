@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+服务器指标常驻采样器
+
+每秒采样一次 CPU / 内存 / 磁盘 / 负载（procfs.ProcCollector），写入 ~/.openclaw/monitor/ 下
+固定大小的内存映射环形缓冲区（raw.ring，保留最近一小时），并在每个整分钟 / 5 分钟 / 小时
+汇总出 min / avg / max / p95，分别写入 1m.ring（1 天）、5m.ring（7 天）、1h.ring（30 天）。
+缓冲区大小固定，运行多久内存和磁盘占用都不变。
+每 15 秒增量扫描一次进程（procfs.ProcessScanner），把 CPU / 内存占用最高的进程写入 processes.json。
+
+monitor.py 的每小时报告和告警检查通过 read_summary() 读取最近 1m / 5m / 1h 的窗口（由上述汇总加上最近的原始采样拼接）、
+通过 read_processes() 读取占用最高的进程，采样器没有运行时退回到单次采样。
+
+使用方法：
+python3 sampler.py                       # 前台运行（可用 @reboot 或 systemd 常驻）
+python3 sampler.py --summary             # 查看最新采样和 1m / 5m / 1h 汇总
+python3 sampler.py --series 5m --last 12 # 查看最近 12 个 5 分钟汇总
+"""
+
+import json
+import math
+import mmap
+import os
+import signal
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from procfs import ProcCollector, ProcessScanner
+
+DATA_DIR = Path.home() / ".openclaw" / "monitor"
+
+METRICS = ("cpu", "memory", "disk", "load1", "load5", "load15")
+STATS = ("min", "avg", "max", "p95")
+SERIES_FIELDS = tuple(f"{metric}_{stat}" for metric in METRICS for stat in STATS)
+
+# 汇总窗口：{名称: (窗口秒数, 保留条数)}
+WINDOWS = {
+    "1m": (60, 24 * 60),
+    "5m": (300, 7 * 24 * 12),
+    "1h": (3600, 30 * 24),
+}
+RAW_CAPACITY = 3600 + 120  # 1 秒一条，保留一小时多一点，保证整点汇总时数据完整
+STALE_AFTER = 5            # 最新采样超过几秒就认为采样器已停止
+PROCESS_INTERVAL = 15      # 进程扫描间隔（秒）
+PROCESS_TOP = 10           # processes.json 中每类保留的进程数
+PROCESS_FILE = "processes.json"
+
+HEADER = struct.Struct("<8sIIQ")  # 魔数, 字段数, 容量, 累计写入条数
+COUNT = struct.Struct("<Q")
+COUNT_OFFSET = 16
+MAGIC = b"OCRING01"
+
+
+class RingBuffer:
+    """内存映射文件上的定长环形缓冲区，每条记录为 (时间戳 double, 各字段 float32)
+
+    单个进程写入，其他进程可以同时只读打开（monitor.py 读取汇总）。
+    文件头的字段数或容量与参数不一致时，写入方会重建文件。
+    """
+
+    def __init__(self, path, fields, capacity, readonly=False):
+        self.path = Path(path)
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.record = struct.Struct(f"<d{len(self.fields)}f")
+        size = HEADER.size + capacity * self.record.size
+
+        if readonly:
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if not self._valid(size):
+                self._map.close()
+                raise ValueError(f"{self.path} 格式不匹配")
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        if not self._valid(size):
+            self._map[:HEADER.size] = HEADER.pack(MAGIC, len(self.fields), capacity, 0)
+
+    def _valid(self, size):
+        if len(self._map) != size:
+            return False
+        magic, n_fields, capacity, _ = HEADER.unpack_from(self._map, 0)
+        return magic == MAGIC and n_fields == len(self.fields) and capacity == self.capacity
+
+    @property
+    def count(self):
+        """累计写入的条数（含已被覆盖的）"""
+        return COUNT.unpack_from(self._map, COUNT_OFFSET)[0]
+
+    def append(self, ts, values):
+        count = self.count
+        offset = HEADER.size + (count % self.capacity) * self.record.size
+        self.record.pack_into(self._map, offset, ts, *values)
+        # 先写记录再更新计数，读取方不会读到写了一半的最新记录
+        COUNT.pack_into(self._map, COUNT_OFFSET, count + 1)
+
+    def _at(self, index):
+        return self.record.unpack_from(self._map, HEADER.size + (index % self.capacity) * self.record.size)
+
+    def latest(self):
+        """最新一条 (ts, 值...)，没有记录时返回 None"""
+        count = self.count
+        return self._at(count - 1) if count else None
+
+    def read(self, since=0.0, limit=None):
+        """时间戳 >= since 的记录，按时间先后排列"""
+        count = self.count
+        available = min(count, self.capacity)
+        if limit is not None:
+            available = min(available, limit)
+        rows = []
+        for index in range(count - 1, count - 1 - available, -1):
+            row = self._at(index)
+            if row[0] < since:
+                break
+            rows.append(row)
+        rows.reverse()
+        return rows
+
+    def close(self):
+        self._map.close()
+
+
+def _p95(values):
+    """最近秩法 p95，values 需已排序"""
+    return values[max(0, math.ceil(len(values) * 0.95) - 1)]
+
+
+def rollup(rows):
+    """把原始采样汇总为 {指标: {"min", "avg", "max", "p95", "span"}}，没有数据时返回 {}
+
+    span 为这些采样覆盖的秒数（采样器刚启动时小于窗口长度）。
+    """
+    if not rows:
+        return {}
+    span = rows[-1][0] - rows[0][0]
+    stats = {}
+    for i, metric in enumerate(METRICS, start=1):
+        values = sorted(row[i] for row in rows)
+        stats[metric] = {"min": values[0], "avg": sum(values) / len(values), "max": values[-1],
+                         "p95": _p95(values), "span": span}
+    return stats
+
+
+def _flatten(stats):
+    return [stats[metric][stat] for metric in METRICS for stat in STATS]
+
+
+def _unflatten(row):
+    values = iter(row[1:])
+    return {metric: {stat: next(values) for stat in STATS} for metric in METRICS}
+
+
+class Sampler:
+    """每 interval 秒采样一次，整分钟时写入各窗口的汇总"""
+
+    def __init__(self, directory=DATA_DIR, interval=1.0, disk_path="/"):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.collector = ProcCollector(disk_path)
+        self.raw = RingBuffer(self.directory / "raw.ring", METRICS, RAW_CAPACITY)
+        self.series = {name: RingBuffer(self.directory / f"{name}.ring", SERIES_FIELDS, keep)
+                       for name, (_, keep) in WINDOWS.items()}
+        self.scanner = ProcessScanner(warmup=0)
+        self.stopping = threading.Event()
+        self.collector.cpu_percent()  # 建立 CPU 计数基准，第一次采样统计的就是第一秒
+        self.scanner.scan()           # 同理，第一次发布的进程占用统计的就是第一个扫描间隔
+
+    def tick(self, now):
+        sample = self.collector.sample()
+        self.raw.append(now, [sample[metric] for metric in METRICS])
+
+    def publish_processes(self, now):
+        """扫描一次进程，原子写入 processes.json（先写临时文件再改名，读取方不会读到半个文件）"""
+        data = {"time": now, **self.scanner.top(PROCESS_TOP)}
+        path = self.directory / PROCESS_FILE
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False))
+        os.replace(tmp, path)
+
+    def roll(self, boundary):
+        """boundary 为整分钟时间戳：汇总所有在此结束的窗口，记录时间为窗口起点"""
+        for name, (seconds, _) in WINDOWS.items():
+            if boundary % seconds:
+                continue
+            rows = [row for row in self.raw.read(since=boundary - seconds) if row[0] < boundary]
+            if rows:
+                self.series[name].append(boundary - seconds, _flatten(rollup(rows)))
+
+    def run_forever(self):
+        signal.signal(signal.SIGTERM, lambda *_: self.stopping.set())
+        signal.signal(signal.SIGINT, lambda *_: self.stopping.set())
+        print(f"📈 采样器已启动：每 {self.interval:g} 秒一次，数据目录 {self.directory}")
+
+        next_tick = math.ceil(time.time())
+        last_minute = int(next_tick // 60)
+        next_scan = next_tick + PROCESS_INTERVAL
+        while not self.stopping.wait(max(0.0, next_tick - time.time())):
+            now = time.time()
+            try:
+                self.tick(now)
+            except (OSError, ValueError) as e:
+                print(f"采样失败: {e}")
+            minute = int(now // 60)
+            if minute != last_minute:
+                self.roll(minute * 60)
+                last_minute = minute
+            if now >= next_scan:
+                try:
+                    self.publish_processes(now)
+                except OSError as e:
+                    print(f"进程扫描失败: {e}")
+                next_scan = now + PROCESS_INTERVAL
+            next_tick += self.interval
+            if next_tick < time.time():  # 挂起 / 卡顿后不补采，直接对齐到下一秒
+                next_tick = math.ceil(time.time())
+
+        for ring in [self.raw, *self.series.values()]:
+            ring.close()
+        print("📈 采样器已停止")
+
+
+def _combine(parts, now):
+    """把若干段汇总 [(起点, 权重, {指标: {min/avg/max/p95}})] 合并为一个窗口，没有数据时返回 {}
+
+    min / max 精确，avg 按权重（秒数）加权；各段的原始采样已不在，p95 取各段 p95 的最大值（上界）。
+    span 为最早一段的起点到最新采样的秒数。
+    """
+    if not parts:
+        return {}
+    total = sum(weight for _, weight, _ in parts)
+    span = now - parts[0][0]
+    stats = {}
+    for metric in METRICS:
+        values = [(weight, part[metric]) for _, weight, part in parts]
+        stats[metric] = {"min": min(s["min"] for _, s in values),
+                         "avg": sum(weight * s["avg"] for weight, s in values) / total,
+                         "max": max(s["max"] for _, s in values),
+                         "p95": max(s["p95"] for _, s in values), "span": span}
+    return stats
+
+
+def read_summary(directory=DATA_DIR):
+    """读取最新采样和最近 1m / 5m / 1h 的汇总
+
+    返回 {"time", "latest": {指标: 值}, "windows": {"1m": {指标: {min/avg/max/p95/span}}, ...}}；
+    采样器没有运行（缓冲区不存在或最新采样已过期）时返回 None。
+
+    1m 直接由最近一分钟的原始采样计算；5m / 1h 由已写入的汇总拼接而成（5m.ring 的整 5 分钟时段、
+    1m.ring 的整分钟时段，加上还没汇总的原始采样），每次只读几十条记录。窗口从包含起点的那个时段开始，
+    覆盖的时间略长于窗口（span 不小于窗口长度），持续超限 / 回落的判断只会更严格。
+    """
+    directory = Path(directory)
+    try:
+        raw = RingBuffer(directory / "raw.ring", METRICS, RAW_CAPACITY, readonly=True)
+    except (OSError, ValueError):
+        return None
+    try:
+        latest = raw.latest()
+        if latest is None or time.time() - latest[0] > STALE_AFTER:
+            return None
+        now = latest[0]
+        slots = {}
+        for name in ("1m", "5m"):
+            try:
+                since = now - WINDOWS["1h"][0] - WINDOWS[name][0]
+                slots[name] = read_series(name, since=since, directory=directory)
+            except (OSError, ValueError):
+                slots[name] = []
+        # 原始采样只需读最后一个整分钟汇总之后的部分（采样器刚启动、还没有汇总时读整个窗口）
+        tail_start = slots["1m"][-1][0] + WINDOWS["1m"][0] if slots["1m"] else now - WINDOWS["1h"][0]
+        tail = raw.read(since=min(tail_start, now - WINDOWS["1m"][0]))
+    finally:
+        raw.close()
+
+    windows = {"1m": rollup([row for row in tail if row[0] > now - WINDOWS["1m"][0]])}
+    for name, levels in (("5m", ("1m",)), ("1h", ("5m", "1m"))):
+        cursor = now - WINDOWS[name][0]
+        parts = []
+        for level in levels:
+            # 整分钟时段与整 5 分钟时段对齐：先取粗粒度时段，剩下的由细粒度时段接上
+            length = WINDOWS[level][0]
+            for start, stats in slots[level]:
+                if start + length > cursor:
+                    parts.append((start, length, stats))
+                    cursor = start + length
+        rows = [row for row in tail if row[0] >= cursor]
+        if rows:
+            parts.append((rows[0][0], len(rows), rollup(rows)))  # 原始采样 1 秒一条，权重即秒数
+        windows[name] = _combine(parts, now)
+    return {"time": now, "latest": dict(zip(METRICS, latest[1:])), "windows": windows}
+
+
+def read_processes(top_n=3, directory=DATA_DIR):
+    """读取采样器发布的占用最高的进程 {"cpu": [...], "memory": [...]}
+
+    采样器没有运行（文件不存在或已过期）或 top_n 超过发布的条数时返回 None。
+    """
+    try:
+        data = json.loads((Path(directory) / PROCESS_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+    if top_n > PROCESS_TOP or time.time() - data.get("time", 0) > PROCESS_INTERVAL + STALE_AFTER:
+        return None
+    return {"cpu": data.get("cpu", [])[:top_n], "memory": data.get("memory", [])[:top_n]}
+
+
+def read_series(name, since=0.0, limit=None, directory=DATA_DIR):
+    """某个汇总窗口的历史 [(窗口起点, {指标: {min/avg/max/p95}})]"""
+    _, keep = WINDOWS[name]
+    series = RingBuffer(Path(directory) / f"{name}.ring", SERIES_FIELDS, keep, readonly=True)
+    try:
+        return [(row[0], _unflatten(row)) for row in series.read(since=since, limit=limit)]
+    finally:
+        series.close()
+
+
+def _print_stats(label, stats):
+    print(f"   {label:<12}" + "".join(
+        f"{metric} {s['avg']:.1f}/{s['max']:.1f}/{s['p95']:.1f}  " for metric, s in stats.items()
+        if metric in ("cpu", "memory", "disk", "load1")))
+
+
+def main():
+    if "--summary" in sys.argv:
+        summary = read_summary()
+        if summary is None:
+            print("❌ 采样器没有运行")
+            return
+        print(f"📈 {datetime.fromtimestamp(summary['time']).strftime('%H:%M:%S')} "
+              + "  ".join(f"{metric} {value:.1f}" for metric, value in summary["latest"].items()))
+        print(f"   {'窗口':<10}(均值/最大/p95)")
+        for name, stats in summary["windows"].items():
+            _print_stats(name, stats)
+        return
+
+    if "--series" in sys.argv:
+        name = sys.argv[sys.argv.index("--series") + 1]
+        limit = int(sys.argv[sys.argv.index("--last") + 1]) if "--last" in sys.argv else 12
+        try:
+            rows = read_series(name, limit=limit)
+        except (KeyError, OSError, ValueError) as e:
+            print(f"❌ 无法读取 {name} 汇总: {e}")
+            return
+        print(f"📈 {name} 汇总 (均值/最大/p95)")
+        for start, stats in rows:
+            _print_stats(datetime.fromtimestamp(start).strftime("%m-%d %H:%M"), stats)
+        return
+
+    Sampler().run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,19 @@
 """
 每日股市提醒定时发送脚本
 
-使用 cron 设置定时任务：
+使用 cron 设置定时任务（PYTHONPATH 指向仓库根目录，见 crontab.txt）：
 0 14 * * * cd /root/.openclaw/workspace/everything-for-ai/stock-reminder && python3 daily_stock_sender.py
 
 或直接运行测试：
-python3 daily_stock_sender.py
+PYTHONPATH=.. python3 daily_stock_sender.py
 """
 
-import sys
-import subprocess
-import requests
 import json
 from pathlib import Path
 
+from digest_sources import collect
+from feishu_client import FeishuClient
+
 # 配置
 SCRIPT_DIR = Path(__file__).parent
 FEISHU_SENDER = SCRIPT_DIR / ".." / ".." / "skills" / "lark-integration" / "scripts" / "feishu-sender.py"
@@ -39,50 +39,13 @@ def load_secret():
     return None
 
 
-def get_tenant_access_token(app_id, app_secret):
-    """获取 tenant_access_token"""
-    url = "https://open.larksuite.com/open-apis/auth/v3/tenant_access_token/internal"
-    data = {"app_id": app_id, "app_secret": app_secret}
-    resp = requests.post(url, json=data)
-    result = resp.json()
-    return result.get("tenant_access_token") if result.get("code") == 0 else None
-
-
-def send_message(token, receiver_id, content):
-    """发送飞书消息"""
-    url = "https://open.larksuite.com/open-apis/im/v1/messages"
-    params = {"receive_id_type": "open_id"}
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json; charset=utf-8"
-    }
-    data = {
-        "receive_id": receiver_id,
-        "msg_type": "text",
-        "content": json.dumps({"text": content})
-    }
-    resp = requests.post(url, params=params, headers=headers, json=data)
-    result = resp.json()
-    return result.get("code") == 0
+def get_stock_info():
+    """获取股市信息（同一时间段内与其他发送任务共用一次获取结果）"""
+    return collect("stocks")
 
 
-def get_stock_info():
-    """获取股市信息"""
-    try:
-        result = subprocess.run(
-            ["python3", "stock_bot.py"],
-            capture_output=True,
-            text=True,
-            cwd=str(SCRIPT_DIR),
-            timeout=30
-        )
-        return result.stdout if result.returncode == 0 else None
-    except Exception as e:
-        print(f"获取股市信息失败: {e}")
-        return None
-
-
-def main():
+def main(client=None):
+    """client: 常驻调度进程传入的共享飞书客户端"""
     from datetime import datetime
     print(f"📊 {datetime.now().strftime('%Y-%m-%d %H:%M')} - 获取股市信息...")
 
@@ -92,29 +55,32 @@ def main():
         print("❌ 获取股市信息失败")
         return
 
-    # 发送到飞书
-    config = load_config()
-    app_id = config.get("channels", {}).get("feishu", {}).get("appId")
-    app_secret = load_secret()
+    # 发送到飞书（自己创建的客户端用完关闭，调度进程传入的由调度进程关闭）
+    owns_client = client is None
+    if owns_client:
+        config = load_config()
+        app_id = config.get("channels", {}).get("feishu", {}).get("appId")
+        app_secret = load_secret()
 
-    if not app_id or not app_secret:
-        print("❌ 配置缺失")
-        return
+        if not app_id or not app_secret:
+            print("❌ 配置缺失")
+            return
 
-    token = get_tenant_access_token(app_id, app_secret)
-    if not token:
-        print("❌ 获取 token 失败")
-        return
-
-    # 发送消息
-    content = f"📈 **每日股市提醒** - {datetime.now().strftime('%Y-%m-%d')}\n\n{stock_info}"
-    content = content.replace("=============================\n", "")
-    content = content.replace("\n", "\n")
-
-    if send_message(token, RECEIVER_ID, content):
-        print("✅ 股市提醒已发送！")
-    else:
-        print("❌ 发送失败")
+        client = FeishuClient(app_id, app_secret)
+    try:
+        if not client.token():
+            print("❌ 获取 token 失败")
+            return
+
+        # 发送消息（卡片：有价格预警时标题栏为红色）
+        card = stock_info.card(f"📈 每日股市提醒 - {datetime.now().strftime('%Y-%m-%d')}")
+        if client.send_card(RECEIVER_ID, card):
+            print("✅ 股市提醒已发送！")
+        else:
+            print("❌ 发送失败")
+    finally:
+        if owns_client:
+            client.close()
 
 
 if __name__ == "__main__":
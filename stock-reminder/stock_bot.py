@@ -14,8 +14,9 @@ from stock_api import StockAPI
 class StockReminder:
     """股票提醒机器人"""
     
-    def __init__(self, config_file: str = "config.json"):
+    def __init__(self, config_file: str = "config.json", history_file: str = "stock_history.json"):
         self.config = self.load_config(config_file)
+        self.history_file = history_file
         self.stock_api = StockAPI()
         self.previous_data = self.load_previous()
     
@@ -41,14 +42,14 @@ class StockReminder:
     
     def load_previous(self) -> Dict:
         """加载上次数据用于对比"""
-        if os.path.exists("stock_history.json"):
-            with open("stock_history.json") as f:
+        if os.path.exists(self.history_file):
+            with open(self.history_file) as f:
                 return json.load(f)
         return {}
     
     def save_previous(self):
         """保存当前数据"""
-        with open("stock_history.json", 'w') as f:
+        with open(self.history_file, 'w') as f:
             json.dump(self.current_data, f)
     
     def get_stock_data(self, code: str) -> Dict:
@@ -123,8 +124,8 @@ class StockReminder:
         
         return alerts
     
-    def format_message(self, stocks: List[Dict]) -> str:
-        """格式化输出"""
+    def format_message(self, stocks: List[Dict], compact: bool = False) -> str:
+        """格式化输出（compact: 去掉分隔线，用于飞书消息）"""
         now = datetime.now()
         is_morning = now.hour < 12
         time_str = "上午" if is_morning else "下午"
@@ -140,12 +141,13 @@ class StockReminder:
         for s in nasdaq_list:
             change = s.get('change_percent', 0)
             emoji = "📈" if change >= 0 else "📉"
-            lines.append(f"{'='*30}")
+            if not compact:
+                lines.append(f"{'='*30}")
             lines.append(f"{emoji} {s['display_name']} ({s['code']})")
             lines.append(f"💰 当前: {s['price']:.3f}")
             lines.append(f"📊 涨跌: {change:+.2f}%")
             lines.append(f"📝 {s.get('analysis', '')}")
-            lines.append(f"{'='*30}\n")
+            lines.append("" if compact else f"{'='*30}\n")
         
         # 显示其他股票
         for stock in other_list:
@@ -158,25 +160,34 @@ class StockReminder:
         
         return "\n".join(lines).strip()
     
-    def run(self) -> str:
-        """主程序"""
+    def build_result(self, compact: bool = False) -> Dict:
+        """获取行情，返回 {"stocks", "alerts", "message"}（不打印）"""
         stocks = self.get_all_data()
         
         # 保存当前数据用于下次对比
         self.current_data = {s['code']: s for s in stocks}
         self.save_previous()
         
-        message = self.format_message(stocks)
+        message = self.format_message(stocks, compact=compact)
         
         # 检查预警
         alerts = self.check_alerts(stocks)
-        if alerts:
-            lines = [message, "\n⚠️ 价格预警:"]
-            for alert in alerts:
-                emoji = "🚀" if alert["type"] == "rise" else "📉"
-                lines.append(f"{emoji} {alert['stock']['display_name']} {alert['value']:+.2f}%")
-            message = "\n".join(lines)
-        
+        alert_lines = []
+        for alert in alerts:
+            emoji = "🚀" if alert["type"] == "rise" else "📉"
+            alert_lines.append(f"{emoji} {alert['stock']['display_name']} {alert['value']:+.2f}%")
+        if alert_lines:
+            message = "\n".join([message, "\n⚠️ 价格预警:"] + alert_lines)
+        
+        return {"stocks": stocks, "alerts": alert_lines, "message": message}
+    
+    def build_message(self) -> str:
+        """获取行情并生成消息（不打印）"""
+        return self.build_result()["message"]
+    
+    def run(self) -> str:
+        """主程序"""
+        message = self.build_message()
         print(message)
         return message
 
@@ -0,0 +1,158 @@
+"""server-monitor 告警状态机（alerts.AlertEngine）的状态转换测试"""
+
+import json
+
+import pytest
+
+from digest_sources import import_from
+
+alerts = import_from("server-monitor", "alerts")
+
+THRESHOLD = 80
+SUSTAIN = 300
+HYSTERESIS = 5
+CLEAR_AFTER = 300
+RENOTIFY = 3600
+
+
+@pytest.fixture
+def engine(tmp_path):
+    rule = alerts.AlertRule("cpu", THRESHOLD, SUSTAIN, HYSTERESIS, CLEAR_AFTER, RENOTIFY)
+    return alerts.AlertEngine([rule], path=tmp_path / "state.json", incidents_path=tmp_path / "incidents.jsonl")
+
+
+def step(engine, value, now):
+    """评估一次 CPU 值，返回事件类型列表"""
+    return [event["kind"] for event in engine.evaluate({"cpu": {"value": value}}, now=now)]
+
+
+def state(engine):
+    return engine.states["cpu"]["state"]
+
+
+def test_below_threshold_stays_ok(engine):
+    assert step(engine, 50, 0) == []
+    assert state(engine) == alerts.OK
+
+
+def test_pending_then_firing_after_sustain(engine):
+    assert step(engine, 90, 0) == []
+    assert state(engine) == alerts.PENDING
+    assert step(engine, 90, SUSTAIN - 1) == []
+    assert state(engine) == alerts.PENDING
+    assert step(engine, 90, SUSTAIN) == ["firing"]
+    assert state(engine) == alerts.FIRING
+    # 持续告警不重复发送
+    assert step(engine, 95, SUSTAIN + 300) == []
+
+
+def test_pending_dip_returns_to_ok_silently(engine):
+    step(engine, 90, 0)
+    assert step(engine, 70, 100) == []
+    assert state(engine) == alerts.OK
+    # 重新超限时重新计时
+    assert step(engine, 90, 200) == []
+    assert step(engine, 90, 200 + SUSTAIN - 1) == []
+    assert state(engine) == alerts.PENDING
+
+
+def test_full_cycle_pending_firing_clearing_ok(engine):
+    step(engine, 90, 0)
+    assert step(engine, 92, SUSTAIN) == ["firing"]
+
+    # 回落到滞回带以下进入 clearing，不发消息
+    assert step(engine, 60, 600) == []
+    assert state(engine) == alerts.CLEARING
+    assert step(engine, 60, 600 + CLEAR_AFTER - 1) == []
+
+    events = engine.evaluate({"cpu": {"value": 60}}, now=600 + CLEAR_AFTER)
+    assert [event["kind"] for event in events] == ["resolved"]
+    assert events[0]["peak"] == 92
+    assert state(engine) == alerts.OK
+
+    records = [json.loads(line) for line in engine.incidents_path.read_text().splitlines()]
+    assert [record["event"] for record in records] == ["opened", "resolved"]
+    assert records[0]["incident"] == records[1]["incident"] == events[0]["incident"]
+
+
+def test_hysteresis_band_does_not_clear(engine):
+    step(engine, 90, 0)
+    step(engine, 90, SUSTAIN)
+    # 低于阈值但仍在滞回带内：保持 firing
+    assert step(engine, THRESHOLD - HYSTERESIS + 1, 600) == []
+    assert state(engine) == alerts.FIRING
+
+
+def test_clearing_back_above_threshold_refires_silently(engine):
+    step(engine, 90, 0)
+    step(engine, 90, SUSTAIN)
+    step(engine, 60, 600)
+    assert state(engine) == alerts.CLEARING
+    assert step(engine, 90, 700) == []
+    assert state(engine) == alerts.FIRING
+    # 回落计时从头开始
+    step(engine, 60, 800)
+    assert step(engine, 60, 800 + CLEAR_AFTER - 1) == []
+    assert step(engine, 60, 800 + CLEAR_AFTER) == ["resolved"]
+
+
+def test_renotify_while_firing(engine):
+    step(engine, 90, 0)
+    step(engine, 90, SUSTAIN)
+    assert step(engine, 90, SUSTAIN + RENOTIFY - 1) == []
+    assert step(engine, 90, SUSTAIN + RENOTIFY) == ["renotify"]
+    assert step(engine, 90, SUSTAIN + RENOTIFY + 1) == []
+
+
+def test_sampler_window_confirms_sustained_breach(engine):
+    # 5 分钟窗口的最小值已超过阈值：第一次检查就告警
+    item = {"value": 90, "stats": {"1m": {"avg": 90, "min": 88, "max": 92, "span": 60},
+                                   "5m": {"avg": 90, "min": 85, "max": 95, "span": 300}}}
+    events = engine.evaluate({"cpu": item}, now=1000)
+    assert [event["kind"] for event in events] == ["firing"]
+    assert events[0]["since"] == 1000 - 300
+
+
+def test_state_survives_restart(engine):
+    step(engine, 90, 0)
+    step(engine, 90, SUSTAIN)
+    engine.save()
+
+    rule = engine.rules[0]
+    restarted = alerts.AlertEngine([rule], path=engine.path, incidents_path=engine.incidents_path)
+    assert restarted.states["cpu"]["state"] == alerts.FIRING
+    assert step(restarted, 90, SUSTAIN + 300) == []
+
+
+def test_event_keys_are_unique_per_transition(engine):
+    step(engine, 90, 0)
+    firing = engine.evaluate({"cpu": {"value": 90}}, now=SUSTAIN)
+    renotify = engine.evaluate({"cpu": {"value": 90}}, now=SUSTAIN + RENOTIFY)
+    step(engine, 60, SUSTAIN + RENOTIFY + 10)
+    resolved = engine.evaluate({"cpu": {"value": 60}}, now=SUSTAIN + RENOTIFY + 10 + CLEAR_AFTER)
+    keys = [alerts.event_key(events[0]) for events in (firing, renotify, resolved)]
+    assert len(set(keys)) == 3
+    assert all(key.startswith(firing[0]["incident"] + ":") for key in keys)
+
+
+def test_forget_drops_stale_states(engine):
+    step(engine, 90, 0)
+    step(engine, 90, SUSTAIN)
+    assert engine.forget(SUSTAIN) == []
+    assert engine.forget(SUSTAIN + 1) == ["cpu"]
+    assert engine.states == {}
+    records = [json.loads(line) for line in engine.incidents_path.read_text().splitlines()]
+    assert records[-1]["event"] == "dropped"
+
+
+def test_mount_events_name_the_mount(tmp_path):
+    rule = alerts.AlertRule("disk", 90, 0, HYSTERESIS, 0, RENOTIFY)
+    engine = alerts.AlertEngine([rule], path=tmp_path / "state.json", incidents_path=tmp_path / "incidents.jsonl")
+    full = {"disk": {"value": 50}, "mounts": [{"mount": "/", "percent": 50}, {"mount": "/data", "percent": 95}]}
+    fired = engine.evaluate(full, now=0)
+    assert [event["title"] for event in fired] == ["磁盘不足 /data"]
+
+    full["mounts"][1]["percent"] = 40
+    resolved = engine.evaluate(full, now=60)  # clear_after 为 0：回落即恢复
+    assert [event["kind"] for event in resolved] == ["resolved"]
+    assert alerts.format_event(resolved[0], now=60).startswith("✅ 磁盘 /data 已恢复")
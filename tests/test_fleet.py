@@ -0,0 +1,126 @@
+"""server-monitor 集群模式（fleet）的记录编解码、每主机汇总和接收计数测试"""
+
+import threading
+
+import pytest
+
+from digest_sources import import_from
+
+fleet = import_from("server-monitor", "fleet")
+METRICS = fleet.METRICS
+
+
+def sample(value):
+    return {metric: value + i for i, metric in enumerate(METRICS)}
+
+
+# ========== 记录编解码 ==========
+
+def test_pack_unpack_round_trip():
+    data = fleet.pack_sample("web-1", 1000.5, sample(10)) + fleet.pack_sample("数据库", 1001.5, sample(20))
+    records = fleet.unpack_samples(data)
+    assert [(host, ts) for host, ts, _ in records] == [("web-1", 1000.5), ("数据库", 1001.5)]
+    assert records[0][2] == pytest.approx([10 + i for i in range(len(METRICS))])
+
+
+def test_unpack_drops_truncated_and_garbage():
+    good = fleet.pack_sample("web-1", 1.0, sample(1))
+    assert len(fleet.unpack_samples(good + good[:10])) == 1
+    assert fleet.unpack_samples(b"XXXX" + good[4:]) == []
+    # 魔数不对之后的部分整体丢弃，不会错位解析
+    assert len(fleet.unpack_samples(good + b"junk" * 20 + good)) == 1
+
+
+def test_long_host_name_is_truncated():
+    records = fleet.unpack_samples(fleet.pack_sample("h" * 300, 1.0, sample(1)))
+    assert records[0][0] == "h" * 255
+
+
+# ========== HostSeries ==========
+
+def fill(series, start, seconds, value=lambda ts: ts % 100):
+    for ts in range(start, start + seconds):
+        series.append(float(ts), [float(value(ts))] * len(METRICS))
+
+
+def test_read_returns_recent_raw_rows():
+    series = fleet.HostSeries()
+    fill(series, 6000, 200)
+    rows = series.read(since=6199 - 59)
+    assert len(rows) == 60
+    assert rows[0][0] == 6140 and rows[-1][0] == 6199
+    # 环形缓冲区只保留 RAW_SECONDS 条
+    assert len(series.read(since=0)) == fleet.RAW_SECONDS
+
+
+@pytest.mark.parametrize("seconds", [300, 3600])
+def test_window_matches_brute_force_over_whole_minutes(seconds):
+    series = fleet.HostSeries()
+    start = 60 * 1000
+    fill(series, start, 2 * 3600 + 30)  # 超过一小时，旧槽位已被覆盖
+    latest = series.last_seen
+    current = int(latest // 60)
+    values = [ts % 100 for ts in range(start, int(latest) + 1) if current - seconds // 60 <= ts // 60]
+    cpu = series.window(seconds)["cpu"]
+    assert cpu["min"] == min(values)
+    assert cpu["max"] == max(values)
+    assert cpu["avg"] == pytest.approx(sum(values) / len(values))
+    assert seconds <= cpu["span"] < seconds + 60
+
+
+def test_window_after_silence_only_uses_recent_minutes():
+    series = fleet.HostSeries()
+    fill(series, 60 * 1000, 600, value=lambda ts: 90)
+    fill(series, 60 * 1000 + 3000, 120, value=lambda ts: 10)  # 中断 40 分钟后恢复
+    cpu = series.window(300)["cpu"]
+    assert cpu["max"] == 10
+    assert cpu["span"] < 300
+
+
+def test_snapshot_is_independent():
+    series = fleet.HostSeries()
+    fill(series, 6000, 10)
+    snapshot = series.snapshot()
+    fill(series, 6010, 10, value=lambda ts: 1000)
+    assert snapshot.count == 10
+    assert snapshot.window(60)["cpu"]["max"] < 100
+
+
+# ========== Aggregator ==========
+
+@pytest.fixture
+def aggregator(tmp_path, monkeypatch):
+    monkeypatch.setattr(fleet, "FLEET_STATE_PATH", tmp_path / "fleet_alert_state.json")
+    aggregator = fleet.Aggregator({})
+    yield aggregator
+    aggregator._sender.shutdown()
+
+
+def test_ingest_skips_duplicates_and_out_of_order(aggregator):
+    assert aggregator.ingest(fleet.pack_sample("web-1", 10.0, sample(1))) == 1
+    assert aggregator.ingest(fleet.pack_sample("web-1", 10.0, sample(1))) == 0
+    assert aggregator.ingest(fleet.pack_sample("web-1", 9.0, sample(1))) == 0
+    assert aggregator.ingest(fleet.pack_sample("web-1", 11.0, sample(1))) == 1
+    assert aggregator.received == 2
+
+
+def test_ingest_caps_host_count(aggregator, monkeypatch):
+    monkeypatch.setattr(fleet, "MAX_HOSTS", 3)
+    data = b"".join(fleet.pack_sample(f"host-{i}", 1.0, sample(1)) for i in range(5))
+    assert aggregator.ingest(data) == 3
+    assert aggregator.rejected == 2
+    # 已跟踪的主机不受上限影响
+    assert aggregator.ingest(fleet.pack_sample("host-0", 2.0, sample(1))) == 1
+
+
+def test_received_count_is_exact_under_concurrent_ingest(aggregator):
+    def worker(index):
+        for ts in range(1, 501):
+            aggregator.ingest(fleet.pack_sample(f"host-{index}", float(ts), sample(1)))
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert aggregator.received == 8 * 500
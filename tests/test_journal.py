@@ -0,0 +1,114 @@
+"""moltbook-autoposter 操作日志（journal.ActionJournal）的回放、压缩和崩溃恢复测试"""
+
+import json
+import time
+
+import pytest
+
+from digest_sources import import_from
+
+journal = import_from("moltbook-autoposter", "journal")
+moltbook_bot = import_from("moltbook-autoposter", "moltbook_bot")
+
+
+@pytest.fixture
+def log(tmp_path):
+    action_journal = journal.ActionJournal(tmp_path / "journal.log")
+    yield action_journal
+    action_journal.close()
+
+
+def test_replay_counts_today_and_reports_unfinished(log):
+    log.begin("like", "p1")
+    log.finish("like", "p1", ok=True)
+    log.begin("follow", "bob")
+    log.finish("follow", "bob", ok=False)
+    log.begin("reply", "p2")  # 崩溃时还没有结果
+    state = log.replay()
+    assert state.stats["likes"] == 1
+    assert state.stats["follows"] == 0
+    assert state.done["like"] == {"p1"}
+    assert state.unknown["reply"] == {"p2"}
+
+
+def test_yesterdays_actions_do_not_count(log):
+    yesterday = time.time() - 86400
+    log.file.write(f"{yesterday:.3f}\tlike\tok\told\n")
+    log.file.write(f"{yesterday:.3f}\tsnapshot\t2000-01-01\t{json.dumps({'likes': 50})}\n")
+    log.file.flush()
+    state = log.replay()
+    assert state.stats["likes"] == 0
+    assert state.done["like"] == {"old"}
+
+
+def test_compact_keeps_only_todays_stats(log):
+    for key in ("p1", "p2"):
+        log.begin("like", key)
+        log.finish("like", key)
+    log.replay()
+    log.compact()
+    log.compact()  # 重复压缩不会把统计翻倍
+    assert len(log.path.read_text().splitlines()) == 1
+    assert log.replay().stats["likes"] == 2
+    log.begin("like", "p3")
+    log.finish("like", "p3")
+    log.compact()
+    assert log.replay().stats["likes"] == 3
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.status_code = 200
+        self.headers = {}
+        self.payload = payload
+        self.request = None
+        self.content = b""
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """动态流固定返回一条无评论、含关键词的帖子，记录回复请求"""
+
+    def __init__(self):
+        self.replies = []
+
+    def request(self, method, url, **kwargs):
+        if method == "GET" and url.endswith("/posts"):
+            return FakeResponse({"success": True, "posts": [{"id": "p1", "content": "AI 分享", "comment_count": 0}]})
+        if method == "POST" and url.endswith("/posts"):
+            self.replies.append(kwargs.get("json"))
+            return FakeResponse({"success": True, "post": {"id": "r1"}})
+        return FakeResponse({"success": True, "count": 0, "comments": []})
+
+    def close(self):
+        pass
+
+
+def test_unfinished_reply_survives_compaction(tmp_path):
+    def make_bot(session):
+        return moltbook_bot.MoltbookAutoposter(
+            config_file=str(tmp_path / "missing.json"),
+            credentials={"api_key": "test", "agent_name": "test"},
+            config_overrides={"dedup": {"path": str(tmp_path / "dedup.sqlite3")},
+                              "journal": {"path": str(tmp_path / "journal.log")}},
+            session=session,
+        )
+
+    crashed = make_bot(FakeSession())
+    crashed.journal_begin("reply", "p1")
+    crashed.journal.close()  # 回复已发出，结果还没写入就崩溃了
+    for store in crashed.dedup_stores().values():
+        store.close()
+
+    # 第一次重启回放后压缩日志，begin 记录随之消失；第二次重启仍然记得这条回复
+    make_bot(FakeSession()).close()
+    session = FakeSession()
+    bot = make_bot(session)
+    try:
+        assert "p1" in bot.replied_posts
+        bot.auto_reply()
+        assert session.replies == []
+    finally:
+        bot.close()
@@ -0,0 +1,134 @@
+"""飞书发件箱（feishu_outbox.Outbox）的去重、顺序、退避和 drain 时限测试"""
+
+import threading
+import time
+
+import pytest
+
+import feishu_outbox
+
+
+class FakeClient:
+    """按接收者预设失败次数的飞书客户端；记录每次投递的 (接收者, 文本)"""
+
+    def __init__(self, failures=None, retryable=True, wait=None):
+        self.failures = dict(failures or {})
+        self.retryable = retryable
+        self.wait = wait
+        self.sent = []
+        self.attempts = []
+        self._lock = threading.Lock()
+
+    def try_send(self, receiver_id, msg_type, content, receive_id_type):
+        with self._lock:
+            self.attempts.append((receiver_id, content["text"]))
+            if self.failures.get(receiver_id, 0):
+                self.failures[receiver_id] -= 1
+                return False, self.retryable, "boom", self.wait
+            self.sent.append((receiver_id, content["text"]))
+            return True, False, "", None
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    box = feishu_outbox.Outbox(tmp_path / "outbox.sqlite3")
+    yield box
+    box.close()
+
+
+def test_dedup_key_enqueues_once(outbox):
+    first = outbox.enqueue("alice", "hi", dedup_key="job:2026-01-05")
+    assert first is not None
+    assert outbox.enqueue("alice", "hi again", dedup_key="job:2026-01-05") is None
+    assert outbox.counts() == {feishu_outbox.PENDING: 1}
+    client = FakeClient()
+    assert outbox.drain(client) == 1
+    # 已发送的记录仍然占着 dedup_key
+    assert outbox.enqueue("alice", "hi", dedup_key="job:2026-01-05") is None
+    assert client.sent == [("alice", "hi")]
+
+
+def test_failed_head_blocks_only_its_receiver(outbox):
+    for text in ("a1", "a2"):
+        outbox.enqueue("alice", text)
+    outbox.enqueue("bob", "b1")
+    client = FakeClient(failures={"alice": 1}, wait=0)
+    assert outbox.drain(client) == 1
+    # alice 的第一条在退避中，第二条不能越过它先发
+    assert client.sent == [("bob", "b1")]
+    assert client.attempts.count(("alice", "a2")) == 0
+
+    assert outbox.drain(client, timeout=feishu_outbox.MIN_BACKOFF + 2) == 2
+    assert [text for receiver, text in client.sent if receiver == "alice"] == ["a1", "a2"]
+    assert outbox.counts() == {feishu_outbox.SENT: 3}
+
+
+def test_zero_retry_after_still_backs_off(outbox):
+    message_id = outbox.enqueue("alice", "hi")
+    client = FakeClient(failures={"alice": 100}, wait=0)
+    started = time.time()
+    assert outbox.drain(client) == 0
+    # Retry-After: 0 时也至少退避 MIN_BACKOFF，不会在一次 drain 里原地重试
+    assert client.attempts == [("alice", "hi")]
+    next_attempt = outbox.conn.execute("SELECT next_attempt_at FROM outbox WHERE id = ?", (message_id,)).fetchone()[0]
+    assert next_attempt >= started + feishu_outbox.MIN_BACKOFF
+
+
+def test_drain_returns_by_its_deadline(outbox):
+    outbox.enqueue("alice", "hi")
+    client = FakeClient(failures={"alice": 100}, wait=0)
+    started = time.monotonic()
+    assert outbox.drain(client, timeout=1.5) == 0
+    assert time.monotonic() - started < 1.5 + 0.5
+    assert 1 <= len(client.attempts) <= 2
+    assert outbox.counts() == {feishu_outbox.PENDING: 1}
+
+
+def test_slow_sends_do_not_overrun_deadline(outbox):
+    for i in range(20):
+        outbox.enqueue(f"user{i}", "hi")
+
+    class SlowClient(FakeClient):
+        def try_send(self, *args):
+            time.sleep(0.2)
+            return super().try_send(*args)
+
+    client = SlowClient(failures={f"user{i}": 100 for i in range(20)}, wait=0)
+    started = time.monotonic()
+    outbox.drain(client, timeout=0.5, max_workers=2)
+    # 每批 20 条、每条 0.2 秒；到时间后不再开始下一批
+    assert time.monotonic() - started < 0.5 + 20 * 0.2 / 2 + 0.5
+    assert len(client.attempts) == 20
+
+
+def test_non_retryable_failure_is_dead(outbox):
+    outbox.enqueue("alice", "bad")
+    outbox.enqueue("alice", "next")
+    client = FakeClient(failures={"alice": 1}, retryable=False)
+    assert outbox.drain(client) == 1
+    assert outbox.counts() == {feishu_outbox.DEAD: 1, feishu_outbox.SENT: 1}
+    assert client.sent == [("alice", "next")]
+
+
+def test_concurrent_drain_is_skipped(outbox):
+    outbox.enqueue("alice", "hi")
+    entered, release = threading.Event(), threading.Event()
+
+    class BlockingClient(FakeClient):
+        def try_send(self, *args):
+            entered.set()
+            release.wait(5)
+            return super().try_send(*args)
+
+    client = BlockingClient()
+    worker = threading.Thread(target=outbox.drain, args=(client,))
+    worker.start()
+    assert entered.wait(5)
+    other = feishu_outbox.Outbox(outbox.path)
+    try:
+        assert other.drain(FakeClient()) == 0
+    finally:
+        release.set()
+        worker.join()
+        other.close()
+    assert client.sent == [("alice", "hi")]
@@ -0,0 +1,186 @@
+"""moltbook-autoposter 限流（ratelimit.TokenBucket / RateLimiter）和点赞 / 关注等令牌的测试"""
+
+import time
+
+import pytest
+
+from digest_sources import import_from
+
+ratelimit = import_from("moltbook-autoposter", "ratelimit")
+moltbook_bot = import_from("moltbook-autoposter", "moltbook_bot")
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None, payload=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.payload = payload or {"success": True}
+        self.request = None
+        self.content = b""
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """动态流返回固定的帖子，其余请求都成功；记录请求的 (方法, 路径, 时间)"""
+
+    def __init__(self, posts):
+        self.posts = posts
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url.split("/api/v1", 1)[1], time.monotonic()))
+        if method == "GET" and url.endswith("/posts"):
+            return FakeResponse(payload={"success": True, "posts": self.posts})
+        return FakeResponse()
+
+    def close(self):
+        pass
+
+
+# ========== TokenBucket ==========
+
+def test_burst_then_refill():
+    bucket = ratelimit.TokenBucket(rate=2.0, burst=3)
+    t0 = bucket.updated
+    assert [bucket.try_acquire(t0) for _ in range(4)] == [True, True, True, False]
+    assert bucket.delay(t0) == pytest.approx(0.5)
+    assert not bucket.try_acquire(t0 + 0.4)
+    assert bucket.try_acquire(t0 + 0.5)
+
+
+def test_refill_is_capped_at_burst():
+    bucket = ratelimit.TokenBucket(rate=2.0, burst=3)
+    t0 = bucket.updated
+    assert [bucket.try_acquire(t0 + 100) for _ in range(4)] == [True, True, True, False]
+
+
+def test_block_for_drains_and_pauses():
+    bucket = ratelimit.TokenBucket(rate=1.0, burst=5)
+    t0 = bucket.updated
+    bucket.block_for(30, now=t0)
+    assert bucket.delay(t0) == pytest.approx(30)
+    assert not bucket.try_acquire(t0 + 29.9)
+    # 暂停期间桶被清空后照常补充
+    assert [bucket.try_acquire(t0 + 30) for _ in range(6)] == [True] * 5 + [False]
+
+
+# ========== RateLimiter ==========
+
+def test_endpoint_for():
+    endpoint_for = ratelimit.RateLimiter.endpoint_for
+    base = "https://www.moltbook.com/api/v1"
+    assert endpoint_for("POST", f"{base}/posts/p1/upvote") == "upvote"
+    assert endpoint_for("POST", f"{base}/users/bob/follow/") == "follow"
+    assert endpoint_for("GET", f"{base}/posts/p1/comments?limit=1") == "comments"
+    assert endpoint_for("GET", f"{base}/posts") == "posts"
+    assert endpoint_for("GET", f"{base}/agents/me") == "default"
+
+
+def test_limits_override_only_given_keys():
+    limiter = ratelimit.RateLimiter({"upvote": {"burst": 10}, "custom": {"rate": 3.0}})
+    assert limiter.bucket("upvote").rate == 0.5
+    assert limiter.bucket("upvote").burst == 10
+    assert limiter.bucket("custom").rate == 3.0
+    assert limiter.bucket("missing") is limiter.buckets["default"]
+
+
+@pytest.mark.parametrize("headers, paused", [
+    ({"Retry-After": "7"}, 7),
+    ({}, 60),
+    ({"Retry-After": "soon"}, 60),
+])
+def test_429_pauses_for_retry_after(headers, paused):
+    limiter = ratelimit.RateLimiter()
+    limiter.observe("posts", FakeResponse(429, headers))
+    assert limiter.delay("posts") == pytest.approx(paused, abs=0.5)
+    assert not limiter.try_acquire("posts")
+    assert limiter.ready("comments")
+
+
+def test_quota_exhausted_pauses_until_reset():
+    limiter = ratelimit.RateLimiter()
+    limiter.observe("posts", FakeResponse(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "5"}))
+    assert limiter.delay("posts") == pytest.approx(5, abs=0.5)
+
+
+def test_reset_as_unix_timestamp():
+    limiter = ratelimit.RateLimiter()
+    reset = str(int(time.time()) + 30)
+    limiter.observe("posts", FakeResponse(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset}))
+    assert limiter.delay("posts") == pytest.approx(30, abs=1.5)
+
+
+def test_remaining_quota_spreads_rate_until_reset():
+    limiter = ratelimit.RateLimiter()
+    limiter.observe("posts", FakeResponse(200, {"X-RateLimit-Remaining": "4", "X-RateLimit-Reset": "2"}))
+    bucket = limiter.bucket("posts")
+    assert bucket.rate == pytest.approx(2.0)
+    assert bucket.tokens <= 4
+    # 配额远小于默认速率时不低于默认速率的 1/10
+    limiter.observe("posts", FakeResponse(200, {"X-RateLimit-Remaining": "1", "X-RateLimit-Reset": "1000"}))
+    assert bucket.rate == pytest.approx(0.1)
+
+
+def test_malformed_remaining_is_ignored():
+    limiter = ratelimit.RateLimiter()
+    limiter.observe("posts", FakeResponse(200, {"X-RateLimit-Remaining": "lots"}))
+    assert limiter.bucket("posts").rate == 1.0
+    assert limiter.ready("posts")
+
+
+# ========== 点赞 / 关注等令牌 ==========
+
+@pytest.fixture
+def make_bot(tmp_path):
+    bots = []
+
+    def make(posts, rate_limits):
+        session = FakeSession(posts)
+        bot = moltbook_bot.MoltbookAutoposter(
+            config_file=str(tmp_path / "missing.json"),
+            credentials={"api_key": "test", "agent_name": "test"},
+            config_overrides={
+                "rate_limits": rate_limits,
+                "dedup": {"path": str(tmp_path / "dedup.sqlite3")},
+                "journal": {"path": str(tmp_path / "journal.log")},
+            },
+            session=session,
+        )
+        bots.append(bot)
+        return bot, session
+
+    yield make
+    for bot in bots:
+        bot.close()
+
+
+def test_auto_like_waits_for_tokens_instead_of_stopping(make_bot):
+    posts = [{"id": f"p{i}", "content": "hello"} for i in range(8)]
+    bot, session = make_bot(posts, {"upvote": {"rate": 20.0, "burst": 1}})
+    bot.auto_like()
+    upvotes = [request for request in session.requests if request[1].endswith("/upvote")]
+    # 桶里只有 1 个令牌，其余 4 次等令牌补充后再发，而不是提前结束本轮
+    assert len(upvotes) == 5
+    assert bot.stats["likes"] == 5
+    assert upvotes[-1][2] - upvotes[0][2] >= 4 / 20.0 * 0.9
+
+
+def test_auto_follow_waits_for_tokens(make_bot):
+    posts = [{"id": f"p{i}", "author": {"username": f"user{i}"}} for i in range(4)]
+    bot, session = make_bot(posts, {"follow": {"rate": 20.0, "burst": 1}})
+    bot.auto_follow_feed()
+    assert bot.stats["follows"] == 2
+    assert "user1" in bot.followed_users
+    assert "user2" not in bot.followed_users
+
+
+def test_long_server_pause_defers_to_next_run(make_bot, monkeypatch):
+    posts = [{"id": f"p{i}"} for i in range(3)]
+    bot, session = make_bot(posts, {})
+    bot.rate_limiter.bucket("upvote").block_for(moltbook_bot.MAX_THROTTLE_WAIT + 50)
+    monkeypatch.setattr(moltbook_bot.time, "sleep", lambda seconds: pytest.fail("不应等待"))
+    bot.auto_like()
+    assert bot.stats["likes"] == 0
+    assert not any(request[1].endswith("/upvote") for request in session.requests)
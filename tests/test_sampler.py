@@ -0,0 +1,73 @@
+"""server-monitor 采样器（sampler.read_summary）由汇总拼接窗口的测试"""
+
+import math
+import time
+
+import pytest
+
+from digest_sources import import_from
+
+sampler = import_from("server-monitor", "sampler")
+
+
+@pytest.fixture
+def rings(tmp_path):
+    """写入约 80 分钟的每秒采样（CPU 为 0..99 循环的锯齿波），并像采样器一样在整分钟汇总"""
+    writer = sampler.Sampler.__new__(sampler.Sampler)
+    writer.raw = sampler.RingBuffer(tmp_path / "raw.ring", sampler.METRICS, sampler.RAW_CAPACITY)
+    writer.series = {name: sampler.RingBuffer(tmp_path / f"{name}.ring", sampler.SERIES_FIELDS, keep)
+                     for name, (_, keep) in sampler.WINDOWS.items()}
+    end = math.floor(time.time())
+    last_minute = None
+    for ts in range(end - 4800, end + 1):
+        value = float(ts % 100)
+        writer.raw.append(ts, [value, 50.0, 40.0, 1.0, 1.0, 1.0])
+        if last_minute is not None and ts // 60 != last_minute:
+            writer.roll(ts // 60 * 60)
+        last_minute = ts // 60
+    yield tmp_path, writer
+    for ring in [writer.raw, *writer.series.values()]:
+        ring.close()
+
+
+def test_windows_cover_at_least_their_length(rings):
+    directory, writer = rings
+    summary = sampler.read_summary(directory)
+    for name, (seconds, _) in sampler.WINDOWS.items():
+        cpu = summary["windows"][name]["cpu"]
+        assert cpu["span"] >= seconds - 1
+        # 从包含窗口起点的时段开始，最多多出一个 5 分钟时段
+        assert cpu["span"] < seconds + 300
+        assert summary["windows"][name]["memory"]["avg"] == pytest.approx(50)
+    for name in ("5m", "1h"):  # 锯齿波周期 100 秒，5m / 1h 窗口一定覆盖完整的周期
+        assert summary["windows"][name]["cpu"]["min"] == 0
+        assert summary["windows"][name]["cpu"]["max"] == 99
+    assert summary["windows"]["1h"]["cpu"]["avg"] == pytest.approx(49.5, abs=2)
+
+
+def test_matches_raw_rollup_for_steady_metrics(rings):
+    directory, writer = rings
+    summary = sampler.read_summary(directory)
+    exact = sampler.rollup(writer.raw.read(since=summary["time"] - 3600))
+    for metric in ("memory", "disk"):
+        for stat in ("min", "avg", "max", "p95"):
+            assert summary["windows"]["1h"][metric][stat] == pytest.approx(exact[metric][stat])
+
+
+def test_falls_back_to_raw_before_first_rollup(tmp_path):
+    raw = sampler.RingBuffer(tmp_path / "raw.ring", sampler.METRICS, sampler.RAW_CAPACITY)
+    now = time.time()
+    for offset in range(30, -1, -1):
+        raw.append(now - offset, [float(offset), 50.0, 40.0, 1.0, 1.0, 1.0])
+    summary = sampler.read_summary(tmp_path)
+    raw.close()
+    for name in sampler.WINDOWS:
+        assert summary["windows"][name]["cpu"]["max"] == 30
+        assert summary["windows"][name]["cpu"]["span"] == pytest.approx(30)
+
+
+def test_stale_sampler_returns_none(tmp_path):
+    raw = sampler.RingBuffer(tmp_path / "raw.ring", sampler.METRICS, sampler.RAW_CAPACITY)
+    raw.append(time.time() - 60, [1.0] * len(sampler.METRICS))
+    raw.close()
+    assert sampler.read_summary(tmp_path) is None
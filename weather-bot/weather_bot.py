@@ -61,10 +61,10 @@ class WeatherBot:
   温度: {weather['temp']}°C
   湿度: {weather['humidity']}%"""
     
-    def get_all_weather_message(self) -> str:
-        """Get weather for all locations"""
+    def get_all_weather_message(self, weathers: List[Dict] = None) -> str:
+        """Get weather for all locations (or format already fetched ones)"""
         lines = [f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M')} 天气报告\n"]
-        for weather in self.get_all_weather():
+        for weather in weathers if weathers is not None else self.get_all_weather():
             lines.append(self.format_weather_message(weather))
             lines.append("")
         return "\n".join(lines).strip()